@@ -0,0 +1,4 @@
+""" Benchmarks for pymcws. These do not require a running JRiver instance.
+
+    Run them from the repository root, e.g. python -m benchmarks.bench_decode
+"""
@@ -0,0 +1,77 @@
+""" Measures AutocompleteIndex against the fake MCWS server.
+
+    - load_s:       building the index from Library/Values for all default fields
+    - roundtrip_s:  a single library.values(filter=...) request, as done per keystroke
+                    without the index
+    - complete_s:   mean time of a local prefix lookup
+    - search_s:     mean time of a local substring lookup
+
+    Usage:
+        python -m benchmarks.bench_autocomplete --files 20000
+        python -m benchmarks.bench_autocomplete --baseline autocomplete.json
+"""
+import argparse
+import json
+import sys
+import time
+from benchmarks.bench_decode import compare
+from benchmarks.fake_server import FakeMCWSServer, SyntheticLibrary
+from pymcws.api import library
+from pymcws.autocomplete import AutocompleteIndex
+
+PREFIXES = ["a", "ar", "artist 1", "album 12", "genre", "gen", "x", "album 1999"]
+
+
+def _mean_lookup(lookup, texts: list, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text in texts:
+            lookup(text)
+    return (time.perf_counter() - start) / (repeat * len(texts))
+
+
+def run(n_files: int = 20000, repeat: int = 200) -> dict:
+    with FakeMCWSServer(SyntheticLibrary(n_files)) as fake:
+        server = fake.media_server(api=False)
+        start = time.perf_counter()
+        index = AutocompleteIndex(server)
+        load = time.perf_counter() - start
+        start = time.perf_counter()
+        library.values(server, filter="artist 1", field="Artist")
+        roundtrip = time.perf_counter() - start
+        server.session.close()
+    return {
+        "load_s": load,
+        "roundtrip_s": roundtrip,
+        "complete_s": _mean_lookup(index.complete, PREFIXES, repeat),
+        "search_s": _mean_lookup(index.search, PREFIXES, repeat),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0].strip())
+    parser.add_argument("--files", type=int, default=20000, help="library size")
+    parser.add_argument("--repeat", type=int, default=200, help="lookups per prefix")
+    parser.add_argument("--baseline", help="json file to compare results against")
+    parser.add_argument("--save-baseline", help="json file to store results in")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    results = run(args.files, args.repeat)
+    for metric, value in results.items():
+        print("    {:<16} {:>10.6f}".format(metric, value))
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as baseline_file:
+            json.dump(results, baseline_file, indent=2)
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            regressions = compare(results, json.load(baseline_file), args.tolerance)
+        for metric, previous, current, ratio in regressions:
+            print("REGRESSION {}: {:.6f} -> {:.6f}".format(metric, previous, current))
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,186 @@
+""" Micro-benchmarks and memory budget for the decode paths of pymcws.
+
+    Measures, normalised per 10k files:
+    - parse:     ElementTree parsing of an MPL response
+    - decode:    applying the field decoders from library.fields
+    - construct: building MediaFile objects from decoded tags
+    - transform: utils.transform_mpl_response end to end
+    - peak_kib:  tracemalloc peak of transform_mpl_response
+    - interned:  transform_mpl_response with intern_values, time and retained memory
+    - columns:   pymcws.vectorized.transform_mpl_columns end to end (if numpy is installed)
+
+    Usage:
+        python -m benchmarks.bench_decode --files 20000
+        python -m benchmarks.bench_decode --save-baseline baseline.json
+        python -m benchmarks.bench_decode --baseline baseline.json --tolerance 0.2
+
+    When comparing against a baseline, the exit code is 1 if any metric regressed
+    by more than the tolerance.
+"""
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+from xml.etree import ElementTree
+from pymcws.model import MediaFile
+from pymcws.utils import (
+    interned_transform_mpl_response,
+    transform_mpl_response,
+    transform_unstructured_response,
+)
+from benchmarks.synthetic import SyntheticServer, FakeResponse, mpl_xml, info_xml
+
+PER_FILES = 10000
+
+
+def _best_of(repeat: int, function):
+    """Runs function repeat times and returns the fastest time and the last result."""
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best, result
+
+
+def run(n_files: int = PER_FILES, repeat: int = 3, seed: int = 0) -> dict:
+    """Runs all benchmarks and returns a dictionary of metric name to value."""
+    server = SyntheticServer()
+    fields = server.fields
+    content = mpl_xml(n_files, seed=seed)
+    response = FakeResponse(content)
+    scale = PER_FILES / float(n_files)
+
+    parse_time, root = _best_of(repeat, lambda: ElementTree.fromstring(content))
+
+    def decode():
+        decoded = []
+        for item in root:
+            tags = {}
+            for tag in item:
+                name = tag.attrib["Name"]
+                tags[name] = fields[name]["Decoder"](tag.text)
+            decoded.append(tags)
+        return decoded
+
+    decode_time, decoded = _best_of(repeat, decode)
+    construct_time, _ = _best_of(
+        repeat, lambda: [MediaFile(server, tags) for tags in decoded]
+    )
+    transform_time, _ = _best_of(
+        repeat, lambda: transform_mpl_response(server, response)
+    )
+
+    interned_time, _ = _best_of(
+        repeat, lambda: interned_transform_mpl_response(server, response)
+    )
+
+    info_response = FakeResponse(info_xml())
+    info_time, _ = _best_of(
+        repeat,
+        lambda: [transform_unstructured_response(info_response) for _ in range(1000)],
+    )
+
+    try:
+        from pymcws.vectorized import transform_mpl_columns
+    except ImportError:
+        transform_mpl_columns = None
+    if transform_mpl_columns is not None:
+        columns_time, _ = _best_of(
+            repeat, lambda: transform_mpl_columns(server, response)
+        )
+
+    del decoded, root
+    tracemalloc.start()
+    result = transform_mpl_response(server, response)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    del result
+    retained = {}
+    for name, transform in (
+        ("retained", transform_mpl_response),
+        ("interned_retained", interned_transform_mpl_response),
+    ):
+        tracemalloc.start()
+        result = transform(server, response)
+        retained[name] = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del result
+
+    results = {
+        "parse_s": parse_time * scale,
+        "decode_s": decode_time * scale,
+        "construct_s": construct_time * scale,
+        "transform_s": transform_time * scale,
+        "info_1000_s": info_time,
+        "peak_kib": peak * scale / 1024.0,
+        "interned_s": interned_time * scale,
+        "retained_kib": retained["retained"] * scale / 1024.0,
+        "interned_kib": retained["interned_retained"] * scale / 1024.0,
+        "response_kib": len(content) * scale / 1024.0,
+    }
+    if transform_mpl_columns is not None:
+        results["columns_s"] = columns_time * scale
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Returns a list of (metric, baseline, current, ratio) for regressed metrics."""
+    regressions = []
+    for metric, current in results.items():
+        previous = baseline.get(metric, None)
+        if previous is None or previous <= 0:
+            continue
+        ratio = current / previous
+        if ratio > 1 + tolerance:
+            regressions.append((metric, previous, current, ratio))
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1].strip())
+    parser.add_argument("--files", type=int, default=PER_FILES, help="files per MPL")
+    parser.add_argument("--repeat", type=int, default=3, help="repetitions per timing")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", help="json file to compare results against")
+    parser.add_argument("--save-baseline", help="json file to store results in")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="allowed relative slowdown/growth before flagging a regression",
+    )
+    args = parser.parse_args(argv)
+
+    results = run(args.files, args.repeat, args.seed)
+    print("Results per " + str(PER_FILES) + " files (" + str(args.files) + " generated):")
+    for metric, value in results.items():
+        print("    {:<14} {:>12.4f}".format(metric, value))
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as baseline_file:
+            json.dump(results, baseline_file, indent=2)
+        print("Baseline written to " + args.save_baseline)
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        regressions = compare(results, baseline, args.tolerance)
+        for metric, previous, current, ratio in regressions:
+            print(
+                "REGRESSION {}: {:.4f} -> {:.4f} ({:+.0%})".format(
+                    metric, previous, current, ratio - 1
+                )
+            )
+        if regressions:
+            return 1
+        print("No regressions against " + args.baseline)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+""" Measures the startup cost of pymcws in fresh interpreters.
+
+    - import_s:         wall time of python -c "import pymcws" minus a bare interpreter
+    - importtime_s:     cumulative import time of pymcws as reported by -X importtime
+    - first_command_s:  wall time of a process that imports pymcws, creates a server and
+                        sends one playback command to the fake MCWS server, minus a bare
+                        interpreter
+
+    Usage:
+        python -m benchmarks.bench_import --runs 10
+        python -m benchmarks.bench_import --baseline startup.json
+"""
+import argparse
+import json
+import subprocess
+import sys
+import time
+from benchmarks.bench_decode import compare
+from benchmarks.fake_server import FakeMCWSServer, SyntheticLibrary
+
+FIRST_COMMAND = """
+import pymcws
+server = pymcws.get_media_server("localhost:{port}", "test", "test")
+server.playback.stop()
+"""
+
+
+def _wall_time(code: str, runs: int) -> float:
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], check=True)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def _importtime(runs: int) -> float:
+    best = None
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import pymcws"],
+            check=True,
+            capture_output=True,
+            text=True,
+        )
+        for line in result.stderr.splitlines():
+            parts = [part.strip() for part in line.split("|")]
+            if len(parts) == 3 and parts[2] == "pymcws":
+                cumulative = int(parts[1]) / 1000000.0
+                best = cumulative if best is None else min(best, cumulative)
+    return best
+
+
+def run(runs: int = 5) -> dict:
+    bare = _wall_time("pass", runs)
+    with FakeMCWSServer(SyntheticLibrary(10)) as fake:
+        first_command = _wall_time(FIRST_COMMAND.format(port=fake.port), runs)
+    return {
+        "import_s": _wall_time("import pymcws", runs) - bare,
+        "importtime_s": _importtime(runs),
+        "first_command_s": first_command - bare,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1].strip())
+    parser.add_argument("--runs", type=int, default=5, help="best of n runs")
+    parser.add_argument("--baseline", help="json file to compare results against")
+    parser.add_argument("--save-baseline", help="json file to store results in")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    results = run(args.runs)
+    for metric, value in results.items():
+        print("    {:<16} {:>10.4f}".format(metric, value))
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as baseline_file:
+            json.dump(results, baseline_file, indent=2)
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            regressions = compare(results, json.load(baseline_file), args.tolerance)
+        for metric, previous, current, ratio in regressions:
+            print("REGRESSION {}: {:.4f} -> {:.4f}".format(metric, previous, current))
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,66 @@
+""" Measures PathMapper on a large list of synthetic server paths.
+
+    - mapper_s:  translating all paths to local paths with a PathMapper
+    - reverse_s: translating them back to server paths
+    - replace_s: the same translation with str.replace for every rule, for comparison
+
+    Usage:
+        python -m benchmarks.bench_paths --files 250000 --rules 50
+"""
+import argparse
+import sys
+import time
+from benchmarks.synthetic import items
+from pymcws.paths import PathMapper
+
+
+def _naive(paths: list, rules: list) -> list:
+    result = []
+    for path in paths:
+        for source, target in rules:
+            if path.startswith(source + "\\"):
+                path = target + path[len(source) :].replace("\\", "/")
+                break
+        result.append(path)
+    return result
+
+
+def run(n_files: int = 250000, n_rules: int = 50) -> dict:
+    paths = [item["Filename"] for item in items(n_files, [("Filename", "Path", "")])]
+    # The longest prefixes first, as a naive implementation must check them in order
+    rules = [
+        ("D:\\Music\\Artist " + str(i), "/mnt/artist" + str(i))
+        for i in range(n_rules - 1)
+    ]
+    rules.sort(key=lambda rule: len(rule[0]), reverse=True)
+    rules.append(("D:\\Music", "/mnt/music"))
+    mapper = PathMapper(rules, ignore_case=False)
+
+    start = time.perf_counter()
+    local = list(mapper.map_local(paths))
+    mapper_time = time.perf_counter() - start
+    start = time.perf_counter()
+    server = list(mapper.map_server(local))
+    reverse_time = time.perf_counter() - start
+    assert server == paths
+    start = time.perf_counter()
+    naive = _naive(paths, rules)
+    replace_time = time.perf_counter() - start
+    assert naive == local
+    return {"mapper_s": mapper_time, "reverse_s": reverse_time, "replace_s": replace_time}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0].strip())
+    parser.add_argument("--files", type=int, default=250000, help="number of paths")
+    parser.add_argument("--rules", type=int, default=50, help="number of prefix rules")
+    args = parser.parse_args(argv)
+    results = run(args.files, args.rules)
+    print(str(args.files) + " paths, " + str(args.rules) + " rules:")
+    for metric, value in results.items():
+        print("    {:<14} {:>12.4f}".format(metric, value))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
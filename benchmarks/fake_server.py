@@ -0,0 +1,577 @@
+""" An in-process stand-in for MCWS, serving a synthetic library over HTTP.
+
+    The server implements the endpoints pymcws uses (Alive, Library/*, Files/Search,
+    Playlists/List, Playlist/Files, File/SetInfo, File/GetImage and Playback/*) well
+    enough to drive the client end to end. Latency, jitter, error rates and bandwidth
+    limits can be injected to measure client behaviour under load.
+
+    Example:
+        with FakeMCWSServer(SyntheticLibrary(10000), latency=0.005) as fake:
+            server = fake.media_server()
+            server.files.search("[Artist]=[Artist 1]")
+"""
+import csv
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+from xml.sax.saxutils import escape, quoteattr
+from benchmarks.synthetic import DEFAULT_FIELDS, items, fields_xml, mpl_from_items
+
+# A tiny valid JPEG header is sufficient for clients that only pass bytes along
+IMAGE_BYTES = b"\xff\xd8\xff\xe0" + b"\x00" * 2044 + b"\xff\xd9"
+
+# [Field]=[value], [Field]="value", [Field]=value and [Field]=low-high
+_QUERY_TERM = re.compile(r'\[([^\]]+)\]=(\[(?:[^\]/]|/.)*\]|"[^"]*"|\S+)')
+
+
+def _unescape(value: str) -> str:
+    return re.sub(r"/(.)", r"\1", value)
+
+
+class SyntheticLibrary:
+    """A library of synthetic files stored as jriver-encoded strings, plus zone state."""
+
+    def __init__(self, n_files: int = 1000, field_definitions: list = None, seed: int = 0):
+        self.field_definitions = field_definitions or DEFAULT_FIELDS
+        self.items = items(n_files, self.field_definitions, seed)
+        self.by_key = {item["Key"]: item for item in self.items}
+        self.lock = threading.Lock()
+        self.zones = [
+            {"ID": str(i), "Name": name, "GUID": "{0000-" + str(i) + "}", "DLNA": "0"}
+            for i, name in enumerate(["Player", "Living Room", "Kitchen"])
+        ]
+        self.zone_state = {
+            zone["ID"]: {
+                "State": 0,
+                "Volume": 0.5,
+                "Mute": False,
+                "Position": 0,
+                "Repeat": "Off",
+                "Shuffle": "Off",
+                "Playlist": [],
+                "Index": -1,
+            }
+            for zone in self.zones
+        }
+        keys = [item["Key"] for item in self.items]
+        self.playlists = [
+            {"ID": "1000", "Name": "Playlists", "Path": "Playlists", "Type": "Group"},
+            {
+                "ID": "1001",
+                "Name": "Favourites",
+                "Path": "Playlists\\Favourites",
+                "Type": "Playlist",
+                "Keys": keys[:20],
+            },
+            {
+                "ID": "1002",
+                "Name": "Recently Imported",
+                "Path": "Playlists\\Recently Imported",
+                "Type": "Smartlist",
+                "Keys": list(reversed(keys[-50:])),
+            },
+        ]
+
+    def search(self, query: str) -> list:
+        """Evaluates a (very) small subset of the JRiver search language.
+
+        Supported are AND-combined terms of the forms [Field]=[exact], [Field]="exact",
+        [Field]=substring and [Field]=low-high for numeric ranges, as well as ~sort=.
+        """
+        sort_fields = []
+        if "~sort=" in query:
+            query, sort = query.split("~sort=", 1)
+            sort_fields = re.findall(r"\[([^\]]+)\]", sort)
+        matchers = []
+        for field, value in _QUERY_TERM.findall(query):
+            if value.startswith("[") or value.startswith('"'):
+                expected = _unescape(value[1:-1]).lower()
+                matchers.append(
+                    lambda item, f=field, e=expected: item.get(f, "").lower() == e
+                )
+            elif re.fullmatch(r"-?\d+(\.\d+)?--?\d+(\.\d+)?", value):
+                low, high = re.match(r"(-?[\d.]+)-(-?[\d.]+)", value).groups()
+                matchers.append(
+                    lambda item, f=field, lo=float(low), hi=float(high): lo
+                    <= float(item.get(f, "0").replace(",", ".") or 0)
+                    <= hi
+                )
+            else:
+                needle = _unescape(value).lower()
+                matchers.append(
+                    lambda item, f=field, n=needle: n in item.get(f, "").lower()
+                )
+        result = [item for item in self.items if all(m(item) for m in matchers)]
+        for field in reversed(sort_fields):
+            result.sort(key=lambda item, f=field: _sort_key(item.get(f, "")))
+        return result
+
+    def playlist(self, params: dict) -> dict:
+        identifier = params.get("Playlist", "")
+        identifier_type = params.get("PlaylistType", "ID")
+        for playlist in self.playlists:
+            if playlist.get(identifier_type, None) == identifier:
+                return playlist
+        return None
+
+    def zone(self, params: dict) -> dict:
+        zone_id = params.get("Zone", "-1")
+        zone_type = params.get("ZoneType", "ID")
+        for zone in self.zones:
+            if zone_type == "Name" and zone["Name"] == zone_id:
+                return self.zone_state[zone["ID"]]
+            if zone_type == "ID" and zone["ID"] == zone_id:
+                return self.zone_state[zone["ID"]]
+            if zone_type == "Index" and str(self.zones.index(zone)) == zone_id:
+                return self.zone_state[zone["ID"]]
+        return self.zone_state[self.zones[0]["ID"]]
+
+
+def _sort_key(value: str):
+    try:
+        return (0, float(value.replace(",", ".")), "")
+    except ValueError:
+        return (1, 0, value.lower())
+
+
+def _response(values: list, status: str = "OK") -> bytes:
+    """Builds an unstructured MCWS response from (name, value) pairs."""
+    lines = ['<?xml version="1.0" encoding="UTF-8" standalone="yes" ?>']
+    lines.append("<Response Status=" + quoteattr(status) + ">")
+    for name, value in values:
+        lines.append("<Item Name=" + quoteattr(name) + ">" + escape(str(value)) + "</Item>")
+    lines.append("</Response>")
+    return "\n".join(lines).encode("utf-8")
+
+
+def _serialize_keys(keys: list, active: int = -1) -> bytes:
+    return ";".join(["2", str(len(keys)), str(active)] + list(keys)).encode("utf-8")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately, with Nagle's algorithm the body would
+    # wait for the delayed ACK of the client (~40 ms per request on Linux)
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass  # keep benchmark output readable
+
+    def do_GET(self):
+        fake = self.server.fake
+        parts = urlsplit(self.path)
+        extension = parts.path.split("/MCWS/v1/", 1)[-1]
+        query = parse_qs(parts.query, keep_blank_values=True)
+        params = {key: values[-1] for key, values in query.items()}
+
+        gate = fake.holds.get(extension)
+        if gate is not None:
+            with fake.active_lock:
+                fake.held[extension] = fake.held.get(extension, 0) + 1
+            gate.wait()
+            with fake.active_lock:
+                fake.held[extension] -= 1
+
+        delay = fake.latency + (random.uniform(0, fake.jitter) if fake.jitter else 0)
+        # Handlers run on concurrent threads
+        with fake.active_lock:
+            fake.requests_served += 1
+            fake.active += 1
+            if fake.capacity and fake.active > fake.capacity:
+                delay *= fake.active / float(fake.capacity)
+        try:
+            if delay > 0:
+                time.sleep(delay)
+        finally:
+            with fake.active_lock:
+                fake.active -= 1
+        if fake.error_rate and random.random() < fake.error_rate:
+            return self._send(503, b"Injected failure")
+
+        handler = getattr(self, "handle_" + extension.replace("/", "_"), None)
+        if handler is None:
+            return self._send(404, b"Unknown endpoint " + extension.encode("utf-8"))
+        with fake.library.lock:
+            result = handler(fake.library, params)
+        if isinstance(result, tuple):
+            self._send(*result)
+        else:
+            self._send(200, result)
+
+    def _send(self, status: int, body: bytes, content_type: str = "text/xml"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        bandwidth = self.server.fake.bandwidth
+        if not bandwidth:
+            self.wfile.write(body)
+            return
+        chunk = max(1024, int(bandwidth / 20))
+        for i in range(0, len(body), chunk):
+            self.wfile.write(body[i : i + chunk])
+            time.sleep(len(body[i : i + chunk]) / float(bandwidth))
+
+    # General
+
+    def handle_Alive(self, library, params):
+        return _response(
+            [
+                ("RuntimeGUID", "{00000000-FAKE}"),
+                ("LibraryVersion", "24"),
+                ("ProgramName", "JRiver Media Center"),
+                ("ProgramVersion", "31.0.0"),
+                ("FriendlyName", "pymcws fake server"),
+                ("AccessKey", "localhost"),
+            ]
+        )
+
+    # Library
+
+    def handle_Library_List(self, library, params):
+        return _response(
+            [
+                ("NumberOfLibraries", "1"),
+                ("DefaultLibrary", "0"),
+                ("Library0", "Test"),
+                ("Library0Loaded", "1"),
+                ("Library0Path", "C:\\Library\\Test\\"),
+            ]
+        )
+
+    def handle_Library_Fields(self, library, params):
+        return fields_xml(library.field_definitions)
+
+    def handle_Library_Values(self, library, params):
+        fields = (params.get("Field") or "Artist").split(",")
+        source = library.search(params["Files"]) if params.get("Files") else library.items
+        values = set()
+        for item in source:
+            for field in fields:
+                for value in item.get(field, "").split(";"):
+                    if value:
+                        values.add(value)
+        values = sorted(values, key=str.lower)
+        if params.get("Filter"):
+            needle = params["Filter"].lower()
+            values = [value for value in values if needle in value.lower()]
+        if params.get("Limit"):
+            values = values[: int(params["Limit"])]
+        return _response([("", value) for value in values])
+
+    def handle_Library_CreateFile(self, library, params):
+        key = str(max(int(k) for k in library.by_key) + 1 if library.by_key else 0)
+        item = {"Key": key}
+        library.items.append(item)
+        library.by_key[key] = item
+        return _response([("Key", key)])
+
+    def handle_Library_CreateField(self, library, params):
+        library.field_definitions = list(library.field_definitions) + [
+            (params["Name"], params.get("Type", "String").title(), "Standard")
+        ]
+        return _response([])
+
+    # Files
+
+    def handle_Files_Search(self, library, params):
+        result = library.search(params.get("Query", ""))
+        if params.get("Shuffle") == "1":
+            random.shuffle(result)
+        action = params.get("Action", "MPL")
+        if action == "MPL":
+            fields = params["Fields"].split(",") if params.get("Fields") else None
+            return mpl_from_items(result, fields)
+        if action == "Serialize":
+            return _serialize_keys([item["Key"] for item in result])
+        if action == "Play":
+            state = library.zone(params)
+            state["Playlist"] = [item["Key"] for item in result]
+            state["Index"] = 0 if result else -1
+            state["State"] = 2 if result else 0
+            return _response([])
+        return 400, b"Unsupported action " + action.encode("utf-8")
+
+    # Playlists
+
+    def handle_Playlists_List(self, library, params):
+        lines = ['<?xml version="1.0" encoding="UTF-8" standalone="yes" ?>']
+        lines.append('<Response Status="OK">')
+        for playlist in library.playlists:
+            lines.append("<Item>")
+            for name in ("ID", "Name", "Path", "Type"):
+                value = escape(playlist[name])
+                lines.append("<Field Name=" + quoteattr(name) + ">" + value + "</Field>")
+            lines.append("</Item>")
+        lines.append("</Response>")
+        return "\n".join(lines).encode("utf-8")
+
+    def handle_Playlist_Files(self, library, params):
+        playlist = library.playlist(params)
+        if playlist is None or "Keys" not in playlist:
+            return 500, _response([], status="Failure")
+        if params.get("Action", "MPL") == "Serialize":
+            return _serialize_keys(playlist["Keys"])
+        fields = params["Fields"].split(",") if params.get("Fields") else None
+        return mpl_from_items([library.by_key[key] for key in playlist["Keys"]], fields)
+
+    # File
+
+    def handle_File_SetInfo(self, library, params):
+        item = library.by_key.get(params.get("File"))
+        if item is None or not params.get("Field"):
+            return 500, _response([], status="Failure")
+        if params.get("List") == "CSV":
+            fields = next(csv.reader([params["Field"]]))
+            values = next(csv.reader([params["Value"]]))
+        else:
+            fields = [params["Field"]]
+            values = [params["Value"]]
+        for field, value in zip(fields, values):
+            if len(value) > 1 and value[0] == '"' and value[-1] == '"':
+                value = value[1:-1]
+            item[field] = value
+        return _response([])
+
+    def handle_File_GetImage(self, library, params):
+        if params.get("FileType") == "Key" and params.get("File") not in library.by_key:
+            return 500, b""
+        return 200, IMAGE_BYTES, "image/jpeg"
+
+    # Playback
+
+    def handle_Playback_Zones(self, library, params):
+        values = [("NumberZones", len(library.zones)), ("CurrentZoneID", "0")]
+        for i, zone in enumerate(library.zones):
+            values.append(("ZoneID" + str(i), zone["ID"]))
+            values.append(("ZoneName" + str(i), zone["Name"]))
+            values.append(("ZoneGUID" + str(i), zone["GUID"]))
+            values.append(("ZoneDLNA" + str(i), zone["DLNA"]))
+        return _response(values)
+
+    def handle_Playback_Info(self, library, params):
+        state = library.zone(params)
+        values = [
+            ("ZoneID", "0"),
+            ("State", state["State"]),
+            ("FileKey", -1),
+            ("NextFileKey", -1),
+            ("PositionMS", state["Position"]),
+            ("DurationMS", 0),
+            ("Volume", state["Volume"]),
+            ("VolumeDisplay", "Muted" if state["Mute"] else str(int(state["Volume"] * 100)) + "%"),
+            ("PlayingNowPosition", state["Index"]),
+            ("PlayingNowTracks", len(state["Playlist"])),
+        ]
+        if 0 <= state["Index"] < len(state["Playlist"]):
+            item = library.by_key[state["Playlist"][state["Index"]]]
+            values[2] = ("FileKey", item["Key"])
+            if state["Index"] + 1 < len(state["Playlist"]):
+                values[3] = ("NextFileKey", state["Playlist"][state["Index"] + 1])
+            values.append(("Artist", item.get("Artist", "")))
+            values.append(("Album", item.get("Album", "")))
+            values.append(("Name", item.get("Name", "")))
+        return _response(values)
+
+    def _command(self, library, params, new_state):
+        state = library.zone(params)
+        if new_state is not None:
+            state["State"] = new_state
+        return _response([])
+
+    def handle_Playback_Play(self, library, params):
+        return self._command(library, params, 2)
+
+    def handle_Playback_Pause(self, library, params):
+        return self._command(library, params, 1)
+
+    def handle_Playback_PlayPause(self, library, params):
+        state = library.zone(params)
+        state["State"] = 1 if state["State"] == 2 else 2
+        return _response([])
+
+    def handle_Playback_Stop(self, library, params):
+        return self._command(library, params, 0)
+
+    def handle_Playback_StopAll(self, library, params):
+        for state in library.zone_state.values():
+            state["State"] = 0
+        return _response([])
+
+    def handle_Playback_Next(self, library, params):
+        state = library.zone(params)
+        state["Index"] = min(state["Index"] + 1, len(state["Playlist"]) - 1)
+        return _response([])
+
+    def handle_Playback_Previous(self, library, params):
+        state = library.zone(params)
+        state["Index"] = max(state["Index"] - 1, 0 if state["Playlist"] else -1)
+        return _response([])
+
+    def handle_Playback_Volume(self, library, params):
+        state = library.zone(params)
+        if params.get("Level") is not None:
+            level = float(params["Level"])
+            if params.get("Relative") == "1":
+                level += state["Volume"]
+            state["Volume"] = round(min(max(level, 0.0), 1.0), 6)
+        return _response(
+            [("Level", state["Volume"]), ("Display", str(int(state["Volume"] * 100)) + "%")]
+        )
+
+    def handle_Playback_Position(self, library, params):
+        state = library.zone(params)
+        if params.get("Position") is not None:
+            position = int(params["Position"])
+            relative = int(params.get("Relative") or 0)
+            state["Position"] = max(state["Position"] + relative * position, 0) if relative else position
+        return _response([("Position", state["Position"])])
+
+    def handle_Playback_Mute(self, library, params):
+        state = library.zone(params)
+        if params.get("Set") is not None:
+            state["Mute"] = params["Set"] == "1"
+        return _response([("State", "1" if state["Mute"] else "0")])
+
+    def handle_Playback_Repeat(self, library, params):
+        state = library.zone(params)
+        if params.get("Mode"):
+            state["Repeat"] = params["Mode"]
+        return _response([("Mode", state["Repeat"])])
+
+    def handle_Playback_Shuffle(self, library, params):
+        state = library.zone(params)
+        if params.get("Mode") and params["Mode"] != "Reshuffle":
+            state["Shuffle"] = params["Mode"]
+        return _response([("Mode", state["Shuffle"])])
+
+    def handle_Playback_Playlist(self, library, params):
+        state = library.zone(params)
+        playlist = [library.by_key[key] for key in state["Playlist"] if key in library.by_key]
+        if params.get("Action", "MPL") == "Serialize":
+            return _serialize_keys(state["Playlist"], state["Index"])
+        fields = params["Fields"].split(",") if params.get("Fields") else None
+        return mpl_from_items(playlist, fields)
+
+    def handle_Playback_SetPlayList(self, library, params):
+        values = params.get("Playlist", "").split(";")
+        if len(values) < 3 or values[0] != "2":
+            return 500, _response([], status="Failure")
+        state = library.zone(params)
+        state["Playlist"] = [key for key in values[3:] if key]
+        state["Index"] = int(values[2])
+        return _response([])
+
+    def handle_Playback_PlayByKey(self, library, params):
+        state = library.zone(params)
+        keys = [key for key in params.get("Key", "").split(",") if key]
+        location = params.get("Location", "Start")
+        if location == "End":
+            state["Playlist"].extend(keys)
+        elif location == "Start":
+            state["Playlist"][0:0] = keys
+            if state["Index"] >= 0:
+                state["Index"] += len(keys)
+        elif location == "Next":
+            state["Playlist"][state["Index"] + 1 : state["Index"] + 1] = keys
+        else:
+            position = int(location)
+            state["Playlist"][position:position] = keys
+            if 0 <= position <= state["Index"]:
+                state["Index"] += len(keys)
+        return _response([])
+
+    def handle_Playback_LoadDSPPreset(self, library, params):
+        return _response([])
+
+
+class FakeMCWSServer:
+    """Runs a fake MCWS instance on a background thread.
+
+    library:    The SyntheticLibrary to serve.
+    port:       Port to bind to, 0 picks a free port.
+    latency:    Fixed delay in seconds added to each request.
+    jitter:     Upper bound in seconds of a uniformly distributed extra delay.
+    error_rate: Probability (0..1) that a request fails with HTTP 503.
+    bandwidth:  Bytes per second for response bodies, None for unlimited.
+    capacity:   Number of requests served concurrently at full speed. With more
+                requests in flight, the delay grows proportionally, like an overloaded
+                server. None for unlimited.
+    """
+
+    def __init__(
+        self,
+        library: SyntheticLibrary = None,
+        port: int = 0,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        bandwidth: float = None,
+        capacity: int = None,
+    ):
+        self.library = library if library is not None else SyntheticLibrary()
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.bandwidth = bandwidth
+        self.capacity = capacity
+        self.requests_served = 0
+        self.active = 0
+        self.active_lock = threading.Lock()
+        # Requests to these extensions wait for the event, see hold()
+        self.holds = {}
+        self.held = {}
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.fake = self
+        self.thread = None
+
+    @property
+    def port(self) -> int:
+        return self.httpd.server_address[1]
+
+    def hold(self, extension: str) -> threading.Event:
+        """Makes requests to extension wait until the returned event is set.
+
+        held[extension] counts the requests currently waiting, so tests can tell
+        which requests are in progress without depending on latency.
+        """
+        event = threading.Event()
+        with self.active_lock:
+            self.holds[extension] = event
+            self.held.setdefault(extension, 0)
+        return event
+
+    def release(self, extension: str):
+        """Lets held and later requests to extension through."""
+        with self.active_lock:
+            event = self.holds.pop(extension, None)
+        if event is not None:
+            event.set()
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self.thread is not None:
+            self.thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def media_server(self, api: bool = True):
+        """Returns a pymcws media server that is connected to this fake instance."""
+        from pymcws.media_server import MediaServer, ApiMediaServer
+
+        server_class = ApiMediaServer if api else MediaServer
+        return server_class("localhost:" + str(self.port), "test", "test")
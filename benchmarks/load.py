@@ -0,0 +1,156 @@
+""" Load driver measuring pymcws client throughput against the fake MCWS server.
+
+    Runs a mix of playback, search and tagging operations in a single thread (sync)
+    and from a thread pool (concurrent) and reports throughput and latency percentiles.
+
+    Usage:
+        python -m benchmarks.load --files 20000 --operations 500 --threads 8
+        python -m benchmarks.load --latency 0.01 --jitter 0.02 --error-rate 0.01
+        python -m benchmarks.load --latency 0.01 --capacity 4 --threads 32 --adaptive
+"""
+import argparse
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from benchmarks.fake_server import FakeMCWSServer, SyntheticLibrary
+from pymcws.limiter import AdaptiveLimiter
+
+
+def percentile(values: list, fraction: float) -> float:
+    """Returns the given percentile (0..1) of a list of values using nearest rank."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))
+    return ordered[index]
+
+
+def default_operations(server, rng: random.Random):
+    """Returns a weighted list of callables that exercise the client."""
+    zones = server.playback.zones()
+
+    def info():
+        server.playback.info(rng.choice(zones))
+
+    def volume():
+        server.playback.volume(rng.random(), zone=rng.choice(zones))
+
+    def search_album():
+        server.files.search(
+            "[Album]=[Album " + str(rng.randrange(2000)) + "]",
+            fields=["Name", "Artist", "Album", "Track #", "Duration"],
+        )
+
+    def values():
+        server.library.values(field="Artist", limit=50)
+
+    def set_info():
+        files = server.files.search("[Album]=[Album " + str(rng.randrange(2000)) + "]")
+        if files:
+            files[0]["Comment"] = "Load test " + str(rng.randrange(1000))
+            server.file.set_info(files[0])
+
+    return [info] * 5 + [volume] * 2 + [search_album] * 2 + [values, set_info]
+
+
+def run_mode(server, operations: list, count: int, threads: int, seed: int) -> dict:
+    """Runs count random operations with the given number of threads."""
+    rng = random.Random(seed)
+    plan = [rng.choice(operations) for _ in range(count)]
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+
+    def timed(operation):
+        start = time.perf_counter()
+        try:
+            operation()
+        except Exception:
+            with lock:
+                errors[0] += 1
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    if threads <= 1:
+        for operation in plan:
+            timed(operation)
+    else:
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            list(pool.map(timed, plan))
+    elapsed = time.perf_counter() - start
+    return {
+        "operations": count,
+        "errors": errors[0],
+        "elapsed_s": elapsed,
+        "throughput_ops": count / elapsed if elapsed > 0 else 0.0,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p90_ms": percentile(latencies, 0.90) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "max_ms": max(latencies) * 1000 if latencies else 0.0,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1].strip())
+    parser.add_argument("--files", type=int, default=10000, help="library size")
+    parser.add_argument("--operations", type=int, default=300)
+    parser.add_argument("--threads", type=int, default=8, help="threads in concurrent mode")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds per request")
+    parser.add_argument("--jitter", type=float, default=0.0, help="max extra seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--bandwidth", type=float, default=None, help="bytes per second")
+    parser.add_argument("--capacity", type=int, default=None, help="server capacity")
+    parser.add_argument(
+        "--adaptive", action="store_true", help="use an AdaptiveLimiter in the client"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    library = SyntheticLibrary(args.files, seed=args.seed)
+    with FakeMCWSServer(
+        library,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        bandwidth=args.bandwidth,
+        capacity=args.capacity,
+    ) as fake:
+        server = fake.media_server()
+        if args.adaptive:
+            server.limiter = AdaptiveLimiter()
+        operations = default_operations(server, random.Random(args.seed))
+        results = {
+            "sync": run_mode(server, operations, args.operations, 1, args.seed),
+            "concurrent": run_mode(
+                server, operations, args.operations, args.threads, args.seed
+            ),
+        }
+        server.session.close()
+
+    if args.adaptive:
+        print("limiter:", server.limiter.stats())
+    print(
+        "{:<11} {:>6} {:>6} {:>9} {:>9} {:>9} {:>9} {:>9}".format(
+            "mode", "ops", "errors", "ops/s", "p50 ms", "p90 ms", "p99 ms", "max ms"
+        )
+    )
+    for mode, result in results.items():
+        print(
+            "{:<11} {:>6} {:>6} {:>9.1f} {:>9.2f} {:>9.2f} {:>9.2f} {:>9.2f}".format(
+                mode,
+                result["operations"],
+                result["errors"],
+                result["throughput_ops"],
+                result["p50_ms"],
+                result["p90_ms"],
+                result["p99_ms"],
+                result["max_ms"],
+            )
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
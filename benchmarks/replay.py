@@ -0,0 +1,71 @@
+""" Replays a recorded MCWS archive through pymcws and reports timings.
+
+    Archives are recorded with pymcws.transport.RecordingTransport. Every recorded request
+    is sent again through MediaServer.send_request, answered by the ReplayTransport, and
+    MPL responses are decoded like files.search does, so parsing and client features can be
+    benchmarked against production-shaped data without a JRiver instance.
+
+    Usage:
+        python -m benchmarks.replay office.jsonl.gz --scale 0
+        python -m benchmarks.replay office.jsonl.gz --scale 1.0 --threads 8
+"""
+import argparse
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl
+from pymcws.media_server import MediaServer
+from pymcws.transport import ReplayTransport
+from pymcws.utils import transform_mpl_response
+from benchmarks.load import percentile
+
+
+def replay(path: str, scale: float = 0.0, threads: int = 1) -> dict:
+    """Replays all requests of an archive and returns timing statistics."""
+    server = MediaServer("localhost", None, None)
+    server.transport = ReplayTransport(path, scale)
+    requests = [
+        (entry["path"], dict(parse_qsl(entry["params"], keep_blank_values=True)))
+        for entry in server.transport.entries
+    ]
+    latencies = []
+    decoded_files = [0]
+
+    def send(request):
+        extension, payload = request
+        start = time.perf_counter()
+        response = server.send_request(extension, payload)
+        if payload.get("Action", None) == "MPL":
+            decoded_files[0] += len(transform_mpl_response(server, response))
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    if threads <= 1:
+        for request in requests:
+            send(request)
+    else:
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            list(pool.map(send, requests))
+    elapsed = time.perf_counter() - start
+    return {
+        "requests": len(requests),
+        "decoded_files": decoded_files[0],
+        "elapsed_s": elapsed,
+        "p50_ms": percentile(latencies, 0.5) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1].strip())
+    parser.add_argument("archive", help="archive written by RecordingTransport")
+    parser.add_argument("--scale", type=float, default=0.0, help="timing scale factor")
+    parser.add_argument("--threads", type=int, default=1)
+    args = parser.parse_args(argv)
+    for name, value in replay(args.archive, args.scale, args.threads).items():
+        print("    {:<14} {:>12.3f}".format(name, value))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
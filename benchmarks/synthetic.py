@@ -0,0 +1,187 @@
+""" Generators for synthetic MCWS responses.
+
+    The generated XML mimics what MCWS returns for Library/Fields, Files/Search (MPL)
+    and the unstructured Item responses like Playback/Info, so that parsing and decoding
+    can be measured without a JRiver instance.
+"""
+import random
+from xml.sax.saxutils import escape, quoteattr
+from pymcws.api.library import fields as lib_fields
+
+# Name, DataType, EditType. Key is added by pymcws itself.
+DEFAULT_FIELDS = [
+    ("Filename", "Path", "Filename"),
+    ("Name", "String", "Standard"),
+    ("Artist", "String", "Standard"),
+    ("Album Artist", "String", "Standard"),
+    ("Album", "String", "Standard"),
+    ("Genre", "List", "Standard"),
+    ("Keywords", "List", "Standard"),
+    ("Media Type", "String", "Standard"),
+    ("Track #", "Integer", "Standard"),
+    ("Disc #", "Integer", "Standard"),
+    ("Date", "Date (float)", "Standard"),
+    ("Date Imported", "Date", "Standard"),
+    ("Last Played", "Date", "Standard"),
+    ("Duration", "Time", "Standard"),
+    ("Rating", "Integer", "Standard"),
+    ("Number Plays", "Integer", "Standard"),
+    ("Bitrate", "Integer", "Not editable"),
+    ("File Size", "File Size", "Not editable"),
+    ("Replay Gain", "Decimal", "Standard"),
+    ("Comment", "String", "Standard"),
+]
+
+
+class FakeResponse:
+    """Minimal stand-in for requests.Response, sufficient for the pymcws transformers."""
+
+    def __init__(self, content: bytes, status_code: int = 200):
+        self.content = content
+        self.status_code = status_code
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8")
+
+    def iter_content(self, chunk_size: int = 1):
+        for i in range(0, len(self.content), chunk_size):
+            yield self.content[i : i + chunk_size]
+
+    def close(self):
+        pass
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError("Synthetic response has status " + str(self.status_code))
+
+
+class SyntheticServer:
+    """Offline media server that answers Library/Fields from the synthetic field list.
+
+    Only implements what decoding needs: send_request for Library/Fields and the
+    lazily loaded fields property.
+    """
+
+    def __init__(self, field_definitions: list = None):
+        self.field_definitions = field_definitions or DEFAULT_FIELDS
+        self.__fields = None
+
+    @property
+    def fields(self):
+        if self.__fields is None:
+            self.__fields = lib_fields(self)
+        return self.__fields
+
+    def send_request(self, extension: str, payload=None):
+        if extension == "Library/Fields":
+            return FakeResponse(fields_xml(self.field_definitions))
+        raise ValueError("Unsupported endpoint for SyntheticServer: " + extension)
+
+
+def fields_xml(field_definitions: list = None, extra_fields: int = 0) -> bytes:
+    """Returns a Library/Fields response for the given field definitions.
+
+    extra_fields: Number of additional custom string fields to append.
+    """
+    field_definitions = list(field_definitions or DEFAULT_FIELDS)
+    for i in range(extra_fields):
+        field_definitions.append(("Custom " + str(i), "String", "Standard"))
+    lines = ['<?xml version="1.0" encoding="UTF-8" standalone="yes" ?>']
+    lines.append('<Response Status="OK">')
+    for name, data_type, edit_type in field_definitions:
+        lines.append(
+            "<Field Name="
+            + quoteattr(name)
+            + " DataType="
+            + quoteattr(data_type)
+            + " EditType="
+            + quoteattr(edit_type)
+            + " DisplayName="
+            + quoteattr(name)
+            + "/>"
+        )
+    lines.append("</Response>")
+    return "\n".join(lines).encode("utf-8")
+
+
+def _value(rng: random.Random, key: int, name: str, data_type: str) -> str:
+    """Returns a plausible jriver-encoded value for a field."""
+    if name == "Filename":
+        return (
+            "D:\\Music\\Artist "
+            + str(key % 500)
+            + "\\Album "
+            + str(key % 2000)
+            + "\\"
+            + str(key)
+            + ".flac"
+        )
+    if name in ("Artist", "Album Artist"):
+        return "Artist " + str(rng.randrange(500))
+    if name == "Album":
+        return "Album " + str(rng.randrange(2000))
+    if name == "Media Type":
+        return rng.choice(["Audio", "Audio", "Audio", "Video", "Image"])
+    if data_type == "List":
+        return ";".join("Genre " + str(rng.randrange(40)) for _ in range(rng.randint(1, 3)))
+    if data_type in ("Integer", "File Size"):
+        return str(rng.randrange(1, 40000000 if data_type == "File Size" else 500))
+    if data_type == "Date (float)":
+        return str(rng.uniform(25000, 45000))
+    if data_type == "Date":
+        return str(rng.randrange(946684800, 1700000000))
+    if data_type in ("Time", "Decimal", "Percentage"):
+        # JRiver uses the locale of the server, commas are common
+        return ("%.6f" % rng.uniform(0, 600)).replace(".", ",")
+    return name + " " + str(rng.randrange(100000))
+
+
+def items(n_files: int, field_definitions: list = None, seed: int = 0) -> list:
+    """Returns n_files synthetic library items as dictionaries of jriver-encoded strings."""
+    field_definitions = field_definitions or DEFAULT_FIELDS
+    rng = random.Random(seed)
+    result = []
+    for key in range(n_files):
+        item = {"Key": str(key)}
+        for name, data_type, edit_type in field_definitions:
+            item[name] = _value(rng, key, name, data_type)
+        result.append(item)
+    return result
+
+
+def mpl_from_items(library_items: list, field_names: list = None) -> bytes:
+    """Serializes library items into an MPL response.
+
+    field_names: Restricts the output to these fields (Key is always included).
+    """
+    parts = ['<?xml version="1.0" encoding="UTF-8" standalone="yes" ?>\n']
+    parts.append('<MPL Version="2.0" Title="MCWS - Files - 0" PathSeparator="\\">\n')
+    for item in library_items:
+        parts.append("<Item>\n")
+        for name, value in item.items():
+            if field_names is not None and name != "Key" and name not in field_names:
+                continue
+            parts.append(
+                "<Field Name=" + quoteattr(name) + ">" + escape(value) + "</Field>\n"
+            )
+        parts.append("</Item>\n")
+    parts.append("</MPL>\n")
+    return "".join(parts).encode("utf-8")
+
+
+def mpl_xml(n_files: int, field_definitions: list = None, seed: int = 0) -> bytes:
+    """Returns an MPL response as produced by Files/Search with n_files items."""
+    return mpl_from_items(items(n_files, field_definitions, seed))
+
+
+def info_xml(n_items: int = 30, seed: int = 0) -> bytes:
+    """Returns an unstructured response like Playback/Info with n_items entries."""
+    rng = random.Random(seed)
+    lines = ['<?xml version="1.0" encoding="UTF-8" standalone="yes" ?>']
+    lines.append('<Response Status="OK">')
+    for i in range(n_items):
+        value = str(rng.randrange(1000)) if i % 2 else "Value " + str(i)
+        lines.append('<Item Name="Item' + str(i) + '">' + value + "</Item>")
+    lines.append("</Response>")
+    return "\n".join(lines).encode("utf-8")
@@ -1,28 +1,66 @@
-from pymcws.media_server import MediaServer, ApiMediaServer
-from pymcws.model import Zone, MediaFile
-from pymcws.api import alive
-import pymcws.api.library as library
-import pymcws.api.playback as playback
-import pymcws.api.file as file
-import pymcws.api.files as files
-import pymcws.api.recipes as recipes
+""" pymcws is imported lazily: submodules like pymcws.playback, as well as the classes
+    exported here, are only loaded on first access. This keeps 'import pymcws' cheap for
+    short-lived scripts that only send a single command.
+"""
+import importlib
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from pymcws.media_server import MediaServer, ApiMediaServer
+
+# Attributes of this package mapped to the module and name they are loaded from
+_LAZY_ATTRIBUTES = {
+    "MediaServer": ("pymcws.media_server", "MediaServer"),
+    "ApiMediaServer": ("pymcws.media_server", "ApiMediaServer"),
+    "Zone": ("pymcws.model", "Zone"),
+    "MediaFile": ("pymcws.model", "MediaFile"),
+    "ZoneSnapshot": ("pymcws.model", "ZoneSnapshot"),
+    "alive": ("pymcws.api", "alive"),
+    "library": ("pymcws.api.library", None),
+    "playback": ("pymcws.api.playback", None),
+    "file": ("pymcws.api.file", None),
+    "files": ("pymcws.api.files", None),
+    "playlists": ("pymcws.api.playlists", None),
+    "PlaylistCatalogue": ("pymcws.catalogue", "PlaylistCatalogue"),
+    "recipes": ("pymcws.api.recipes", None),
+}
+
+
+def __getattr__(name: str):
+    target = _LAZY_ATTRIBUTES.get(name, None)
+    if target is None:
+        raise AttributeError("module 'pymcws' has no attribute '" + name + "'")
+    module = importlib.import_module(target[0])
+    value = module if target[1] is None else getattr(module, target[1])
+    globals()[name] = value  # cache, so __getattr__ is not called again
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY_ATTRIBUTES))
 
 
 def get_media_server_light(
     access_key: str, username: str, password: str
-) -> MediaServer:
+) -> "MediaServer":
     """Returns an instance of media server with the given parameters.
 
     This is mainly syntactical sugar for people that only want to import pymcws
     and be done with it.
     """
+    from pymcws.media_server import MediaServer
+
     return MediaServer(access_key, username, password)
 
 
-def get_media_server(access_key: str, username: str, password: str) -> ApiMediaServer:
+def get_media_server(
+    access_key: str, username: str, password: str
+) -> "ApiMediaServer":
     """Returns an instance of media server with the given parameters.
 
     This is mainly syntactical sugar for people that only want to import pymcws
     and be done with it.
     """
+    from pymcws.media_server import ApiMediaServer
+
     return ApiMediaServer(access_key, username, password)
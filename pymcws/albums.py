@@ -0,0 +1,232 @@
+""" A local index of the albums of a media server.
+
+    Looking up an album with a search costs a full Files/Search on the server.
+    AlbumIndex retrieves the fields needed to identify and order album tracks once,
+    for the whole library, and keeps the files of each album sorted by disc and track.
+    Assigned to MediaServer.album_index, it serves recipes.query_album() and
+    recipes.play_album() without searching:
+
+        server.album_index = AlbumIndex(server)
+        files = server.recipes.query_album("Ludovico Einaudi", "I Giorni")
+
+    The index is refreshed incrementally when it is older than max_age: only the keys
+    of the library are compared, and only new files are retrieved. Tag changes are
+    not detected this way; call update() with edited files, or load() to rebuild.
+    Other threads keep being served from the current index during a refresh.
+"""
+import threading
+import time
+from pymcws.api.files import iter_search, search_keys
+
+# Fields needed to group and order album tracks. Key is always included.
+INDEX_FIELDS = ["Album Artist", "Album", "Disc #", "Track #"]
+
+
+def _number(file, field: str) -> int:
+    value = file.get(field, None)
+    return value if isinstance(value, int) else 0
+
+
+class Album:
+    """The files of one album, in disc and track order."""
+
+    def __init__(self, album_artist: str, album: str):
+        self.album_artist = album_artist
+        self.album = album
+        # Replaced on every change, so readers never see a dictionary being changed
+        self.__files = {}
+        self.__sorted = (None, None)
+
+    def __len__(self):
+        return len(self.__files)
+
+    @property
+    def files(self) -> list:
+        """The files of the album, sorted by disc, track and key.
+
+        The files are shared with the index, AlbumIndex.files() returns copies.
+        """
+        files = self.__files
+        sorted_for, result = self.__sorted
+        if sorted_for is not files:
+            result = sorted(
+                files.values(),
+                key=lambda f: (_number(f, "Disc #"), _number(f, "Track #"), f["Key"]),
+            )
+            self.__sorted = (files, result)
+        return result
+
+    @property
+    def keys(self) -> list[int]:
+        """The keys of the album files, sorted like files."""
+        return [file["Key"] for file in self.files]
+
+    def add(self, file):
+        files = dict(self.__files)
+        files[file["Key"]] = file
+        self.__files = files
+
+    def remove(self, key: int):
+        files = dict(self.__files)
+        files.pop(key, None)
+        self.__files = files
+
+    def __repr__(self):
+        return "Album({}, {}, {} files)".format(
+            self.album_artist, self.album, len(self)
+        )
+
+
+class AlbumIndex:
+    """Groups the files of a media server by album artist and album."""
+
+    def __init__(
+        self,
+        media_server,
+        query: str = "[Media Type]=[Audio]",
+        fields: list[str] = None,
+        max_age: float = 300.0,
+        load: bool = True,
+    ):
+        """query:   Files to include in the index.
+        fields:  Additional fields to retrieve. The files returned by the index only
+                 contain these and the fields in INDEX_FIELDS.
+        max_age: Seconds after which lookups refresh the index first, None to never
+                 refresh automatically.
+        load:    Load the index now, otherwise on first use.
+        """
+        self.media_server = media_server
+        self.query = query
+        self.fields = INDEX_FIELDS + [f for f in fields or [] if f not in INDEX_FIELDS]
+        self.max_age = max_age
+        # Guards the index, never held during requests
+        self.lock = threading.RLock()
+        self.refreshed = None
+        self.__refresh_lock = threading.Lock()
+        self.__albums = {}
+        self.__by_key = {}
+        if load:
+            self.load()
+
+    def __len__(self):
+        with self.lock:
+            return len(self.__albums)
+
+    def load(self):
+        """Rebuilds the index with one search for all files."""
+        with self.__refresh_lock:
+            self.__load()
+
+    def refresh(self) -> tuple:
+        """Adds new files and removes deleted ones. Returns their numbers."""
+        with self.__refresh_lock:
+            return self.__refresh()
+
+    def update(self, files: list):
+        """Moves edited files to their current album."""
+        with self.lock:
+            for file in files:
+                if file["Key"] in self.__by_key:
+                    self.__remove(file["Key"])
+                self.__add(file.copy(), self.__albums, self.__by_key)
+
+    def albums(self, album_artist: str = None) -> list[Album]:
+        """Returns all albums, or those of an album artist."""
+        self.__check_age()
+        with self.lock:
+            albums = list(self.__albums.values())
+        if album_artist is None:
+            return albums
+        folded = album_artist.casefold()
+        return [a for a in albums if (a.album_artist or "").casefold() == folded]
+
+    def album(self, album_artist: str, album: str) -> Album:
+        """Returns an album, matched case-insensitively, or None."""
+        self.__check_age()
+        with self.lock:
+            return self.__albums.get(self.__album_key(album_artist, album), None)
+
+    def files(self, album_artist: str, album: str) -> list:
+        """Returns copies of the files of an album in disc and track order, [] if
+        unknown.
+        """
+        found = self.album(album_artist, album)
+        return [] if found is None else [file.copy() for file in found.files]
+
+    def keys(self, album_artist: str, album: str) -> list[int]:
+        """Returns the keys of an album in disc and track order, [] if unknown."""
+        found = self.album(album_artist, album)
+        return [] if found is None else found.keys
+
+    def __check_age(self):
+        if self.refreshed is None:
+            # Nothing to serve yet, wait for the first load
+            with self.__refresh_lock:
+                if self.refreshed is None:
+                    self.__load()
+        elif self.max_age is not None:
+            if time.monotonic() - self.refreshed > self.max_age:
+                # Serve the current index if another thread is refreshing it already
+                if self.__refresh_lock.acquire(blocking=False):
+                    try:
+                        self.__refresh()
+                    finally:
+                        self.__refresh_lock.release()
+
+    def __load(self):
+        # Called with the refresh lock held
+        albums = {}
+        by_key = {}
+        for file in iter_search(self.media_server, self.query, self.fields):
+            self.__add(file, albums, by_key)
+        with self.lock:
+            self.__albums = albums
+            self.__by_key = by_key
+            self.refreshed = time.monotonic()
+
+    def __refresh(self) -> tuple:
+        # Called with the refresh lock held. Requests are sent without holding
+        # self.lock, the changes are applied under it at the end.
+        if self.refreshed is None:
+            self.__load()
+            return len(self.__by_key), 0
+        keys = set(search_keys(self.media_server, self.query))
+        with self.lock:
+            known = set(self.__by_key)
+        removed = known.difference(keys)
+        added = keys.difference(known)
+        files = []
+        if added:
+            # New files usually have the highest keys, so a range finds them cheaply
+            query = self.query + " [Key]={}-{}".format(min(added), max(added))
+            for file in iter_search(self.media_server, query, self.fields):
+                if file["Key"] in added:
+                    files.append(file)
+        with self.lock:
+            for key in removed:
+                if key in self.__by_key:
+                    self.__remove(key)
+            for file in files:
+                if file["Key"] not in self.__by_key:
+                    self.__add(file, self.__albums, self.__by_key)
+            self.refreshed = time.monotonic()
+        return len(added), len(removed)
+
+    def __album_key(self, album_artist: str, album: str) -> tuple:
+        return ((album_artist or "").casefold(), (album or "").casefold())
+
+    def __add(self, file, albums: dict, by_key: dict):
+        key = self.__album_key(file.get("Album Artist"), file.get("Album"))
+        album = albums.get(key, None)
+        if album is None:
+            album = Album(file.get("Album Artist"), file.get("Album"))
+            albums[key] = album
+        album.add(file)
+        by_key[file["Key"]] = key
+
+    def __remove(self, file_key: int):
+        key = self.__by_key.pop(file_key)
+        album = self.__albums[key]
+        album.remove(file_key)
+        if not len(album):
+            del self.__albums[key]
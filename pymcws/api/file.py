@@ -1,4 +1,6 @@
 from pymcws.model import MediaFile
+from pymcws import tracing
+import time
 
 
 def set_info(
@@ -9,15 +11,32 @@ def set_info(
     changed = file.changed_fields  # use only changed fields
     if field_filter is not None:  # filter fields to save, if indicated
         changed = dict(filter(lambda elem: elem[0] in field_filter, changed.items()))
-    payload = {"File": file["Key"], "FileType": "Key"}
+    return set_values(media_server, file["Key"], changed)
+
+
+def set_values(media_server, key: int, changed: dict):
+    """Sets the given fields of the file with this key. None clears a field."""
+    payload = {"File": key, "FileType": "Key"}
     # print(changed)
     if len(changed) > 1:
         payload["List"] = "CSV"
     fields = ""
     values = ""
+    active_trace = tracing.current()
+    if active_trace is not None:
+        encode_start = time.perf_counter()
     for field in changed.keys():
         fields += field + ","
-        values += media_server.fields[field]["Encoder"](changed[field]) + ","
+        if active_trace is not None:
+            field_start = time.perf_counter()
+        value = changed[field]
+        if value is not None:
+            value = media_server.fields[field]["Encoder"](value)
+        values += (value or "") + ","
+        if active_trace is not None:
+            active_trace.add_field("encode", field, time.perf_counter() - field_start)
+    if active_trace is not None:
+        active_trace.add("encode", time.perf_counter() - encode_start)
 
     payload["Field"] = fields[:-1]
     payload["Value"] = values[:-1]
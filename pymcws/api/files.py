@@ -1,5 +1,5 @@
 from io import BytesIO
-from pymcws.utils import transform_mpl_response
+from pymcws.utils import transform_mpl_response, iter_mpl_response, parse_file_list
 from pymcws.model import MediaFile, Zone
 
 
@@ -92,3 +92,41 @@ def search(
         return response
     else:
         return transform_mpl_response(media_server, response)
+
+
+def search_keys(media_server, query: str) -> list[int]:
+    """Returns only the keys of the files matching the query, in query order.
+
+    This is much cheaper than a full search and useful to compare result sets.
+    """
+    payload = {"Action": "Serialize", "Query": query}
+    response = media_server.send_request("Files/Search", payload)
+    response.raise_for_status()
+    return parse_file_list(response.text)[0]
+
+
+def iter_search(
+    media_server,
+    query: str,
+    fields: list[str] = None,
+    no_local_filenames=False,
+    zone: Zone = None,
+):
+    """Searches files like search() with action 'MPL', but yields MediaFiles one at a time.
+
+    The response is streamed and parsed incrementally, so memory use stays bounded
+    regardless of the number of files returned. Use this to process whole libraries.
+    """
+    payload = {"Action": "MPL", "Query": query}
+    if zone is not None:
+        payload["Zone"] = zone.best_identifier()
+        payload["ZoneType"] = zone.best_identifier_type()
+    payload["NoLocalFilenames"] = "1" if no_local_filenames else "0"
+    if fields is not None:
+        payload["Fields"] = ",".join(fields)
+    response = media_server.send_request("Files/Search", payload, stream=True)
+    response.raise_for_status()
+    try:
+        yield from iter_mpl_response(media_server, response)
+    finally:
+        response.close()
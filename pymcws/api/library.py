@@ -3,11 +3,9 @@ from pymcws.utils import (
     transform_semistructured_response,
     transform_list_response,
     transform_unstructured_response,
-    parse_jriver_date,
-    serialize_jriver_date,
 )
+from pymcws.field_codecs import CODECS, IdentityCodec, codec_for
 import logging
-from datetime import datetime
 from xml.etree import ElementTree
 
 logger = logging.getLogger(__name__)
@@ -60,9 +58,10 @@ def fields(media_server):
     The result is a dictionary that contains the name of all known fields as
     keys, and corresponding information as a dictionary with the keys:
     'Name', 'DataType', 'EditType' (all as provided by MCWS) and
-    'Decoder' and 'Encoder', two lambda functions that can convert values for this field
-    between the jriver type and the correct python type. Decoding and encoding is done
-    automatically, so you only need to bother with these in special cases.
+    'Decoder' and 'Encoder', two functions that can convert values for this field
+    between the jriver type and the correct python type. They are picklable methods of
+    the codecs in pymcws.field_codecs. Decoding and encoding is done automatically,
+    so you only need to bother with these in special cases.
     """
 
     response = media_server.send_request("Library/Fields", {})
@@ -74,17 +73,19 @@ def fields(media_server):
         "Name": "Key",
         "DataType": "Integer",
         "EditType": "Not editable",
-        "Decoder": lambda x: int(x),
-        "Encoder": lambda x: str(x),
+        "Decoder": CODECS["Integer"].decode,
+        "Encoder": CODECS["Integer"].encode,
     }
     result["Date (readable)"] = {
         "Name": "Date (readable)",
         "DataType": "String",
         "EditType": "Not editable",
-        "Decoder": lambda x: x,
-        "Encoder": lambda x: x,
+        "Decoder": IdentityCodec().decode,
+        "Encoder": IdentityCodec().encode,
     }
 
+    # Path fields are translated if a pymcws.paths.PathMapper is installed
+    mapper = getattr(media_server, "path_mapper", None)
     root = ElementTree.fromstring(response.content)
     for item in root:
         name = item.attrib["Name"]
@@ -99,30 +100,10 @@ def fields(media_server):
         if expression is not None:
             result[name]["Expression"] = expression
 
-        if (
-            data_type == "String"
-            or data_type == "Path"
-            or data_type == "User"
-            or data_type == "Image File"
-        ):
-            result[name]["Decoder"] = lambda x: x
-            result[name]["Encoder"] = lambda x: '"' + x + '"'
-        elif data_type == "Integer" or data_type == "File Size":
-            result[name]["Decoder"] = lambda x: int(x)
-            result[name]["Encoder"] = lambda x: str(x)
-        elif data_type == "Date (float)":
-            result[name]["Decoder"] = lambda x: parse_jriver_date(x)
-            result[name]["Encoder"] = lambda x: serialize_jriver_date(x)
-        elif data_type == "Date":
-            result[name]["Decoder"] = lambda x: datetime.fromtimestamp(int(x))
-            result[name]["Encoder"] = lambda x: str(datetime.timestamp(x))
-        elif data_type == "List":
-            result[name]["Decoder"] = lambda x: x.split(";")
-            result[name]["Encoder"] = lambda x: '"' + ";".join(x) + '"'
-        elif data_type == "Decimal" or data_type == "Percentage" or data_type == "Time":
-            result[name]["Decoder"] = lambda x: float(x.replace(",", "."))
-            result[name]["Encoder"] = lambda x: str(x)
-        else:
+        codec = codec_for(data_type)
+        if mapper is not None and data_type == "Path":
+            codec = mapper.codec()
+        if codec is None:
             logger.warning(
                 "Unhandled data type found for field '"
                 + name
@@ -130,8 +111,9 @@ def fields(media_server):
                 + data_type
                 + ". Using identity to decode and encode."
             )
-            result[name]["Decoder"] = lambda x: x
-            result[name]["Encoder"] = lambda x: x
+            codec = IdentityCodec()
+        result[name]["Decoder"] = codec.decode
+        result[name]["Encoder"] = codec.encode
     return result
 
 
@@ -1,13 +1,26 @@
-from pymcws.model import Zone, MediaFile
+from pymcws.model import Zone, MediaFile, ZoneSnapshot
 from pymcws.utils import (
     transform_unstructured_response,
     serialize_file_list,
+    parse_file_list,
     transform_mpl_response,
 )
 import logging
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
 
 logger = logging.getLogger(__name__)
 
+# Number of keys sent per request when loading playlists. Larger playlists are split
+# into several requests to keep URLs within the limits of MCWS and proxies.
+MAX_PLAYLIST_KEYS = 500
+
+# Zone lists per server, see cached_zones()
+_zone_cache = weakref.WeakKeyDictionary()
+_zone_cache_lock = threading.Lock()
+
 
 def play(media_server, zone: Zone = Zone()):
     command(media_server, "Play", zone)
@@ -77,6 +90,71 @@ def zones(media_server, see_hidden: bool = False):
     return zones
 
 
+def cached_zones(media_server, see_hidden: bool = False, max_age: float = 60.0):
+    """Returns the zones of the server, requesting them at most once per max_age.
+
+    Zones rarely change, so this avoids a round trip before each zone-wise request.
+    """
+    now = time.monotonic()
+    with _zone_cache_lock:
+        entry = _zone_cache.get(media_server, {}).get(see_hidden, None)
+    if entry is not None and now - entry[0] < max_age:
+        return list(entry[1])
+    result = zones(media_server, see_hidden)
+    with _zone_cache_lock:
+        _zone_cache.setdefault(media_server, {})[see_hidden] = (now, result)
+    return list(result)
+
+
+def snapshot(
+    media_server,
+    zones: list[Zone] = None,
+    previous: dict = None,
+    max_workers: int = 8,
+) -> dict:
+    """Returns the playback state of several zones, requested concurrently.
+
+    zones:       The zones to include. Defaults to all zones, see cached_zones().
+    previous:    A snapshot returned earlier. If given, only zones whose state changed
+                 are returned. Without zones, zones that no longer exist map to None.
+    max_workers: Maximum number of concurrent requests.
+    returns:     A dictionary mapping zone ids to ZoneSnapshot objects.
+    """
+    # Zones missing from an explicit list were not requested, not removed
+    removals = zones is None and previous is not None
+    if zones is None:
+        zones = cached_zones(media_server)
+    if not zones:
+        return {zone_id: None for zone_id in previous} if removals else {}
+    workers = max(1, min(max_workers, 3 * len(zones)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        requests = [
+            (
+                zone,
+                pool.submit(info, media_server, zone),
+                pool.submit(repeat, media_server, None, zone),
+                pool.submit(shuffle, media_server, None, zone),
+            )
+            for zone in zones
+        ]
+        result = {
+            zone.id: ZoneSnapshot(zone, i.result(), r.result(), s.result())
+            for zone, i, r, s in requests
+        }
+    if previous is None:
+        return result
+    changed = {
+        zone_id: state
+        for zone_id, state in result.items()
+        if zone_id not in previous or state.changes(previous[zone_id])
+    }
+    if removals:
+        for zone_id in previous:
+            if zone_id not in result:
+                changed[zone_id] = None
+    return changed
+
+
 def position(
     media_server,
     position: int = None,
@@ -256,29 +334,90 @@ def set_playlist(
     files: list[MediaFile],
     zone: Zone = Zone(),
     active_item_index: int = -1,
+    max_keys: int = MAX_PLAYLIST_KEYS,
 ):
-    """Sets the given files as the playlist for the given zone."""
+    """Sets the given files as the playlist for the given zone.
+
+    files:              MediaFiles, keys or a serialized file list.
+    active_item_index:  Index of the active file in the playlist, -1 (or any index
+                        outside the playlist) for none.
+    max_keys:           Playlists with more files are loaded in chunks. The chunk
+                        containing the active file is set first, the others are added
+                        before and after it, so the active file is preserved.
+    """
     # fix param if someone passes a single file
     if isinstance(files, dict):
         files = [files]
 
-    playlist = None
-
-    if isinstance(files, list):  # serialize keys, if we have a file list
-        playlist = serialize_file_list(files, active_item_index)
-    elif isinstance(files, str):  # if string, assume user-serialized playlist
-        playlist = files
-    else:
+    if isinstance(files, str):  # if string, assume user-serialized playlist
+        if files.count(";") <= max_keys + 2:
+            _set_serialized_playlist(media_server, files, zone)
+            return
+        files, active_item_index = parse_file_list(files)
+    elif not isinstance(files, list):
         logger.warning(
             "Could not serialize value of 'files' in playback.set_playlist(). Ignoring."
         )
+        _set_serialized_playlist(media_server, None, zone)
+        return
+
+    max_keys = max(1, max_keys)
+    chunks = [files[i : i + max_keys] for i in range(0, len(files), max_keys)] or [[]]
+    if not 0 <= active_item_index < len(files):
+        active_item_index = -1
+    active_chunk = max(0, active_item_index) // max_keys
+    active_in_chunk = active_item_index - active_chunk * max_keys
+    playlist = serialize_file_list(chunks[active_chunk], active_in_chunk)
+    _set_serialized_playlist(media_server, playlist, zone)
+    for chunk in chunks[active_chunk + 1 :]:
+        add_to_playlist(media_server, chunk, "End", zone, max_keys)
+    # Inserting at the start moves the active file, so earlier chunks go in reverse
+    for chunk in reversed(chunks[:active_chunk]):
+        add_to_playlist(media_server, chunk, "Start", zone, max_keys)
+
+
+def _set_serialized_playlist(media_server, playlist: str, zone: Zone):
     payload = {"Playlist": playlist}
     if zone is not None:
         payload["Zone"] = zone.best_identifier()
         payload["ZoneType"] = zone.best_identifier_type()
     response = media_server.send_request("Playback/SetPlayList", payload)
     response.raise_for_status()
-    return
+
+
+def add_to_playlist(
+    media_server,
+    files: list[MediaFile],
+    location: str = "End",
+    zone: Zone = Zone(),
+    max_keys: int = MAX_PLAYLIST_KEYS,
+):
+    """Adds files to the playlist of the given zone.
+
+    files:      MediaFiles or keys.
+    location:   'Start', 'Next', 'End' or the index to insert the files at.
+    max_keys:   Files are sent in chunks of this size, in order.
+    """
+    if isinstance(files, dict):
+        files = [files]
+    keys = [str(file["Key"]) if isinstance(file, dict) else str(file) for file in files]
+    max_keys = max(1, max_keys)
+    requests = []
+    for offset in range(0, len(keys), max_keys):
+        chunk_location = location
+        if location not in ("Start", "Next", "End"):
+            chunk_location = str(int(location) + offset)
+        requests.append((keys[offset : offset + max_keys], chunk_location))
+    if location in ("Start", "Next"):
+        # Each chunk is inserted in front of the previous one, so send them in reverse
+        requests.reverse()
+    for chunk, chunk_location in requests:
+        payload = {"Key": ",".join(chunk), "Location": chunk_location}
+        if zone is not None:
+            payload["Zone"] = zone.best_identifier()
+            payload["ZoneType"] = zone.best_identifier_type()
+        response = media_server.send_request("Playback/PlayByKey", payload)
+        response.raise_for_status()
 
 
 def loadDSPreset(media_server, name: str, zone: Zone = Zone()):
@@ -0,0 +1,92 @@
+from pymcws.model import MediaFile
+from pymcws.utils import (
+    transform_mpl_response,
+    iter_mpl_response,
+    parse_file_list,
+)
+from xml.etree import ElementTree
+
+
+def get_list(media_server, include_media_types: bool = False) -> list[dict]:
+    """Returns the stored playlists of the server as a list of dictionaries.
+
+    Each dictionary contains the keys 'ID' (int), 'Name', 'Path' and 'Type', which
+    is one of 'Playlist', 'Smartlist' or 'Group'. Groups are folders and have no files.
+    include_media_types: Also return the media types contained in each playlist.
+    """
+    payload = {"IncludeMediaTypes": "1" if include_media_types else "0"}
+    response = media_server.send_request("Playlists/List", payload)
+    response.raise_for_status()
+    result = []
+    root = ElementTree.fromstring(response.content)
+    for item in root:
+        playlist = {field.attrib["Name"]: field.text for field in item}
+        playlist["ID"] = int(playlist["ID"])
+        result.append(playlist)
+    return result
+
+
+def playlist_payload(playlist) -> dict:
+    """Returns the parameters that identify a playlist in MCWS requests.
+
+    playlist: A playlist as returned by get_list(), its ID as int or its path as string.
+    """
+    if isinstance(playlist, dict):
+        playlist = playlist["ID"]
+    if isinstance(playlist, int):
+        return {"Playlist": str(playlist), "PlaylistType": "ID"}
+    return {"Playlist": playlist, "PlaylistType": "Path"}
+
+
+def files(
+    media_server,
+    playlist,
+    action: str = "MPL",
+    fields: list[str] = None,
+    no_local_filenames: bool = False,
+) -> list[MediaFile]:
+    """Returns the files of a stored playlist, decoded like files.search().
+
+    playlist: A playlist as returned by get_list(), its ID as int or its path as string.
+    action:   'MPL' returns MediaFiles, other actions return the raw response.
+    fields:   Only retrieve these fields (Key is always included).
+    """
+    payload = playlist_payload(playlist)
+    payload["Action"] = action
+    payload["NoLocalFilenames"] = "1" if no_local_filenames else "0"
+    if fields is not None:
+        payload["Fields"] = ",".join(fields)
+    response = media_server.send_request("Playlist/Files", payload)
+    if action != "MPL":
+        return response
+    response.raise_for_status()
+    return transform_mpl_response(media_server, response)
+
+
+def iter_files(
+    media_server, playlist, fields: list[str] = None, no_local_filenames: bool = False
+):
+    """Same as files(), but streams the response and yields MediaFiles one at a time."""
+    payload = playlist_payload(playlist)
+    payload["Action"] = "MPL"
+    payload["NoLocalFilenames"] = "1" if no_local_filenames else "0"
+    if fields is not None:
+        payload["Fields"] = ",".join(fields)
+    response = media_server.send_request("Playlist/Files", payload, stream=True)
+    response.raise_for_status()
+    try:
+        yield from iter_mpl_response(media_server, response)
+    finally:
+        response.close()
+
+
+def keys(media_server, playlist) -> list[int]:
+    """Returns only the keys of the files in a playlist, in playlist order.
+
+    This is much cheaper than retrieving the files and useful to detect changes.
+    """
+    payload = playlist_payload(playlist)
+    payload["Action"] = "Serialize"
+    response = media_server.send_request("Playlist/Files", payload)
+    response.raise_for_status()
+    return parse_file_list(response.text)[0]
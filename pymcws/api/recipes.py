@@ -2,7 +2,8 @@ from pymcws.model import Zone
 from pymcws.api.files import search
 from pymcws.utils import escape_for_query
 from typing import List, Dict
-from pymcws.api.playback import shuffle, repeat
+from pymcws.api.playback import shuffle, repeat, set_playlist, play
+import random
 
 
 def play_album(
@@ -20,11 +21,30 @@ def play_album(
         set either to None to avoid this and preserve shuffle/repeat state.
         Setting shuffle_album to True shuffles order of files in playlist and leaves playback state alone.
         Setting shuffle to False keeps playlist in order and disables shuffle.
+        If the server has an album_index (see pymcws.albums), the playlist is set from
+        its keys instead of searching, unless play_doctor is used.
     """
-    album_artist = escape_for_query(album_artist)
-    album = escape_for_query(album)
     if shuffle_album is False:
         shuffle(media_server, mode="Off", zone=zone)
+    index = getattr(media_server, "album_index", None)
+    keys = [] if index is None or play_doctor else index.keys(album_artist, album)
+    if keys:
+        if shuffle_album:
+            random.shuffle(keys)
+        set_playlist(media_server, keys, zone, active_item_index=0)
+        play(media_server, zone or Zone())
+    else:
+        _search_album(
+            media_server, album_artist, album, shuffle_album, play_doctor, zone
+        )
+    if repeat_album is not None:
+        mode = "Playlist" if repeat_album else "Off"
+        response = repeat(media_server, mode=mode, zone=zone)
+
+
+def _search_album(media_server, album_artist, album, shuffle_album, play_doctor, zone):
+    album_artist = escape_for_query(album_artist)
+    album = escape_for_query(album)
     query = (
         "[Album Artist]=["
         + album_artist
@@ -41,9 +61,6 @@ def play_album(
         zone=zone,
     )
     response.raise_for_status()
-    if repeat_album is not None:
-        mode = "Playlist" if repeat_album else "Off"
-        response = repeat(media_server, mode=mode, zone=zone)
 
 
 def play_keyword(
@@ -70,7 +87,15 @@ def play_keyword(
 
 def query_album(media_server, album_artist: str, album: str) -> Dict:
     """Returns files from an Album by a given Album Artist.
+
+    If the server has an album_index (see pymcws.albums), the files are returned from
+    it without a search. They then only contain the fields of the index.
     """
+    index = getattr(media_server, "album_index", None)
+    if index is not None:
+        files = index.files(album_artist, album)
+        if files:
+            return files
     album_artist = escape_for_query(album_artist)
     album = escape_for_query(album)
     query = (
@@ -0,0 +1,194 @@
+""" A local index of field values for autocompletion.
+
+    Calling library.values() on every keystroke costs a round trip each time.
+    AutocompleteIndex loads the distinct values of a few fields once and answers prefix
+    and substring lookups locally. Lookups ignore case and diacritics, so "bjo" finds
+    "Björk":
+
+        index = AutocompleteIndex(server)
+        index.complete("bjo")       # [('Björk', 'Artist', None), ...]
+        index.search("ork")         # values containing 'ork'
+        index.refresh()             # applies changes in the library
+
+    With counts=True, the number of files per value is counted from a single search,
+    and results are ordered by it.
+"""
+import threading
+import unicodedata
+from bisect import bisect_left
+from pymcws.api.library import values as library_values
+from pymcws.utils import iter_mpl_items
+
+DEFAULT_FIELDS = ("Artist", "Album Artist", "Album", "Genre", "Composer")
+
+# Separates values in the substring search buffer, cannot occur in folded values
+_SEPARATOR = "\x00"
+
+
+def fold(text: str) -> str:
+    """Returns text without case and diacritics, e.g. 'Björk' -> 'bjork'."""
+    decomposed = unicodedata.normalize("NFKD", text)
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return stripped.casefold().replace(_SEPARATOR, "")
+
+
+class AutocompleteIndex:
+    """Prefix and substring lookups over the values of library fields."""
+
+    def __init__(
+        self,
+        media_server,
+        fields: tuple = DEFAULT_FIELDS,
+        query: str = None,
+        counts: bool = False,
+        load: bool = True,
+    ):
+        """fields:  The fields whose values are indexed.
+        query:   Only index values of files matching this query, default all files.
+        counts:  Count the files per value, which requires a search over all files.
+        load:    Load the values immediately, otherwise on the first refresh().
+        """
+        self.media_server = media_server
+        self.fields = tuple(fields)
+        self.query = query
+        self.counts = counts
+        self.lock = threading.Lock()
+        # Sorted (folded value, field, value) tuples
+        self.__entries = []
+        # field -> {value: count or None}
+        self.__values = {field: {} for field in self.fields}
+        self.__haystack = None
+        self.__offsets = None
+        if load:
+            self.refresh()
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def refresh(self) -> tuple:
+        """Loads the current values from the server and applies the differences.
+
+        Returns the number of added and removed values.
+        """
+        if self.counts:
+            current = self.__count_values()
+        else:
+            current = {}
+            for field in self.fields:
+                values = library_values(
+                    self.media_server, field=field, query=self.query
+                )
+                current[field] = {value: None for value in values if value}
+        added = []
+        removed = []
+        with self.lock:
+            for field in self.fields:
+                old = self.__values[field]
+                new = current.get(field, {})
+                removed.extend((fold(v), field, v) for v in old if v not in new)
+                added.extend((fold(v), field, v) for v in new if v not in old)
+                self.__values[field] = new
+            if added or removed:
+                self.__apply(added, removed)
+        return len(added), len(removed)
+
+    def complete(self, prefix: str, fields: tuple = None, limit: int = 10) -> list:
+        """Returns up to limit (value, field, count) tuples starting with prefix.
+
+        fields: Only return values of these fields, default all indexed fields.
+        Results are ordered alphabetically, or by descending count if counted.
+        """
+        prefix = fold(prefix)
+        entries = self.__entries
+        result = []
+        i = bisect_left(entries, (prefix,))
+        while i < len(entries) and entries[i][0].startswith(prefix):
+            if fields is None or entries[i][1] in fields:
+                result.append(entries[i])
+                if not self.counts and len(result) >= limit:
+                    break
+            i += 1
+        return self.__results(result, limit)
+
+    def search(self, text: str, fields: tuple = None, limit: int = 10) -> list:
+        """Returns up to limit (value, field, count) tuples that contain text."""
+        text = fold(text)
+        with self.lock:
+            if self.__haystack is None:
+                self.__haystack = _SEPARATOR.join(entry[0] for entry in self.__entries)
+                self.__offsets = []
+                offset = 0
+                for entry in self.__entries:
+                    self.__offsets.append(offset)
+                    offset += len(entry[0]) + 1
+            entries, haystack, offsets = self.__entries, self.__haystack, self.__offsets
+        result = []
+        position = haystack.find(text) if text else -1
+        while position >= 0:
+            i = bisect_left(offsets, position + 1) - 1
+            if fields is None or entries[i][1] in fields:
+                result.append(entries[i])
+                if not self.counts and len(result) >= limit:
+                    break
+            # continue after the current value
+            end = offsets[i + 1] if i + 1 < len(offsets) else len(haystack)
+            position = haystack.find(text, end)
+        return self.__results(result, limit)
+
+    def __results(self, entries: list, limit: int) -> list:
+        result = [
+            (value, field, self.__values[field].get(value, None))
+            for _, field, value in entries
+        ]
+        if self.counts:
+            result.sort(key=lambda entry: -(entry[2] or 0))
+        return result[:limit]
+
+    def __apply(self, added: list, removed: list):
+        # Small changes are applied in place, large ones rebuild the sorted list
+        if len(added) + len(removed) > len(self.__entries) // 8:
+            removed = set(removed)
+            entries = [entry for entry in self.__entries if entry not in removed]
+            entries.extend(added)
+            entries.sort()
+        else:
+            entries = list(self.__entries)
+            for entry in removed:
+                i = bisect_left(entries, entry)
+                if i < len(entries) and entries[i] == entry:
+                    del entries[i]
+            for entry in added:
+                entries.insert(bisect_left(entries, entry), entry)
+        # Lookups in other threads keep using the previous list
+        self.__entries = entries
+        self.__haystack = None
+
+    def __count_values(self) -> dict:
+        counts = {field: {} for field in self.fields}
+        definitions = self.media_server.fields
+        list_fields = [
+            field
+            for field in self.fields
+            if definitions.get(field, {}).get("DataType", None) == "List"
+        ]
+        payload = {
+            "Action": "MPL",
+            "Query": self.query or "",
+            "Fields": ",".join(self.fields),
+        }
+        response = self.media_server.send_request("Files/Search", payload, stream=True)
+        response.raise_for_status()
+        try:
+            for item in iter_mpl_items(response):
+                for field in self.fields:
+                    text = item.get(field, None)
+                    if not text:
+                        continue
+                    field_counts = counts[field]
+                    values = set(text.split(";")) if field in list_fields else (text,)
+                    for value in values:
+                        if value:
+                            field_counts[value] = field_counts.get(value, 0) + 1
+        finally:
+            response.close()
+        return counts
@@ -0,0 +1,106 @@
+""" A cached view of the stored playlists of a media server.
+
+    Retrieving the files of a large playlist is expensive, retrieving only its keys is
+    cheap. PlaylistCatalogue keeps the files of every playlist it has retrieved and
+    compares the keys on later requests, so playlists are only downloaded again when
+    files were added, removed or reordered:
+
+        catalogue = PlaylistCatalogue(server)
+        favourites = catalogue.files("Playlists\\Favourites")
+        # later: returns the cached files unless the playlist changed
+        favourites = catalogue.files("Playlists\\Favourites")
+
+    Changed tags are not detected, call invalidate() after editing files. The files
+    returned are copies, editing them does not change the cache.
+"""
+import threading
+import time
+from pymcws.api import playlists
+from pymcws.exceptions import UnknownPlaylistError
+
+
+class PlaylistCatalogue:
+    """Caches the playlist list and playlist contents of one media server."""
+
+    def __init__(self, media_server, max_age: float = 60.0):
+        """max_age: Seconds after which the list of playlists is retrieved again."""
+        self.media_server = media_server
+        self.max_age = max_age
+        self.lock = threading.Lock()
+        self.__playlists = None
+        self.__loaded = 0.0
+        # playlist ID -> (keys, fields, files)
+        self.__contents = {}
+
+    def get_list(self, refresh: bool = False) -> list[dict]:
+        """Returns all playlists as returned by api.playlists.get_list(), cached."""
+        with self.lock:
+            expired = time.monotonic() - self.__loaded > self.max_age
+            if refresh or expired or self.__playlists is None:
+                self.__playlists = playlists.get_list(self.media_server)
+                self.__loaded = time.monotonic()
+                known = {playlist["ID"] for playlist in self.__playlists}
+                for playlist_id in list(self.__contents):
+                    if playlist_id not in known:
+                        del self.__contents[playlist_id]
+            return list(self.__playlists)
+
+    def find(self, playlist) -> dict:
+        """Returns the playlist with the given ID, path or name, None if there is none.
+
+        Names are not unique, the first playlist with a matching name is returned.
+        """
+        if isinstance(playlist, dict):
+            playlist = playlist["ID"]
+        candidates = self.get_list()
+        for candidate in candidates:
+            if playlist == candidate["ID"] or playlist == candidate["Path"]:
+                return candidate
+        for candidate in candidates:
+            if playlist == candidate["Name"]:
+                return candidate
+        return None
+
+    def keys(self, playlist) -> list[int]:
+        """Returns the keys of the files in the playlist, always from the server."""
+        return playlists.keys(self.media_server, self.__resolve(playlist)["ID"])
+
+    def changed(self, playlist) -> bool:
+        """Returns True if the playlist contents differ from the cached ones."""
+        resolved = self.__resolve(playlist)
+        cached = self.__contents.get(resolved["ID"], None)
+        return cached is None or cached[0] != self.keys(resolved)
+
+    def files(self, playlist, fields: list[str] = None) -> list:
+        """Returns the files of the playlist, downloading them only if it changed.
+
+        fields: Only retrieve these fields. Requesting other fields downloads again.
+        """
+        resolved = self.__resolve(playlist)
+        keys = self.keys(resolved)
+        cached = self.__contents.get(resolved["ID"], None)
+        if cached is not None and cached[0] == keys and cached[1] == fields:
+            return [file.copy() for file in cached[2]]
+        result = playlists.files(self.media_server, resolved["ID"], fields=fields)
+        # Only cache consistent results, the playlist may have changed in between
+        if [file["Key"] for file in result] == keys:
+            with self.lock:
+                self.__contents[resolved["ID"]] = (keys, fields, result)
+        return [file.copy() for file in result]
+
+    def invalidate(self, playlist=None):
+        """Discards the cached contents of the given or all playlists."""
+        if playlist is not None:
+            playlist_id = self.__resolve(playlist)["ID"]
+            with self.lock:
+                self.__contents.pop(playlist_id, None)
+            return
+        with self.lock:
+            self.__contents.clear()
+            self.__playlists = None
+
+    def __resolve(self, playlist) -> dict:
+        resolved = self.find(playlist)
+        if resolved is None:
+            raise UnknownPlaylistError(playlist)
+        return resolved
@@ -0,0 +1,166 @@
+""" Debounced playback commands for continuous controls.
+
+    Dragging a volume or seek slider produces far more values than the server can
+    process. A CommandChannel sends them in the background: only the latest value of
+    each control is kept, at most one request per control is in flight, and requests
+    are sent at most max_rate times per second. Setting a value never blocks and returns
+    the last value confirmed by the server. Discrete commands like play or stop are
+    sent immediately:
+
+        channel = CommandChannel(server, zone, max_rate=10)
+        for level in slider_values:
+            channel.volume(level)
+        channel.command("Pause")
+        channel.close()
+"""
+import logging
+import threading
+import time
+from pymcws.api import playback
+from pymcws.model import Zone
+
+logger = logging.getLogger(__name__)
+
+
+class _Control:
+    """A continuous control whose latest value is sent by a background thread."""
+
+    def __init__(self, name: str, send, min_interval: float):
+        self.name = name
+        self.send = send
+        self.min_interval = min_interval
+        self.condition = threading.Condition()
+        self.pending = None
+        self.has_pending = False
+        self.in_flight = False
+        self.closed = False
+        self.confirmed = None
+        self.error = None
+        self.sent = 0
+        self.thread = threading.Thread(
+            target=self.run, name="pymcws-channel-" + name, daemon=True
+        )
+        self.thread.start()
+
+    def set(self, value):
+        with self.condition:
+            self.pending = value
+            self.has_pending = True
+            self.condition.notify_all()
+            return self.confirmed
+
+    def wait(self, timeout: float = None) -> bool:
+        """Waits until the latest value was sent. Returns False on timeout."""
+        with self.condition:
+            return self.condition.wait_for(
+                lambda: not self.has_pending and not self.in_flight, timeout
+            )
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        self.thread.join()
+
+    def run(self):
+        last_sent = None
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.has_pending or self.closed)
+                if not self.has_pending:
+                    return
+            if last_sent is not None:
+                # Values set meanwhile replace the pending one, the latest wins
+                delay = last_sent + self.min_interval - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            with self.condition:
+                value = self.pending
+                self.has_pending = False
+                self.in_flight = True
+            last_sent = time.monotonic()
+            try:
+                confirmed = self.send(value)
+                error = None
+            except Exception as e:
+                logger.warning("Sending " + self.name + " failed: " + str(e))
+                confirmed = self.confirmed
+                error = e
+            with self.condition:
+                self.confirmed = confirmed
+                self.error = error
+                self.in_flight = False
+                self.sent += 1
+                self.condition.notify_all()
+
+
+class CommandChannel:
+    """Sends playback commands for one zone, debouncing volume and position."""
+
+    def __init__(self, media_server, zone: Zone = Zone(), max_rate: float = 10.0):
+        """max_rate: Maximum number of requests per second and control."""
+        self.media_server = media_server
+        self.zone = zone
+        min_interval = 1.0 / max_rate if max_rate else 0.0
+        self.__controls = {
+            "volume": _Control("volume", self.__send_volume, min_interval),
+            "position": _Control("position", self.__send_position, min_interval),
+        }
+
+    def volume(self, level: float) -> float:
+        """Sets the volume (0 to 1) without waiting.
+
+        returns: The last volume confirmed by the server, None before the first one.
+        """
+        return self.__controls["volume"].set(level)
+
+    def position(self, position: int) -> int:
+        """Seeks to a position in milliseconds without waiting.
+
+        returns: The last position confirmed by the server, None before the first one.
+        """
+        return self.__controls["position"].set(position)
+
+    def confirmed(self, control: str):
+        """Returns the last value of 'volume' or 'position' confirmed by the server."""
+        return self.__controls[control].confirmed
+
+    def error(self, control: str) -> Exception:
+        """Returns the error of the last request of a control, None if it succeeded."""
+        return self.__controls[control].error
+
+    def sent(self, control: str) -> int:
+        """Returns the number of requests sent for a control."""
+        return self.__controls[control].sent
+
+    def command(self, command: str):
+        """Sends a discrete command like Play, Pause or Stop immediately."""
+        playback.command(self.media_server, command, self.zone)
+
+    def flush(self, timeout: float = None) -> bool:
+        """Waits until the latest values were sent. Returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for control in self.__controls.values():
+            remaining = None
+            if deadline is not None:
+                remaining = max(0, deadline - time.monotonic())
+            if not control.wait(remaining):
+                return False
+        return True
+
+    def close(self):
+        """Sends the latest values and stops the background threads."""
+        for control in self.__controls.values():
+            control.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __send_volume(self, level: float) -> float:
+        return playback.volume(self.media_server, level, zone=self.zone)
+
+    def __send_position(self, position: int) -> int:
+        return playback.position(self.media_server, position, zone=self.zone)
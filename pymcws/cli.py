@@ -0,0 +1,77 @@
+""" Helpers shared by the console entry points of pymcws.
+
+    All commands take the access key as first argument, and credentials from
+    --user/--password or the environment variables PYMCWS_USER and PYMCWS_PASSWORD.
+"""
+import logging
+import os
+import sys
+import threading
+import time
+
+
+def add_server_arguments(parser):
+    """Adds the arguments needed to connect to a media server to an ArgumentParser."""
+    parser.add_argument("key", help="access key of the server, or localhost[:port]")
+    parser.add_argument(
+        "--user", default=os.environ.get("PYMCWS_USER", None), help="MCWS username"
+    )
+    parser.add_argument(
+        "--password",
+        default=os.environ.get("PYMCWS_PASSWORD", None),
+        help="MCWS password",
+    )
+    parser.add_argument("-v", "--verbose", action="store_true", help="log debug output")
+
+
+def server_from_args(args):
+    """Configures logging and returns the media server described by parsed arguments."""
+    from pymcws.media_server import MediaServer
+
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.WARNING,
+        format="%(levelname)s %(name)s: %(message)s",
+    )
+    return MediaServer(args.key, args.user, args.password)
+
+
+class Progress:
+    """Prints a progress line to stderr at most every interval seconds.
+
+    Can be updated from several threads.
+    """
+
+    def __init__(self, label: str, total: int = None, interval: float = 1.0):
+        self.label = label
+        self.total = total
+        self.interval = interval
+        self.count = 0
+        self.start = time.perf_counter()
+        self.lock = threading.Lock()
+        self.__last = 0.0
+
+    def update(self, count: int = 1):
+        with self.lock:
+            self.count += count
+            now = time.perf_counter()
+            if now - self.__last < self.interval:
+                return
+            self.__last = now
+            self.__print("\r")
+
+    def print(self, end: str = "\r"):
+        with self.lock:
+            self.__print(end)
+
+    def __print(self, end: str):
+        elapsed = time.perf_counter() - self.start
+        rate = self.count / elapsed if elapsed > 0 else 0.0
+        line = self.label + ": " + str(self.count)
+        if self.total is not None:
+            line += "/" + str(self.total)
+        line += " ({:.0f}/s)".format(rate)
+        sys.stderr.write(line + end)
+        sys.stderr.flush()
+
+    def finish(self):
+        self.print(end="\n")
@@ -17,3 +17,44 @@ class UnresolvableKeyError(PymcwsError):
     def __init__(self, key, message):
         self.key = key
         self.message = message
+
+
+class ReplayMissError(PymcwsError):
+    """Exception raised if a replayed archive contains no response for a request.
+
+    Attributes:
+        path -- The api path of the request, e.g. 'Playback/Info'
+        params -- The (scrubbed) request parameters
+    """
+
+    def __init__(self, path, params):
+        self.path = path
+        self.params = params
+        self.message = "No recorded response for " + path + "?" + params
+        super().__init__(self.message)
+
+
+class UnknownPlaylistError(PymcwsError):
+    """Exception raised if a playlist is not known to the server.
+
+    Attributes:
+        playlist -- The ID, path or name that was looked up
+    """
+
+    def __init__(self, playlist):
+        self.playlist = playlist
+        self.message = "Unknown playlist: " + str(playlist)
+        super().__init__(self.message)
+
+
+class WriteBehindError(PymcwsError):
+    """Exception raised if buffered edits could not be written to the server.
+
+    Attributes:
+        failures -- List of (key, fields, exception) tuples of the failed writes
+    """
+
+    def __init__(self, failures):
+        self.failures = failures
+        self.message = "Failed to write " + str(len(failures)) + " file(s)"
+        super().__init__(self.message)
@@ -0,0 +1,270 @@
+""" Streaming export of library metadata to CSV or JSON Lines files.
+
+    Files are written row by row while the search response is parsed, so memory use
+    does not depend on the size of the library. Output names ending in .gz are gzip
+    compressed. Next to the output, a .schema.json file describes the exported fields
+    with the data types from library.fields.
+
+    CSV files contain the values as MCWS returns them (e.g. dates as jriver floats,
+    lists separated by semicolons), so they can be imported again unchanged. JSON Lines
+    files contain decoded values, dates as ISO 8601 strings.
+
+    Large libraries can be exported in key ranges. Ranges can be fetched in parallel and
+    are recorded in a checkpoint file, so an interrupted export can be resumed:
+
+        pymcws-export AccessKey library.csv.gz --parallel 4 --checkpoint
+"""
+import argparse
+import csv
+import gzip
+import io
+import json
+import logging
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pymcws.api.files import search_keys
+from pymcws.utils import iter_mpl_items
+from pymcws.cli import add_server_arguments, server_from_args, Progress
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ("csv", "jsonl")
+
+
+def detect_format(path: str) -> tuple:
+    """Returns the format and whether to compress, based on the file name."""
+    compressed = path.endswith(".gz")
+    name = path[:-3] if compressed else path
+    for format in FORMATS:
+        if name.endswith("." + format):
+            return format, compressed
+    if name.endswith(".json"):
+        return "jsonl", compressed
+    return "csv", compressed
+
+
+def open_text(path: str, mode: str, compressed: bool):
+    """Opens a text file for csv/json, transparently using gzip."""
+    if compressed:
+        return gzip.open(path, mode + "t", encoding="utf-8", newline="")
+    return open(path, mode, encoding="utf-8", newline="")
+
+
+def json_value(value):
+    """Converts a decoded field value into something json can serialize."""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def field_schema(media_server, fields: list) -> list:
+    """Returns name, data type and edit type of the given fields."""
+    definitions = media_server.fields
+    schema = []
+    for name in fields:
+        definition = definitions.get(name, {})
+        schema.append(
+            {
+                "Name": name,
+                "DataType": definition.get("DataType", "String"),
+                "EditType": definition.get("EditType", "Not editable"),
+            }
+        )
+    return schema
+
+
+class RowWriter:
+    """Writes raw MPL items as CSV or JSON Lines rows."""
+
+    def __init__(self, media_server, output, format: str, fields: list):
+        self.format = format
+        self.fields = fields
+        self.output = output
+        if format == "csv":
+            self.writer = csv.writer(output)
+        else:
+            definitions = media_server.fields
+            self.decoders = {
+                name: definitions[name]["Decoder"]
+                for name in fields
+                if name in definitions
+            }
+
+    def write_header(self):
+        if self.format == "csv":
+            self.writer.writerow(self.fields)
+
+    def write(self, item: dict):
+        if self.format == "csv":
+            self.writer.writerow([item.get(name, "") or "" for name in self.fields])
+            return
+        row = {}
+        for name in self.fields:
+            value = item.get(name, None)
+            if value is not None and name in self.decoders:
+                value = json_value(self.decoders[name](value))
+            row[name] = value
+        self.output.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+
+def key_ranges(keys: list, chunk_size: int) -> list:
+    """Splits a list of keys into contiguous, inclusive [low, high] ranges."""
+    keys = sorted(keys)
+    return [
+        [keys[i], keys[min(i + chunk_size, len(keys)) - 1]]
+        for i in range(0, len(keys), chunk_size)
+    ]
+
+
+def _stream(media_server, query, fields, writer, flush_rows, progress=None) -> int:
+    payload = {"Action": "MPL", "Query": query, "Fields": ",".join(fields)}
+    response = media_server.send_request("Files/Search", payload, stream=True)
+    response.raise_for_status()
+    rows = 0
+    try:
+        for item in iter_mpl_items(response):
+            writer.write(item)
+            rows += 1
+            if progress is not None:
+                progress.update()
+            if rows % flush_rows == 0:
+                writer.output.flush()
+    finally:
+        response.close()
+    writer.output.flush()
+    return rows
+
+
+def _write_checkpoint(path: str, state: dict):
+    temporary = path + ".tmp"
+    with open(temporary, "w") as checkpoint_file:
+        json.dump(state, checkpoint_file)
+    os.replace(temporary, path)
+
+
+def export_files(
+    media_server,
+    path: str,
+    query: str = "",
+    fields: list = None,
+    format: str = None,
+    parallel: int = 1,
+    chunk_size: int = 10000,
+    checkpoint: bool = False,
+    flush_rows: int = 1000,
+    progress: Progress = None,
+) -> int:
+    """Exports the metadata of all files matching the query and returns the row count.
+
+    path:       The output file. A name ending in .gz enables compression.
+    query:      The jriver query selecting the files; empty selects all files.
+                Must not contain ~ modifiers if key ranges are used.
+    fields:     The fields to export, defaults to all fields known by the server.
+    format:     'csv' or 'jsonl', detected from the file name if None.
+    parallel:   Number of key ranges fetched concurrently.
+    chunk_size: Number of files per key range.
+    checkpoint: Record finished key ranges in path + '.checkpoint' and resume from it.
+    flush_rows: Flush the output after this many rows.
+    """
+    detected_format, compressed = detect_format(path)
+    format = format or detected_format
+    if format not in FORMATS:
+        raise ValueError("Unsupported format '" + format + "', use csv or jsonl.")
+    if fields is None:
+        fields = list(media_server.fields)
+    elif "Key" not in fields:
+        fields = ["Key"] + list(fields)
+
+    with open(path + ".schema.json", "w") as schema_file:
+        json.dump(field_schema(media_server, fields), schema_file, indent=2)
+
+    if parallel <= 1 and not checkpoint:
+        with open_text(path, "w", compressed) as output:
+            writer = RowWriter(media_server, output, format, fields)
+            writer.write_header()
+            return _stream(media_server, query, fields, writer, flush_rows, progress)
+
+    checkpoint_path = path + ".checkpoint"
+    state = None
+    if checkpoint and os.path.exists(checkpoint_path):
+        with open(checkpoint_path) as checkpoint_file:
+            state = json.load(checkpoint_file)
+        if state.get("query") != query or state.get("fields") != fields:
+            logger.warning("Checkpoint does not match this export, starting over.")
+            state = None
+    if state is None:
+        ranges = key_ranges(search_keys(media_server, query), chunk_size)
+        state = {"query": query, "fields": fields, "ranges": ranges, "done": {}}
+    if checkpoint:
+        _write_checkpoint(checkpoint_path, state)
+
+    lock = threading.Lock()
+
+    def export_range(index: int):
+        part = path + ".part" + str(index)
+        if str(index) in state["done"] and os.path.exists(part):
+            return state["done"][str(index)]
+        low, high = state["ranges"][index]
+        ranged_query = "[Key]=" + str(low) + "-" + str(high) + " " + query
+        with open(part, "w", encoding="utf-8", newline="") as output:
+            writer = RowWriter(media_server, output, format, fields)
+            rows = _stream(
+                media_server, ranged_query, fields, writer, flush_rows, progress
+            )
+        with lock:
+            state["done"][str(index)] = rows
+            if checkpoint:
+                _write_checkpoint(checkpoint_path, state)
+        return rows
+
+    with ThreadPoolExecutor(max_workers=max(1, parallel)) as pool:
+        rows = sum(pool.map(export_range, range(len(state["ranges"]))))
+
+    with open_text(path, "w", compressed) as output:
+        RowWriter(media_server, output, format, fields).write_header()
+        for index in range(len(state["ranges"])):
+            part = path + ".part" + str(index)
+            with open(part, encoding="utf-8", newline="") as part_file:
+                shutil.copyfileobj(part_file, output, io.DEFAULT_BUFFER_SIZE * 16)
+    for index in range(len(state["ranges"])):
+        os.remove(path + ".part" + str(index))
+    if checkpoint:
+        os.remove(checkpoint_path)
+    return rows
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Export library metadata to CSV or JSON Lines."
+    )
+    add_server_arguments(parser)
+    parser.add_argument("output", help="output file, .csv, .jsonl, optionally .gz")
+    parser.add_argument("--query", default="", help="jriver query, default all files")
+    parser.add_argument("--fields", help="comma separated fields, default all")
+    parser.add_argument("--format", choices=FORMATS, help="default: from file name")
+    parser.add_argument("--parallel", type=int, default=1, help="concurrent ranges")
+    parser.add_argument("--chunk-size", type=int, default=10000, help="files per range")
+    parser.add_argument(
+        "--checkpoint", action="store_true", help="resume interrupted exports"
+    )
+    args = parser.parse_args(argv)
+
+    server = server_from_args(args)
+    fields = args.fields.split(",") if args.fields else None
+    progress = Progress("Exported")
+    export_files(
+        server,
+        args.output,
+        query=args.query,
+        fields=fields,
+        format=args.format,
+        parallel=args.parallel,
+        chunk_size=args.chunk_size,
+        checkpoint=args.checkpoint,
+        progress=progress,
+    )
+    progress.finish()
+    return 0
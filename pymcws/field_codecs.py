@@ -0,0 +1,97 @@
+""" Conversion of field values between jriver strings and python types.
+
+    library.fields() assigns each field the codec of its DataType. The Decoder and
+    Encoder of a field are bound methods of these codecs. Unlike lambdas they can be
+    pickled, so decoding can be distributed to other processes.
+"""
+from datetime import datetime
+from pymcws.utils import parse_jriver_date, serialize_jriver_date
+
+
+class IdentityCodec:
+    """Leaves values unchanged, used for unknown data types."""
+
+    def decode(self, value):
+        return value
+
+    def encode(self, value):
+        return value
+
+
+class StringCodec(IdentityCodec):
+    """String, Path, User and Image File fields. Encoded values are quoted."""
+
+    def encode(self, value):
+        return '"' + value + '"'
+
+
+class IntegerCodec:
+    """Integer and File Size fields."""
+
+    def decode(self, value):
+        return int(value)
+
+    def encode(self, value):
+        return str(value)
+
+
+class DecimalCodec:
+    """Decimal, Percentage and Time fields, which may use a comma as separator."""
+
+    def decode(self, value):
+        return float(value.replace(",", "."))
+
+    def encode(self, value):
+        return str(value)
+
+
+class DateFloatCodec:
+    """Date (float) fields: days since 30th december 1899."""
+
+    def decode(self, value):
+        return parse_jriver_date(value)
+
+    def encode(self, value):
+        return serialize_jriver_date(value)
+
+
+class TimestampCodec:
+    """Date fields: unix timestamps."""
+
+    def decode(self, value):
+        return datetime.fromtimestamp(int(value))
+
+    def encode(self, value):
+        return str(datetime.timestamp(value))
+
+
+class ListCodec:
+    """List fields: values separated by semicolons."""
+
+    def decode(self, value):
+        return value.split(";")
+
+    def encode(self, value):
+        return '"' + ";".join(value) + '"'
+
+
+# Codecs shared by all fields of a data type
+CODECS = {
+    "String": StringCodec(),
+    "Path": StringCodec(),
+    "User": StringCodec(),
+    "Image File": StringCodec(),
+    "Integer": IntegerCodec(),
+    "File Size": IntegerCodec(),
+    "Date (float)": DateFloatCodec(),
+    "Date": TimestampCodec(),
+    "List": ListCodec(),
+    "Decimal": DecimalCodec(),
+    "Percentage": DecimalCodec(),
+    "Time": DecimalCodec(),
+}
+
+
+def codec_for(data_type: str):
+    """Returns the codec of a data type, None if the data type is unknown."""
+    return CODECS.get(data_type, None)
@@ -0,0 +1,194 @@
+""" Background monitoring of the routes to a media server.
+
+    A MediaServer normally chooses its route (a local ip, the remote ip or https) when
+    it connects, and only reconsiders it after a request failed. HealthMonitor pings
+    Alive on all known routes in the background, keeping their connections open, tracks
+    a smoothed latency per route and switches the server to the fastest healthy route
+    before requests fail:
+
+        monitor = HealthMonitor(server, interval=15).start()
+        ...
+        monitor.stop()
+"""
+import logging
+import threading
+import time
+import requests
+from pymcws.media_server import URL_API
+
+logger = logging.getLogger(__name__)
+
+
+class RouteHealth:
+    """The health of one route: its smoothed latency and consecutive failures."""
+
+    def __init__(self, strategy: str, ip: str, address: str):
+        self.strategy = strategy
+        self.ip = ip
+        self.address = address
+        self.latency = None
+        self.failures = 0
+        self.checked = None
+
+    @property
+    def healthy(self) -> bool:
+        return self.latency is not None and self.failures == 0
+
+    def __repr__(self):
+        return "RouteHealth({}, {}, latency={}, failures={})".format(
+            self.strategy, self.ip, self.latency, self.failures
+        )
+
+
+class HealthMonitor:
+    """Periodically checks all routes of a media server and switches to the best."""
+
+    def __init__(
+        self,
+        media_server,
+        interval: float = 30.0,
+        timeout: float = 2.0,
+        smoothing: float = 0.3,
+        switch_ratio: float = 0.7,
+    ):
+        """interval:     Seconds between two checks of all routes.
+        timeout:      Seconds after which a ping counts as failed.
+        smoothing:    Weight of a new latency measurement in the moving average.
+        switch_ratio: Only switch away from a healthy route if another one is faster
+                      by this factor, which avoids flapping between similar routes.
+        """
+        self.media_server = media_server
+        self.interval = interval
+        self.timeout = timeout
+        self.smoothing = smoothing
+        self.switch_ratio = switch_ratio
+        self.lock = threading.Lock()
+        self.switches = 0
+        self.__routes = {}
+        self.__stop = threading.Event()
+        self.__thread = None
+
+    def routes(self) -> list[RouteHealth]:
+        """Returns the health of all known routes, best first."""
+        with self.lock:
+            routes = list(self.__routes.values())
+        return sorted(routes, key=self.__rank)
+
+    def start(self):
+        """Starts checking in a background thread. Returns the monitor."""
+        if self.__thread is None:
+            self.__stop.clear()
+            self.__thread = threading.Thread(
+                target=self.__run, name="pymcws-health", daemon=True
+            )
+            self.__thread.start()
+        return self
+
+    def stop(self):
+        """Stops the background thread."""
+        self.__stop.set()
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def check(self) -> str:
+        """Pings all routes once, switches to the best one and returns its strategy."""
+        for route in self.__known_routes():
+            self.__ping(route)
+        return self.__switch()
+
+    def __known_routes(self) -> list[RouteHealth]:
+        server = self.media_server
+        candidates = []
+        if server.port is not None:
+            for ip in server.local_ip_list:
+                address = URL_API.format(ip=ip, port=server.port)
+                candidates.append(("local", ip, address))
+            if server.remote_ip is not None:
+                address = URL_API.format(ip=server.remote_ip, port=server.port)
+                candidates.append(("remote", server.remote_ip, address))
+        if server.address_https() is not None:
+            candidates.append(("https", server.remote_ip, server.address_https()))
+        # Every route has its own connection pool, which must outlive a round of pings
+        server.reserve_connection_pools(len(candidates))
+        with self.lock:
+            routes = {}
+            for strategy, ip, address in candidates:
+                key = (strategy, ip)
+                route = self.__routes.get(key, None)
+                if route is None or route.address != address:
+                    route = RouteHealth(strategy, ip, address)
+                routes[key] = route
+            self.__routes = routes
+            return list(routes.values())
+
+    def __ping(self, route: RouteHealth):
+        start = time.perf_counter()
+        try:
+            # Going through the session keeps a connection to the route open
+            r = self.media_server.session.get(
+                route.address + "Alive", timeout=self.timeout
+            )
+            success = r.status_code == 200
+        except requests.exceptions.RequestException:
+            success = False
+        elapsed = time.perf_counter() - start
+        with self.lock:
+            route.checked = time.monotonic()
+            if not success:
+                route.failures += 1
+                return
+            route.failures = 0
+            if route.latency is None:
+                route.latency = elapsed
+            else:
+                route.latency += self.smoothing * (elapsed - route.latency)
+
+    def __rank(self, route: RouteHealth) -> tuple:
+        if not route.healthy:
+            return (1, route.failures, 0.0)
+        return (0, 0, route.latency)
+
+    def __current(self) -> RouteHealth:
+        server = self.media_server
+        strategy = server.con_strategy
+        ip = server.local_ip if strategy == "local" else server.remote_ip
+        with self.lock:
+            return self.__routes.get((strategy, ip), None)
+
+    def __switch(self) -> str:
+        server = self.media_server
+        routes = self.routes()
+        if not routes or not routes[0].healthy:
+            return server.con_strategy
+        best = routes[0]
+        current = self.__current()
+        if current is best:
+            return server.con_strategy
+        if current is not None and current.healthy:
+            if best.latency > current.latency * self.switch_ratio:
+                return server.con_strategy
+        with server.refresh_lock:
+            logger.debug(
+                "Switching " + server.key_id + " to " + best.strategy + " " + best.ip
+            )
+            if best.strategy == "local":
+                server.local_ip = best.ip
+            server.con_strategy = best.strategy
+            server.generation += 1
+            self.switches += 1
+        return best.strategy
+
+    def __run(self):
+        while not self.__stop.is_set():
+            try:
+                self.check()
+            except Exception as error:
+                logger.warning("Health check failed: " + str(error))
+            self.__stop.wait(self.interval)
@@ -0,0 +1,302 @@
+""" Bulk import of tags from CSV or JSON Lines files.
+
+    Each row names a file by its Key or Filename and contains the values to set, one
+    column per field. Files are read row by row. The columns of a CSV file are checked
+    against library.fields before any row is imported. Values are validated row by
+    row and written through a WriteBehindSession with a bounded number of pending and
+    concurrent writes. Rows that cannot be parsed, resolved, validated or written are
+    collected and can be written to a report:
+
+        pymcws-import AccessKey corrections.csv --parallel 8 --report failures.csv
+
+    CSV values are expected as MCWS returns them and pymcws-export writes them (dates
+    as jriver floats, lists separated by semicolons). JSON Lines values are expected
+    decoded, like pymcws-export writes them: dates as ISO 8601 strings, lists as arrays.
+    Empty values are skipped unless clear_empty is set.
+"""
+import argparse
+import csv
+import json
+import logging
+from datetime import datetime
+from pymcws.api.files import iter_search
+from pymcws.cli import add_server_arguments, server_from_args, Progress
+from pymcws.exceptions import WriteBehindError
+from pymcws.export import detect_format, open_text
+from pymcws.model import MediaFile
+from pymcws.writebehind import WriteBehindSession
+
+logger = logging.getLogger(__name__)
+
+# Columns that identify the file of a row
+IDENTIFIERS = ("Key", "Filename")
+
+
+class ImportResult:
+    """Counts of an import and its failures as (line, file, stage, error) tuples.
+
+    The stage is one of 'resolve', 'validate' or 'write'. Lines that are not valid
+    JSON fail in 'validate', with None as file.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.files = 0
+        self.failures = []
+
+    def __repr__(self):
+        return "ImportResult(rows={}, files={}, failures={})".format(
+            self.rows, self.files, len(self.failures)
+        )
+
+
+def read_rows(path: str, format: str = None):
+    """Yields (line number, row dictionary) of a CSV or JSON Lines file.
+
+    JSON lines that are not objects are yielded as (line number, ValueError).
+    """
+    detected_format, compressed = detect_format(path)
+    format = format or detected_format
+    with open_text(path, "r", compressed) as source:
+        if format == "csv":
+            reader = csv.DictReader(source)
+            for row in reader:
+                yield reader.line_num, row
+            return
+        for line, text in enumerate(source, 1):
+            if not text.strip():
+                continue
+            try:
+                row = json.loads(text)
+            except ValueError as error:
+                row = error
+            if not isinstance(row, (dict, ValueError)):
+                row = ValueError("Not a JSON object")
+            yield line, row
+
+
+def read_columns(path: str) -> list:
+    """Returns the header of a CSV file."""
+    _, compressed = detect_format(path)
+    with open_text(path, "r", compressed) as source:
+        return next(csv.reader(source), [])
+
+
+def check_fields(media_server, columns) -> list:
+    """Returns the writable fields among the columns. Raises ValueError otherwise."""
+    definitions = media_server.fields
+    fields = [column for column in columns if column not in IDENTIFIERS]
+    for field in fields:
+        definition = definitions.get(field, None)
+        if definition is None:
+            raise ValueError("Unknown field: " + str(field))
+        if definition["EditType"] == "Not editable":
+            raise ValueError("Field is not editable: " + field)
+    return fields
+
+
+def parse_value(definition: dict, value, decoded: bool):
+    """Converts a value from the input into the python type of the field.
+
+    decoded: True for JSON values, False for jriver strings as in CSV files.
+    """
+    if not decoded or not isinstance(value, (str, int, float)):
+        if isinstance(value, str):
+            return definition["Decoder"](value)
+        return value
+    data_type = definition["DataType"]
+    if data_type in ("Date", "Date (float)") and isinstance(value, str):
+        return datetime.fromisoformat(value)
+    if data_type == "List" and isinstance(value, str):
+        return value.split(";")
+    if data_type in ("Integer", "File Size"):
+        return int(value)
+    if data_type in ("Decimal", "Percentage", "Time"):
+        return float(value)
+    return value if isinstance(value, str) else str(value)
+
+
+class FilenameResolver:
+    """Maps filenames to keys, loading Key and Filename of the scope on first use."""
+
+    def __init__(self, media_server, scope: str = ""):
+        self.media_server = media_server
+        self.scope = scope
+        self.__keys = None
+
+    def resolve(self, filename: str) -> int:
+        """Returns the key of the file, None if it is unknown."""
+        if self.__keys is None:
+            self.__keys = {}
+            files = iter_search(self.media_server, self.scope, ["Filename"])
+            for file in files:
+                name = file.get("Filename", None)
+                if name is not None:
+                    self.__keys[name] = file["Key"]
+                    self.__keys.setdefault(name.casefold(), file["Key"])
+        key = self.__keys.get(filename, None)
+        if key is None:
+            key = self.__keys.get(filename.casefold(), None)
+        return key
+
+
+def import_tags(
+    media_server,
+    path: str,
+    format: str = None,
+    dry_run: bool = False,
+    parallel: int = 4,
+    max_queue: int = 1000,
+    clear_empty: bool = False,
+    scope: str = "",
+    progress: Progress = None,
+) -> ImportResult:
+    """Sets the tags listed in a CSV or JSON Lines file and returns an ImportResult.
+
+    path:        The input file, .csv or .jsonl, optionally gzip compressed (.gz).
+    format:      'csv' or 'jsonl', detected from the file name if None.
+    dry_run:     Resolve and validate all rows, but write nothing.
+    parallel:    Number of concurrent writes.
+    max_queue:   Maximum number of files pending or being written.
+    clear_empty: Clear fields with empty values instead of skipping them.
+    scope:       Query of the files that Filename columns are resolved in.
+
+    Raises ValueError if the header of a CSV file has unknown or read-only fields.
+    In JSON Lines files, such fields fail the rows that contain them.
+    """
+    detected_format, _ = detect_format(path)
+    format = format or detected_format
+    decoded = format == "jsonl"
+    definitions = media_server.fields
+    if format == "csv":
+        # The header applies to all rows, so unknown columns fail the whole import
+        check_fields(media_server, read_columns(path))
+    resolver = FilenameResolver(media_server, scope)
+    result = ImportResult()
+    session = None
+    if not dry_run:
+        session = WriteBehindSession(
+            media_server,
+            max_pending=max(1, min(100, max_queue)),
+            max_workers=parallel,
+            max_queue=max_queue,
+        )
+    lines = {}
+    checked = {}
+    seen = set()
+    try:
+        for line, row in read_rows(path, format):
+            result.rows += 1
+            if progress is not None:
+                progress.update()
+            if isinstance(row, ValueError):
+                result.failures.append((line, None, "validate", row))
+                continue
+            identifier = row.get("Key", None) or row.get("Filename", None)
+            columns = tuple(row)
+            if columns not in checked:
+                try:
+                    checked[columns] = check_fields(media_server, columns)
+                except ValueError as error:
+                    checked[columns] = error
+            if isinstance(checked[columns], ValueError):
+                result.failures.append((line, identifier, "validate", checked[columns]))
+                continue
+            try:
+                if row.get("Key", None) not in (None, ""):
+                    key = int(row["Key"])
+                elif row.get("Filename", None):
+                    key = resolver.resolve(row["Filename"])
+                else:
+                    key = None
+                if key is None:
+                    raise ValueError("File not found")
+            except ValueError as error:
+                result.failures.append((line, identifier, "resolve", error))
+                continue
+            file = MediaFile(media_server, {"Key": key})
+            try:
+                for field in checked[columns]:
+                    value = row[field]
+                    if value is None or value == "":
+                        if clear_empty:
+                            file[field] = None
+                        continue
+                    file[field] = parse_value(definitions[field], value, decoded)
+                # Encode now, so invalid values are reported before writing. None
+                # clears a field and needs no encoding.
+                for field, value in file.changed_fields.items():
+                    if value is not None:
+                        definitions[field]["Encoder"](value)
+            except (ValueError, TypeError, AttributeError) as error:
+                result.failures.append((line, identifier, "validate", error))
+                continue
+            seen.add(key)
+            lines[key] = (line, identifier)
+            if session is not None:
+                session.save(file)
+    finally:
+        if session is not None:
+            try:
+                session.close()
+            except WriteBehindError as error:
+                for key, edits, write_error in error.failures:
+                    line, identifier = lines.get(key, (None, key))
+                    result.failures.append((line, identifier, "write", write_error))
+    result.files = len(seen)
+    return result
+
+
+def write_report(path: str, result: ImportResult):
+    """Writes the failures of an import to a CSV file."""
+    with open(path, "w", encoding="utf-8", newline="") as report:
+        writer = csv.writer(report)
+        writer.writerow(["Line", "File", "Stage", "Error"])
+        for line, identifier, stage, error in result.failures:
+            writer.writerow([line, identifier, stage, str(error)])
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Set tags from a CSV or JSON Lines file."
+    )
+    add_server_arguments(parser)
+    parser.add_argument("input", help="input file, .csv, .jsonl, optionally .gz")
+    parser.add_argument("--format", choices=("csv", "jsonl"), help="default: by name")
+    parser.add_argument("--dry-run", action="store_true", help="validate only")
+    parser.add_argument("--parallel", type=int, default=4, help="concurrent writes")
+    parser.add_argument("--max-queue", type=int, default=1000, help="pending files")
+    parser.add_argument(
+        "--clear-empty", action="store_true", help="clear fields with empty values"
+    )
+    parser.add_argument("--scope", default="", help="query to resolve filenames in")
+    parser.add_argument("--report", help="write failed rows to this CSV file")
+    args = parser.parse_args(argv)
+
+    server = server_from_args(args)
+    progress = Progress("Checked" if args.dry_run else "Imported")
+    try:
+        result = import_tags(
+            server,
+            args.input,
+            format=args.format,
+            dry_run=args.dry_run,
+            parallel=args.parallel,
+            max_queue=args.max_queue,
+            clear_empty=args.clear_empty,
+            scope=args.scope,
+            progress=progress,
+        )
+    except ValueError as error:
+        progress.finish()
+        logger.error(str(error))
+        return 2
+    progress.finish()
+    print(
+        "{} rows, {} files, {} failures".format(
+            result.rows, result.files, len(result.failures)
+        )
+    )
+    if args.report:
+        write_report(args.report, result)
+    return 1 if result.failures else 0
@@ -0,0 +1,88 @@
+""" Sharing of repeated values while decoding MPL responses.
+
+    In large result sets, values like Artist, Album, Genre or Media Type repeat across
+    thousands of files, but parsing creates a new string (and a new list for List
+    fields) for every occurrence. With MediaServer.intern_values enabled, a
+    ValueInterner decodes each distinct value of a String or List field once per
+    response and shares the result between all files. This reduces memory use and
+    makes grouping by these fields faster, as equal values are mostly the same object.
+
+    Fields are interned until they turn out to have too many distinct values, so unique
+    fields like Name stop being interned early. List values are returned as new lists of
+    shared strings, unless lists_as_tuples is set: then all files share the same tuple.
+"""
+
+# Fields whose values are (nearly) unique per file, never interned
+UNIQUE_FIELDS = {"Key", "Name", "Filename", "Date (readable)", "Comment", "Lyrics"}
+
+# Data types whose values are interned
+INTERNED_TYPES = {"String", "List"}
+
+_MISSING = object()
+
+
+class ValueInterner:
+    """Decodes field values, sharing the results of equal values."""
+
+    def __init__(
+        self,
+        fields: dict,
+        max_distinct: int = 10000,
+        lists_as_tuples: bool = False,
+        names: set = None,
+    ):
+        """fields:          The field information of the server, see library.fields().
+        max_distinct:    A field is no longer interned once it has this many values.
+        lists_as_tuples: Return List fields as shared tuples instead of new lists.
+        names:           Intern exactly these fields instead of choosing by data type.
+        """
+        self.fields = fields
+        self.max_distinct = max_distinct
+        self.lists_as_tuples = lists_as_tuples
+        self.names = names
+        self.shared = 0
+        self.__caches = {}
+        self.__strings = {}
+
+    def interned(self, name: str) -> bool:
+        """Returns True if values of the field are currently interned."""
+        cache = self.__caches.get(name, _MISSING)
+        if cache is _MISSING:
+            return self.__should_intern(name)
+        return cache is not None
+
+    def decode(self, name: str, value: str):
+        """Decodes a jriver value of the field, like its Decoder does."""
+        cache = self.__caches.get(name, _MISSING)
+        if cache is _MISSING:
+            cache = {} if self.__should_intern(name) else None
+            self.__caches[name] = cache
+        if cache is None or value is None:
+            return self.fields[name]["Decoder"](value)
+        decoded = cache.get(value, _MISSING)
+        if decoded is _MISSING:
+            if len(cache) >= self.max_distinct:
+                self.__caches[name] = None
+                return self.fields[name]["Decoder"](value)
+            decoded = cache[value] = self.__decode_new(name, value)
+        else:
+            self.shared += 1
+        if type(decoded) is tuple and not self.lists_as_tuples:
+            return list(decoded)
+        return decoded
+
+    def __should_intern(self, name: str) -> bool:
+        if self.names is not None:
+            return name in self.names
+        if name in UNIQUE_FIELDS:
+            return False
+        return self.fields[name]["DataType"] in INTERNED_TYPES
+
+    def __decode_new(self, name: str, value: str):
+        data_type = self.fields[name]["DataType"]
+        if data_type == "List":
+            strings = self.__strings
+            return tuple(strings.setdefault(part, part) for part in value.split(";"))
+        if data_type == "String":
+            return self.__strings.setdefault(value, value)
+        return self.fields[name]["Decoder"](value)
@@ -0,0 +1,172 @@
+""" Adaptive limiting of concurrent requests to a media server.
+
+    Many threads sending requests to one JRiver instance make every request slower,
+    including interactive ones. An AdaptiveLimiter assigned to MediaServer.limiter
+    bounds the number of requests in flight and adapts the bound AIMD-style: it grows by
+    one request per round trip while latency stays close to the lowest latency seen for
+    requests of the same cost class, and shrinks by a factor when latency climbs or
+    requests fail. Requests above the limit wait in first-come, first-served order,
+    unless a RequestScheduler is used as well, see pymcws.scheduler:
+
+        server.limiter = AdaptiveLimiter(max_limit=32)
+        ...
+        print(server.limiter.stats())
+"""
+import threading
+import time
+from collections import deque
+
+
+def cost_class(extension: str, size: int) -> tuple:
+    """Returns the endpoint and the response size in steps of factor 8.
+
+    Requests to one endpoint can differ a lot in cost, e.g. a search returning one file
+    and one returning the whole library. Latencies are only compared within a class.
+    """
+    return extension, max(0, size).bit_length() // 3
+
+
+class AdaptiveLimiter:
+    """Bounds and adapts the number of concurrent requests."""
+
+    def __init__(
+        self,
+        initial_limit: int = 2,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        tolerance: float = 2.0,
+        backoff: float = 0.75,
+        smoothing: float = 0.2,
+    ):
+        """initial_limit: Number of concurrent requests allowed at the start. Keep it
+                       low, latencies measured while the server is already overloaded
+                       are mistaken for its normal latency.
+        min_limit:     The limit never drops below this.
+        max_limit:     The limit never grows above this.
+        tolerance:     Latency may grow by this factor over the lowest observed latency
+                       of a cost class before the limit is reduced.
+        backoff:       Factor the limit is multiplied with when reducing it.
+        smoothing:     Weight of a new measurement in the smoothed latency ratio.
+        """
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.tolerance = tolerance
+        self.backoff = backoff
+        self.smoothing = smoothing
+        self.lock = threading.Lock()
+        self.limit = float(max(min_limit, min(initial_limit, max_limit)))
+        self.in_flight = 0
+        self.ratio = 1.0
+        self.decreases = 0
+        self.failures = 0
+        self.__waiters = deque()
+        self.__baselines = {}
+        # No further decrease until the requests started before the last one are done
+        self.__recovering = 0
+
+    @property
+    def queued(self) -> int:
+        """Number of requests waiting for a slot."""
+        return len(self.__waiters)
+
+    def stats(self) -> dict:
+        """Returns the current limit, requests in flight and waiting, and counters."""
+        with self.lock:
+            return {
+                "limit": int(self.limit),
+                "in_flight": self.in_flight,
+                "queued": len(self.__waiters),
+                "latency_ratio": self.ratio,
+                "decreases": self.decreases,
+                "failures": self.failures,
+            }
+
+    def acquire(self, timeout: float = None) -> bool:
+        """Waits for a free slot. Returns False if the timeout expired first."""
+        with self.lock:
+            if not self.__waiters and self.in_flight < int(self.limit):
+                self.in_flight += 1
+                return True
+            waiter = threading.Event()
+            self.__waiters.append(waiter)
+        if waiter.wait(timeout):
+            return True
+        with self.lock:
+            if waiter.is_set():  # granted while timing out
+                return True
+            self.__waiters.remove(waiter)
+            return False
+
+    def release(
+        self, extension: str, elapsed: float, failed: bool = False, size: int = 0
+    ):
+        """Frees a slot and adapts the limit to the outcome of the request.
+
+        size: Size of the response in bytes, see cost_class().
+        """
+        with self.lock:
+            self.in_flight -= 1
+            self.__adapt(cost_class(extension, size), elapsed, failed)
+            while self.__waiters and self.in_flight < int(self.limit):
+                self.in_flight += 1
+                self.__waiters.popleft().set()
+
+    def call(self, extension: str, function):
+        """Runs function, which sends a request to extension, within a slot.
+
+        Responses with status 500 and above count as failures.
+        """
+        self.acquire()
+        return self.__measure(extension, function)
+
+    def track(self, extension: str, function):
+        """Like call(), but runs function right away without waiting for a slot.
+
+        For callers that bound concurrency themselves to the current limit, like a
+        pymcws.scheduler.RequestScheduler. The request is counted and adapts the limit.
+        """
+        with self.lock:
+            self.in_flight += 1
+        return self.__measure(extension, function)
+
+    def __measure(self, extension: str, function):
+        start = time.perf_counter()
+        try:
+            r = function()
+        except Exception:
+            self.release(extension, time.perf_counter() - start, failed=True)
+            raise
+        elapsed = time.perf_counter() - start
+        # Streamed bodies must not be read here, so the size comes from the header
+        headers = getattr(r, "headers", None) or {}
+        size = int(headers.get("Content-Length", 0))
+        self.release(extension, elapsed, r.status_code >= 500, size)
+        return r
+
+    def __adapt(self, cost: tuple, elapsed: float, failed: bool):
+        if self.__recovering > 0:
+            self.__recovering -= 1
+        if failed:
+            self.failures += 1
+            self.__decrease()
+            return
+        # The baseline follows the lowest latency, but slowly forgets it, so it adapts
+        # when a cost class becomes permanently slower
+        baseline = self.__baselines.get(cost, elapsed)
+        baseline = min(elapsed, baseline * 1.001)
+        self.__baselines[cost] = baseline
+        ratio = elapsed / baseline if baseline > 0 else 1.0
+        self.ratio += self.smoothing * (ratio - self.ratio)
+        if self.ratio > self.tolerance:
+            self.__decrease()
+        elif self.in_flight + 1 >= int(self.limit) or self.__waiters:
+            # Only grow if the limit is actually reached
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+
+    def __decrease(self):
+        if self.__recovering > 0:
+            return
+        self.limit = max(self.min_limit, self.limit * self.backoff)
+        self.decreases += 1
+        self.ratio = 1.0
+        self.__recovering = self.in_flight + 1
@@ -1,29 +1,39 @@
 import requests
+from requests.adapters import HTTPAdapter
 from requests.auth import HTTPBasicAuth
 from requests.exceptions import HTTPError
 import logging
 from xml.etree import ElementTree
 import urllib
+import threading
+import time
 from datetime import datetime
 from pymcws.exceptions import UnresolvableKeyError
-from pymcws.server_mixins import Library, Playback, File, Files, Recipes
-from pymcws.api.library import fields as lib_fields
+from pymcws.transport import SessionTransport
+from pymcws.metrics import error_class
+from pymcws.singleflight import SingleFlight, is_read_request, request_key
+from pymcws import tracing
 
 
 URL_KEYLOOKUP = "http://webplay.jriver.com/libraryserver/lookup"
 URL_API = "http://{ip}:{port}/MCWS/v1/"
+URL_API_HTTPS = "https://{ip}:{port}/MCWS/v1/"
 
 logger = logging.getLogger(__name__)
 
 
 class MediaServer:
-    def __init__(self, key_id: str, user: str, password: str):
+    def __init__(self, key_id: str, user: str, password: str, pool_size: int = 10):
         """Creates an access key and stores data relevant to this key.
 
         Minimally, the key_id is required. If either username or password is
         'None', then all requests to the server behind this key will be sent
         without authentication. Use the key_id "localhost" to directly connect
-        to the jriver instance running on the same machine as the code.
+        to the jriver instance running on the same machine as the code, append a port
+        to use a non-default one, e.g. "localhost:52200".
+
+        Instances can be shared between threads. pool_size is the number of connections
+        kept open to the server, set it to the number of threads sending requests.
         """
 
         self.key_id = key_id
@@ -32,11 +42,44 @@ class MediaServer:
         self.con_strategy = "unknown"
         self.session = requests.Session()
         self.session.auth = (user, password)
+        # Connection pools are kept for this many hosts, see reserve_connection_pools()
+        self.pool_connections = 2
+        self.pool_size = pool_size
+        self.__mount_adapter()
+        # Serializes renegotiations; the generation counts completed ones, so threads
+        # that failed with the same connection renegotiate only once
+        self.refresh_lock = threading.RLock()
+        self.generation = 0
+        self.__fields_lock = threading.Lock()
+        self.transport = SessionTransport()
+        self.hooks = []
+        # Share the responses of identical concurrent read requests, see singleflight
+        self.coalesce_reads = False
+        # Optional pymcws.limiter.AdaptiveLimiter bounding concurrent requests and
+        # pymcws.scheduler.RequestScheduler ordering them by priority, see the
+        # properties
+        self.__limiter = None
+        self.__scheduler = None
+        # Share equal values between decoded files, see pymcws.interning
+        self.intern_values = False
+        # Optional ProcessPoolExecutor decoding large responses in parallel
+        self.decode_pool = None
+        # Optional pymcws.paths.PathMapper translating Path fields, see its install()
+        self.path_mapper = None
+        # Optional pymcws.albums.AlbumIndex serving the album recipes
+        self.album_index = None
+        self.single_flight = SingleFlight()
         self.__fields = None
-        if self.key_id == "localhost":
-            self.local_ip_list = "127.0.0.1"
+        # Filled in by update_from_jriver(), unless the key is localhost
+        self.local_ip_list = []
+        self.local_ip = None
+        self.remote_ip = None
+        self.port = None
+        self.https_port = None
+        if self.key_id == "localhost" or self.key_id.startswith("localhost:"):
+            self.local_ip_list = ["127.0.0.1"]
             self.local_ip = "127.0.0.1"
-            self.port = "52199"
+            self.port = self.key_id.partition(":")[2] or "52199"
             self.con_strategy = "local"
 
     @property
@@ -48,9 +91,42 @@ class MediaServer:
         cache, call this function with update = True.
         """
         if self.__fields is None or update:
-            self.__fields = lib_fields(self)
+            from pymcws.api.library import fields as lib_fields
+
+            with self.__fields_lock:
+                # another thread may have loaded the fields while this one waited
+                if self.__fields is None or update:
+                    self.__fields = lib_fields(self)
         return self.__fields
 
+    @property
+    def limiter(self):
+        """Optional pymcws.limiter.AdaptiveLimiter bounding concurrent requests."""
+        return self.__limiter
+
+    @limiter.setter
+    def limiter(self, limiter):
+        self.__limiter = limiter
+        self.__wire_scheduler()
+
+    @property
+    def scheduler(self):
+        """Optional pymcws.scheduler.RequestScheduler ordering requests by priority.
+
+        With a limiter, the scheduler takes the number of slots from it, see
+        scheduled_send().
+        """
+        return self.__scheduler
+
+    @scheduler.setter
+    def scheduler(self, scheduler):
+        self.__scheduler = scheduler
+        self.__wire_scheduler()
+
+    def __wire_scheduler(self):
+        if self.__scheduler is not None:
+            self.__scheduler.limiter = self.__limiter
+
     def __str__(self):
         return "Server " + self.key_id + " at " + self.address()
 
@@ -63,7 +139,7 @@ class MediaServer:
         else:
             return HTTPBasicAuth(self.user, self.password)
 
-    def refresh(self) -> bool:
+    def refresh(self, generation: int = None) -> bool:
         """Identifies the best way to connect to the machine behind the key,
         querying data from jriver web service if necessary.
         Returns true if successful and false otherwise.
@@ -74,28 +150,50 @@ class MediaServer:
         # 2) Query jriver service for key data, update keyData accordingly
         # 3) Test if local IP is reachable
         # 4) If not, test if remote ip is reachable
-        # 5) else machine behind key is unreachable
-        # 6) if machine is reachable, update the field list
+        # 5) If not, test if the remote ip is reachable by https, if enabled
+        # 6) else machine behind key is unreachable
+        # 7) if machine is reachable, update the field list
+
+        Only one thread refreshes at a time, others wait for it. If generation is given
+        and another thread has refreshed since it was read from self.generation, the
+        result of that refresh is used instead of refreshing again.
         """
+        with self.refresh_lock:
+            if generation is not None and generation != self.generation:
+                return self.con_strategy in ("local", "remote", "https")
+            if not self.hooks:
+                success = self.negotiate()
+            else:
+                start = time.perf_counter()
+                success = self.negotiate()
+                elapsed = time.perf_counter() - start
+                for hook in self.hooks:
+                    hook.on_refresh(self, success, elapsed)
+            self.generation += 1
+            return success
+
+    def negotiate(self) -> bool:
+        """Performs the steps of refresh() without notifying hooks."""
         logger.debug("Refreshing access key '" + self.key_id + "'")
+        # Other threads keep using the current strategy until a new one is found
+        con_strategy = self.con_strategy
         # 1) Test if local ip is present and reachable
-        if self.con_strategy == "local":
+        if con_strategy == "local":
             if self.test_local():
-                self.con_strategy = "local"
                 logger.debug(
                     "Access key '" + self.key_id + "': con_strategy set to 'local'."
                 )
                 return True
             else:
-                self.con_strategy = "unknown"
+                con_strategy = "unknown"
 
         # 2) Test query jriver service for key data
-        if self.con_strategy == "unknown" or self.con_strategy == "unreachable":
+        if con_strategy == "unknown" or con_strategy == "unreachable":
             logger.debug(
                 "Access key '"
                 + self.key_id
                 + "' has con_strategy '"
-                + self.con_strategy
+                + con_strategy
                 + "' - refreshing."
             )
             self.update_from_jriver()
@@ -114,17 +212,48 @@ class MediaServer:
                 "Access key '" + self.key_id + "': con_strategy set to 'remote'."
             )
             return True
-        # 5) Machine behind key is unreachable
+        # 5) Test if the remote ip is reachable by https
+        if self.test_https():
+            self.con_strategy = "https"
+            logger.debug(
+                "Access key '" + self.key_id + "': con_strategy set to 'https'."
+            )
+            return True
+        # 6) Machine behind key is unreachable
+        self.con_strategy = con_strategy
         return False
 
+    def reserve_connection_pools(self, hosts: int):
+        """Keeps connection pools for at least this many hosts.
+
+        Each route (local ip, remote ip, https) needs its own pool. With fewer pools
+        than routes in use, as with a HealthMonitor, connections are closed and
+        reopened.
+        """
+        with self.refresh_lock:
+            if hosts <= self.pool_connections:
+                return
+            self.pool_connections = hosts
+            self.__mount_adapter()
+
+    def __mount_adapter(self):
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_connections, pool_maxsize=self.pool_size
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
     def address(self):
         """Returns the address of the mediaserver with regard to the currently chosen
         connection strategy. If no strategy was selected, None is returned.
         """
-        if self.con_strategy == "local":
+        con_strategy = self.con_strategy  # read once, it may change concurrently
+        if con_strategy == "local":
             return self.address_local()
-        if self.con_strategy == "remote":
+        if con_strategy == "remote":
             return self.address_remote()
+        if con_strategy == "https":
+            return self.address_https()
         return None
 
     def address_local(self):
@@ -148,16 +277,27 @@ class MediaServer:
             return None
         return URL_API.format(ip=self.remote_ip, port=self.port)
 
+    def address_https(self):
+        """Returns the remote address of the server using https, if it is enabled."""
+        if self.remote_ip is None or self.https_port is None:
+            return None
+        return URL_API_HTTPS.format(ip=self.remote_ip, port=self.https_port)
+
     def test_local(self) -> bool:
+        """Probes the local ips of the server, local_ip is set to the first working one.
+
+        local_ip is only changed once an ip has answered, so concurrent requests never
+        use an address that has not been probed.
+        """
         for ip in self.local_ip_list:
             try:
-                self.local_ip = ip
-                endpoint = self.address_local() + "Alive"
+                endpoint = URL_API.format(ip=ip, port=self.port) + "Alive"
                 r = requests.get(endpoint, timeout=2, auth=self.credentials())
                 if r.status_code == 200:
+                    self.local_ip = ip
                     return True
             except requests.exceptions.RequestException:
-                logger.warn("Failed to connect to local ip: " + self.local_ip)
+                logger.warn("Failed to connect to local ip: " + ip)
 
         return False
 
@@ -171,6 +311,18 @@ class MediaServer:
             logger.warn("Failed to connect to remote ip: " + self.remote_ip)
         return False
 
+    def test_https(self) -> bool:
+        address = self.address_https()
+        if address is None:
+            return False
+        try:
+            r = requests.get(address + "Alive", timeout=3, auth=self.credentials())
+            if r.status_code == 200:
+                return True
+        except requests.exceptions.RequestException:
+            logger.warn("Failed to connect by https to remote ip: " + self.remote_ip)
+        return False
+
     def update_from_jriver(self):
         """Contacts the JRiver WebService to retrieve information about the access key.
 
@@ -193,13 +345,23 @@ class MediaServer:
         self.http_port = et.find("port").text
         self.https_port = et.find("https_port")
         if self.https_port is not None:
+            # servers without https report no or a zero port
             self.https_port = self.https_port.text
+            if self.https_port in (None, "", "0"):
+                self.https_port = None
         self.mac_address_list = et.find("macaddresslist").text.split(",")
         self.last_connection = datetime.now()
 
-    def send_request(self, extension: str, payload=None):
+    def send_request(self, extension: str, payload=None, stream: bool = False):
+        """Sends a request to the endpoint, renegotiating the connection once on failure.
+
+        stream: If True, the response body is not downloaded immediately and can be
+                consumed incrementally, e.g. with utils.iter_mpl_response.
+        If coalesce_reads is enabled, concurrent identical read requests share one
+        request and receive the same response object. Streamed requests are not shared.
+        """
         if self.con_strategy == "unknown":
-            self.refresh()
+            self.refresh(self.generation)
 
         # Clean None values from payload
         if payload is not None:
@@ -207,19 +369,31 @@ class MediaServer:
                 if entry[1] is None:
                     payload.pop(entry[0])
 
+        if self.coalesce_reads and not stream and is_read_request(extension, payload):
+            return self.single_flight.do(
+                request_key(extension, payload),
+                lambda: self.send_with_retry(extension, payload, stream),
+            )
+        return self.send_with_retry(extension, payload, stream)
+
+    def send_with_retry(self, extension: str, payload=None, stream: bool = False):
+        """Sends the request, retrying once after renegotiating the connection."""
+        generation = self.generation
         try:
-            return self.attempt_request(extension, payload)
-        except HTTPError:
+            return self.attempt_request(extension, payload, stream)
+        except HTTPError as error:
             logger.warn(
                 "Failed to contact " + self.key_id + " next failure will cause error."
             )
-            self.refresh()
+            for hook in self.hooks:
+                hook.on_retry(self, extension, error_class(error))
+            self.refresh(generation)
             # TODO Better retry handling
             # Currently, renegotiation happens ones, and fails if that fails
             # as well. Need to consider consequences and expand accordingly
-            return self.attempt_request(extension, payload)
+            return self.attempt_request(extension, payload, stream)
 
-    def attempt_request(self, extension: str, payload=None):
+    def attempt_request(self, extension: str, payload=None, stream: bool = False):
         """Sends a request to the server specified in key_data
 
         Requires a filled-out key_data object. Will send a request to the server
@@ -228,26 +402,126 @@ class MediaServer:
 
         # Get destination
         if self.address() is None:
-            self.refresh()
+            self.refresh(self.generation)
         endpoint = self.address() + extension
         # prepare payload
         if payload is not None:
             params = urllib.parse.urlencode(payload, quote_via=urllib.parse.quote)
         else:
             params = None
-        r = self.session.get(endpoint, params=params)
+        active_trace = tracing.current()
+        if active_trace is not None:
+            start = time.perf_counter()
+        if self.limiter is None and self.scheduler is None:
+            r = self.dispatch(extension, endpoint, params, stream)
+        else:
+            r = self.scheduled_send(extension, endpoint, params, stream)
+        if active_trace is not None:
+            tracing.record_request(
+                active_trace, extension, r, time.perf_counter() - start
+            )
 
         if r.status_code == 404:
             r.raise_for_status()
         self.lastConnection = datetime.now()
         return r
 
+    def scheduled_send(
+        self, extension: str, endpoint: str, params: str = None, stream: bool = False
+    ):
+        """Sends a request through the scheduler and the limiter, if present.
+
+        With both, the scheduler owns the slots and takes their number from the
+        limiter, which only measures the requests. Otherwise an interactive request
+        admitted by the scheduler would wait again behind bulk ones in the limiter.
+        """
+
+        def send():
+            return self.dispatch(extension, endpoint, params, stream)
+
+        if self.scheduler is None:
+            return self.limiter.call(extension, send)
+        if self.limiter is None:
+            return self.scheduler.call(extension, send)
+        return self.scheduler.call(
+            extension, lambda: self.limiter.track(extension, send)
+        )
+
+    def dispatch(
+        self, extension: str, endpoint: str, params: str = None, stream: bool = False
+    ):
+        """Sends a request through the transport, instrumented if hooks are present."""
+        if not self.hooks:
+            return self.transport.send(self, endpoint, params, stream)
+        return self.instrumented_send(extension, endpoint, params, stream)
+
+    def instrumented_send(
+        self, extension: str, endpoint: str, params: str = None, stream: bool = False
+    ):
+        """Sends a request through the transport and reports it to all hooks.
+
+        For streamed responses, the size is taken from the Content-Length header.
+        """
+        route = self.con_strategy
+        start = time.perf_counter()
+        try:
+            r = self.transport.send(self, endpoint, params, stream)
+        except Exception as error:
+            for hook in self.hooks:
+                hook.on_error(self, extension, route, error_class(error))
+            raise
+        elapsed = time.perf_counter() - start
+        if stream:
+            size = int(r.headers.get("Content-Length", 0))
+        else:
+            size = len(r.content)
+        for hook in self.hooks:
+            hook.on_request(self, extension, route, elapsed, r.status_code, size)
+            if r.status_code >= 400:
+                hook.on_error(
+                    self, extension, route, error_class(status_code=r.status_code)
+                )
+        return r
+
+    def add_hook(self, hook):
+        """Registers a hook that is notified about requests, see pymcws.metrics."""
+        # Replace the list instead of changing it, threads may be iterating over it
+        self.hooks = self.hooks + [hook]
+
+    def remove_hook(self, hook):
+        """Unregisters a previously added hook."""
+        hooks = list(self.hooks)
+        hooks.remove(hook)
+        self.hooks = hooks
+
+
+class LazyMixin:
+    """Creates an API wrapper from pymcws.server_mixins on first access.
+
+    The wrapper is then stored on the server instance, which shadows this descriptor,
+    so later accesses are plain attribute lookups.
+    """
+
+    def __init__(self, mixin_name: str):
+        self.mixin_name = mixin_name
+
+    def __set_name__(self, owner, name):
+        self.attribute = name
+
+    def __get__(self, server, owner=None):
+        if server is None:
+            return self
+        from pymcws import server_mixins
+
+        mixin = getattr(server_mixins, self.mixin_name)(server)
+        server.__dict__[self.attribute] = mixin
+        return mixin
+
 
 class ApiMediaServer(MediaServer):
-    def __init__(self, key_id: str, user: str, password: str):
-        super().__init__(key_id, user, password)
-        self.library = Library(self)
-        self.playback = Playback(self)
-        self.file = File(self)
-        self.files = Files(self)
-        self.recipes = Recipes(self)
+    library = LazyMixin("Library")
+    playback = LazyMixin("Playback")
+    file = LazyMixin("File")
+    files = LazyMixin("Files")
+    playlists = LazyMixin("Playlists")
+    recipes = LazyMixin("Recipes")
@@ -0,0 +1,226 @@
+""" Instrumentation of the requests a MediaServer sends.
+
+    Hooks are objects that receive events from a MediaServer. Add them with
+    MediaServer.add_hook(). If no hook is registered, no measurements are taken at all.
+    RequestMetrics is a hook that aggregates request counts, latency histograms, response
+    sizes, retries, refreshes and errors per server, route and MCWS endpoint, and
+    to_prometheus() renders these in the Prometheus text or OpenMetrics format:
+
+        metrics = RequestMetrics()
+        server.add_hook(metrics)
+        server.playback.info()
+        print(to_prometheus(metrics))
+"""
+import threading
+
+# Upper bounds in seconds of the latency histogram buckets
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def error_class(error=None, status_code: int = None) -> str:
+    """Returns a short label for an error: the exception class or the HTTP status."""
+    if error is not None:
+        return type(error).__name__
+    return "HTTP " + str(status_code)
+
+
+class RequestHook:
+    """Base class for hooks. Override the events you are interested in.
+
+    All events receive the media server as first argument. The route is the
+    connection strategy that was used ('local', 'remote', ...).
+    """
+
+    def on_request(
+        self,
+        media_server,
+        extension: str,
+        route: str,
+        elapsed: float,
+        status_code: int,
+        response_bytes: int,
+    ):
+        """Called after every completed HTTP request, regardless of its status."""
+        pass
+
+    def on_error(self, media_server, extension: str, route: str, error: str):
+        """Called for failed requests, error is a label as returned by error_class()."""
+        pass
+
+    def on_retry(self, media_server, extension: str, error: str):
+        """Called when a failed request is retried after refreshing the connection."""
+        pass
+
+    def on_refresh(self, media_server, success: bool, elapsed: float):
+        """Called after the connection strategy has been renegotiated."""
+        pass
+
+
+class _Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+
+class RequestMetrics(RequestHook):
+    """Aggregates request metrics in memory. Safe to share between threads and servers."""
+
+    def __init__(self, buckets: tuple = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Discards all collected values."""
+        with self.lock:
+            # (server, route, endpoint) -> value
+            self.requests = {}
+            self.latency = {}
+            self.response_bytes = {}
+            # (server, route, endpoint, error) -> count
+            self.errors = {}
+            # (server, endpoint, error) -> count
+            self.retries = {}
+            # (server, result) -> count
+            self.refreshes = {}
+
+    def on_request(
+        self, media_server, extension, route, elapsed, status_code, response_bytes
+    ):
+        labels = (media_server.key_id, route, extension)
+        with self.lock:
+            self.requests[labels] = self.requests.get(labels, 0) + 1
+            histogram = self.latency.get(labels, None)
+            if histogram is None:
+                histogram = self.latency[labels] = _Histogram(self.buckets)
+            histogram.observe(elapsed)
+            self.response_bytes[labels] = (
+                self.response_bytes.get(labels, 0) + response_bytes
+            )
+
+    def on_error(self, media_server, extension, route, error):
+        labels = (media_server.key_id, route, extension, error)
+        with self.lock:
+            self.errors[labels] = self.errors.get(labels, 0) + 1
+
+    def on_retry(self, media_server, extension, error):
+        labels = (media_server.key_id, extension, error)
+        with self.lock:
+            self.retries[labels] = self.retries.get(labels, 0) + 1
+
+    def on_refresh(self, media_server, success, elapsed):
+        labels = (media_server.key_id, "success" if success else "failure")
+        with self.lock:
+            self.refreshes[labels] = self.refreshes.get(labels, 0) + 1
+
+
+def _labels(names: tuple, values: tuple, extra: str = None) -> str:
+    parts = []
+    for name, value in zip(names, values):
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        parts.append(name + '="' + value + '"')
+    if extra is not None:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}"
+
+
+def _format_float(value: float) -> str:
+    return repr(float(value))
+
+
+def to_prometheus(metrics: RequestMetrics, openmetrics: bool = False) -> str:
+    """Renders collected metrics in the Prometheus text exposition format.
+
+    openmetrics: Render OpenMetrics instead, which names counters without the
+                 _total suffix in the metadata and terminates with '# EOF'.
+    """
+    lines = []
+    request_labels = ("server", "route", "endpoint")
+
+    def counter(name, help_text, values, label_names):
+        family = name if openmetrics else name + "_total"
+        lines.append("# HELP " + family + " " + help_text)
+        lines.append("# TYPE " + family + " counter")
+        for labels, value in sorted(values.items()):
+            lines.append(
+                name + "_total" + _labels(label_names, labels) + " " + str(value)
+            )
+
+    with metrics.lock:
+        counter(
+            "pymcws_requests",
+            "Requests sent to MCWS.",
+            metrics.requests,
+            request_labels,
+        )
+        counter(
+            "pymcws_response_bytes",
+            "Bytes received in response bodies.",
+            metrics.response_bytes,
+            request_labels,
+        )
+        counter(
+            "pymcws_errors",
+            "Failed requests by error class.",
+            metrics.errors,
+            request_labels + ("error",),
+        )
+        counter(
+            "pymcws_retries",
+            "Requests retried after a failure.",
+            metrics.retries,
+            ("server", "endpoint", "error"),
+        )
+        counter(
+            "pymcws_refreshes",
+            "Renegotiations of the connection strategy.",
+            metrics.refreshes,
+            ("server", "result"),
+        )
+
+        name = "pymcws_request_duration_seconds"
+        lines.append("# HELP " + name + " Latency of requests to MCWS.")
+        lines.append("# TYPE " + name + " histogram")
+        for labels, histogram in sorted(metrics.latency.items()):
+            cumulative = 0
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                cumulative += count
+                le = 'le="' + _format_float(bound) + '"'
+                lines.append(
+                    name
+                    + "_bucket"
+                    + _labels(request_labels, labels, le)
+                    + " "
+                    + str(cumulative)
+                )
+            lines.append(
+                name
+                + "_bucket"
+                + _labels(request_labels, labels, 'le="+Inf"')
+                + " "
+                + str(histogram.count)
+            )
+            lines.append(
+                name + "_sum" + _labels(request_labels, labels) + " " + repr(histogram.sum)
+            )
+            lines.append(
+                name
+                + "_count"
+                + _labels(request_labels, labels)
+                + " "
+                + str(histogram.count)
+            )
+
+    if openmetrics:
+        lines.append("# EOF")
+    return "\n".join(lines) + "\n"
@@ -58,6 +58,62 @@ class Zone:
         return self.name
 
 
+class ZoneSnapshot:
+    """The playback state of one zone at one point in time.
+
+    Created by playback.snapshot(). The raw response of Playback/Info is kept in info.
+    """
+
+    # Attributes compared by changes()
+    STATE_ATTRIBUTES = (
+        "state",
+        "file_key",
+        "next_file_key",
+        "position",
+        "duration",
+        "volume",
+        "muted",
+        "playlist_index",
+        "playlist_length",
+        "repeat",
+        "shuffle",
+    )
+
+    def __init__(self, zone: Zone, info: dict, repeat: str, shuffle: str):
+        self.zone = zone
+        self.info = info
+        self.state = int(info.get("State", 0))
+        self.file_key = int(info.get("FileKey", -1))
+        self.next_file_key = int(info.get("NextFileKey", -1))
+        self.position = int(info.get("PositionMS", 0))
+        self.duration = int(info.get("DurationMS", 0))
+        self.volume = float(info.get("Volume", 0.0))
+        self.muted = info.get("VolumeDisplay", None) == "Muted"
+        self.playlist_index = int(info.get("PlayingNowPosition", -1))
+        self.playlist_length = int(info.get("PlayingNowTracks", 0))
+        self.artist = info.get("Artist", None)
+        self.album = info.get("Album", None)
+        self.name = info.get("Name", None)
+        self.repeat = repeat
+        self.shuffle = shuffle
+
+    def changes(self, previous: "ZoneSnapshot") -> dict:
+        """Returns the attributes that differ from a previous snapshot, with new values.
+
+        All attributes are returned if previous is None.
+        """
+        return {
+            name: getattr(self, name)
+            for name in self.STATE_ATTRIBUTES
+            if previous is None or getattr(previous, name) != getattr(self, name)
+        }
+
+    def __repr__(self):
+        return "ZoneSnapshot({}, state={}, file_key={}, volume={})".format(
+            self.zone.name, self.state, self.file_key, self.volume
+        )
+
+
 class MediaFile(dict):
     """ A class behaving like a dict that represents a file object on a media server.
 
@@ -84,7 +140,8 @@ class MediaFile(dict):
             self.__changed[key] = False
 
     def __setitem__(self, key, val):
-        if val != self.get(key, None):
+        # A field the file does not hold is changed even by None, which clears it
+        if key not in self or val != self[key]:
             dict.__setitem__(self, key, val)
             self.__changed[key] = True
 
@@ -98,6 +155,19 @@ class MediaFile(dict):
             filter(lambda elem: self.__changed[elem[0]] is not False, self.items())
         )
 
+    def copy(self):
+        """Returns an independent MediaFile with the same values and changed fields.
+
+        List values are copied as well, so editing the copy never changes this file.
+        """
+        result = MediaFile(self.__server, {})
+        for key, value in self.items():
+            if isinstance(value, list):
+                value = list(value)
+            dict.__setitem__(result, key, value)
+        result.__changed = dict(self.__changed)
+        return result
+
 
 def transform_path(
     files,
@@ -107,11 +177,16 @@ def transform_path(
     unix_to_win: bool = False,
 ):
     """ Helper method that translates Windows and Unix filepaths in JRFiles
+
+        Returns a new list of the translated paths. For prefix-based mapping of whole
+        libraries, see pymcws.paths.PathMapper.
     """
+    result = []
     for file in files:
         file = file.replace(search_for, replace_with)
         if win_to_unix:
             file = file.replace("\\", "/")
         elif unix_to_win:
             file = file.replace("/", "\\")
-    return files
+        result.append(file)
+    return result
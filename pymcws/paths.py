@@ -0,0 +1,135 @@
+""" Translation of file paths between the server and the local machine.
+
+    Paths returned by JRiver are valid on the server, e.g. D:\\Music\\track.flac, while
+    a client on another machine may see the same file as /mnt/music/track.flac.
+    A PathMapper holds prefix rules, compiled into one dictionary per prefix length,
+    so mapping a path costs one lookup per distinct prefix length and the longest
+    matching prefix wins. Installed on a server, it translates all Path fields (like
+    Filename) while files are decoded, and translates them back before they are saved:
+
+        mapper = PathMapper({"D:\\Music": "/mnt/music", "E:\\": "/mnt/e"})
+        mapper.install(server)
+        server.files.search(...)[0]["Filename"]  # '/mnt/music/Artist/track.flac'
+"""
+from pymcws.field_codecs import StringCodec
+
+
+class _PrefixTable:
+    """Maps prefixes of paths, choosing the longest matching prefix."""
+
+    def __init__(self, rules: list, separator: str, ignore_case: bool):
+        self.separator = separator
+        self.ignore_case = ignore_case
+        self.__tables = {}
+        for source, target in rules:
+            source = source.rstrip(separator)
+            key = source.casefold() if ignore_case else source
+            self.__tables.setdefault(len(source), {}).setdefault(key, target)
+        self.__lengths = sorted(self.__tables, reverse=True)
+
+    def match(self, path: str) -> tuple:
+        """Returns the target and length of the longest prefix of path, or None."""
+        separator = self.separator
+        for length in self.__lengths:
+            # A prefix only matches whole path components
+            if len(path) > length and path[length] != separator:
+                continue
+            prefix = path[:length]
+            if self.ignore_case:
+                prefix = prefix.casefold()
+            target = self.__tables[length].get(prefix, None)
+            if target is not None:
+                return target, length
+        return None
+
+
+class PathCodec(StringCodec):
+    """Codec for Path fields that maps paths with a PathMapper."""
+
+    def __init__(self, mapper):
+        self.mapper = mapper
+
+    def decode(self, value):
+        return self.mapper.to_local(value)
+
+    def encode(self, value):
+        return StringCodec.encode(self, self.mapper.to_server(value))
+
+
+class PathMapper:
+    """Translates paths between server and local machine by prefix rules."""
+
+    def __init__(
+        self,
+        rules,
+        server_separator: str = "\\",
+        local_separator: str = "/",
+        ignore_case: bool = True,
+    ):
+        """rules:            Server prefixes mapped to local prefixes, as a dictionary
+                          or a list of pairs.
+        server_separator: The path separator of the server.
+        local_separator:  The path separator of the local machine.
+        ignore_case:      Match server prefixes case-insensitively, like Windows does.
+        """
+        if isinstance(rules, dict):
+            rules = list(rules.items())
+        self.rules = rules
+        self.server_separator = server_separator
+        self.local_separator = local_separator
+        self.__to_local = _PrefixTable(rules, server_separator, ignore_case)
+        self.__to_server = _PrefixTable(
+            [(local, server) for server, local in rules], local_separator, False
+        )
+
+    def to_local(self, path: str) -> str:
+        """Translates a server path. Paths without a matching rule are unchanged."""
+        return self.__translate(
+            path, self.__to_local, self.server_separator, self.local_separator
+        )
+
+    def to_server(self, path: str) -> str:
+        """Translates a local path back. Paths without a matching rule are unchanged."""
+        return self.__translate(
+            path, self.__to_server, self.local_separator, self.server_separator
+        )
+
+    def map_local(self, paths):
+        """Translates an iterable of server paths lazily."""
+        to_local = self.to_local
+        return (to_local(path) for path in paths)
+
+    def map_server(self, paths):
+        """Translates an iterable of local paths back lazily."""
+        to_server = self.to_server
+        return (to_server(path) for path in paths)
+
+    def codec(self) -> PathCodec:
+        """Returns a codec that maps the values of Path fields."""
+        return PathCodec(self)
+
+    def install(self, media_server):
+        """Maps the Path fields of all files decoded and saved by the server.
+
+        Also applies to the fields loaded later, see library.fields().
+        """
+        media_server.path_mapper = self
+        codec = self.codec()
+        for field in media_server.fields.values():
+            if field["DataType"] == "Path":
+                field["Decoder"] = codec.decode
+                field["Encoder"] = codec.encode
+
+    def __translate(self, path, table, separator, new_separator):
+        if not path:
+            return path
+        match = table.match(path)
+        if match is None:
+            return path
+        target, length = match
+        rest = path[length:]
+        if separator != new_separator:
+            rest = rest.replace(separator, new_separator)
+        if rest and target.endswith(new_separator):
+            rest = rest[1:]
+        return target + rest
@@ -0,0 +1,160 @@
+""" Prioritized scheduling of the requests to a media server.
+
+    Requests fall into three priority classes: interactive (playback commands), normal
+    (searches, tagging) and bulk (image downloads, or anything run inside
+    'with priority(BULK)'). A RequestScheduler assigned to MediaServer.scheduler bounds
+    the requests in flight and always starts waiting interactive requests first. Some
+    slots are reserved for interactive requests, so pressing pause never waits for a
+    slot behind a large search. Waiting normal and bulk requests gain priority with
+    their waiting time, so bulk work is never starved:
+
+        server.scheduler = RequestScheduler(slots=8, reserved=2)
+        with priority(BULK):
+            for file in files:
+                server.files.get_image(file)
+
+    The class of a request is taken from the endpoint, see endpoint_priority().
+    Set MediaServer's pool_size to at least the number of slots. If MediaServer.limiter
+    is set as well, the scheduler uses the limit of the AdaptiveLimiter as its number of
+    slots (at most slots), so requests wait in priority order only once.
+"""
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+INTERACTIVE = 0
+NORMAL = 1
+BULK = 2
+PRIORITY_NAMES = ("interactive", "normal", "bulk")
+
+# Endpoints that deviate from the defaults of endpoint_priority()
+ENDPOINT_PRIORITIES = {
+    "Playback/Playlist": NORMAL,
+    "Playback/SetPlayList": NORMAL,
+    "File/GetImage": BULK,
+}
+
+_local = threading.local()
+
+
+def endpoint_priority(extension: str) -> int:
+    """Returns the default priority class of requests to an endpoint."""
+    result = ENDPOINT_PRIORITIES.get(extension, None)
+    if result is not None:
+        return result
+    if extension.startswith("Playback/") or extension == "Alive":
+        return INTERACTIVE
+    return NORMAL
+
+
+def request_priority(extension: str) -> int:
+    """Returns the priority of a request sent by the current thread."""
+    override = getattr(_local, "priority", None)
+    return endpoint_priority(extension) if override is None else override
+
+
+@contextmanager
+def priority(value: int):
+    """Sends all requests of the current thread within the block with this priority."""
+    previous = getattr(_local, "priority", None)
+    _local.priority = value
+    try:
+        yield
+    finally:
+        _local.priority = previous
+
+
+class _Waiter:
+    def __init__(self, priority_class: int):
+        self.priority = priority_class
+        self.since = time.monotonic()
+        self.event = threading.Event()
+
+
+class RequestScheduler:
+    """Starts requests by priority class, with slots reserved for interactive ones."""
+
+    def __init__(self, slots: int = 8, reserved: int = 2, aging: float = 1.0):
+        """slots:    Maximum number of requests in flight.
+        reserved: Slots only used by interactive requests.
+        aging:    Seconds of waiting after which a request is treated like one of the
+                  next higher class.
+        """
+        self.slots = max(1, slots)
+        self.reserved = min(max(0, reserved), self.slots - 1)
+        self.aging = aging
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.started = [0, 0, 0]
+        # Optional pymcws.limiter.AdaptiveLimiter bounding the number of slots
+        self.limiter = None
+        self.__queues = (deque(), deque(), deque())
+
+    def stats(self) -> dict:
+        """Returns the requests in flight and the waiting and started ones per class."""
+        with self.lock:
+            result = {"in_flight": self.in_flight}
+            for i, name in enumerate(PRIORITY_NAMES):
+                result[name + "_queued"] = len(self.__queues[i])
+                result[name + "_started"] = self.started[i]
+            return result
+
+    def acquire(self, priority_class: int):
+        """Waits until a request of the given class may start."""
+        waiter = _Waiter(priority_class)
+        with self.lock:
+            self.__queues[priority_class].append(waiter)
+            self.__dispatch()
+        waiter.event.wait()
+
+    def release(self):
+        """Marks a request as finished and starts waiting ones."""
+        with self.lock:
+            self.in_flight -= 1
+            self.__dispatch()
+
+    def call(self, extension: str, function):
+        """Runs function, which sends a request to extension, once it is scheduled."""
+        self.acquire(request_priority(extension))
+        try:
+            return function()
+        finally:
+            self.release()
+
+    def __slots(self) -> int:
+        if self.limiter is None:
+            return self.slots
+        return max(1, min(self.slots, int(self.limiter.limit)))
+
+    def __limit(self, priority_class: int) -> int:
+        slots = self.__slots()
+        if priority_class == INTERACTIVE:
+            return slots
+        return slots - min(self.reserved, slots - 1)
+
+    def __effective(self, priority_class: int, now: float) -> float:
+        waited = now - self.__queues[priority_class][0].since
+        return priority_class - (waited / self.aging if self.aging > 0 else 0.0)
+
+    def __start(self, priority_class: int):
+        waiter = self.__queues[priority_class].popleft()
+        self.in_flight += 1
+        self.started[priority_class] += 1
+        waiter.event.set()
+
+    def __dispatch(self):
+        # Called with the lock held
+        now = time.monotonic()
+        while True:
+            waiting = [c for c in (INTERACTIVE, NORMAL, BULK) if self.__queues[c]]
+            if not waiting:
+                return
+            best = min(waiting, key=lambda c: (self.__effective(c, now), c))
+            if self.in_flight < self.__limit(best):
+                self.__start(best)
+            elif self.__queues[INTERACTIVE] and self.in_flight < self.__slots():
+                # aged requests may not take the reserved slots
+                self.__start(INTERACTIVE)
+            else:
+                return
@@ -8,7 +8,10 @@ class MediaServerDummy:
     def __init__(self, server):
         self.__server = server
         self.send_request = self.__server.send_request
-        self.fields = self.__server.fields
+
+    def __getattr__(self, name):
+        # Everything else, e.g. fields, is looked up on the server when needed
+        return getattr(self.__server, name)
 
 
 class File(MediaServerDummy):
@@ -16,7 +19,13 @@ class File(MediaServerDummy):
 
 
 class Files(MediaServerDummy):
-    from pymcws.api.files import get_image, search, transform_mpl_response
+    from pymcws.api.files import (
+        get_image,
+        search,
+        iter_search,
+        search_keys,
+        transform_mpl_response,
+    )
 
 
 class Library(MediaServerDummy):
@@ -27,6 +36,7 @@ class Library(MediaServerDummy):
         create_field,
         fields,
         get_loaded,
+        values,
     )
 
 
@@ -49,7 +59,19 @@ class Playback(MediaServerDummy):
         info,
         playlist,
         set_playlist,
+        add_to_playlist,
         zones,
+        cached_zones,
+        snapshot,
+    )
+
+
+class Playlists(MediaServerDummy):
+    from pymcws.api.playlists import (
+        get_list,
+        files,
+        iter_files,
+        keys,
     )
 
 
@@ -0,0 +1,92 @@
+""" Coalescing of identical concurrent requests.
+
+    If MediaServer.coalesce_reads is enabled, a read request that is identical to one
+    that is already in flight (same endpoint and parameters) does not go to the server
+    again. Instead, the caller waits for the running request and receives the same
+    response. Requests that change state on the server are never coalesced.
+"""
+import threading
+
+# Endpoints that never change state on the server
+READ_ENDPOINTS = {
+    "Alive",
+    "Library/List",
+    "Library/Fields",
+    "Library/Values",
+    "File/GetInfo",
+    "File/GetImage",
+    "Playback/Info",
+    "Playback/Zones",
+    "Playlists/List",
+}
+
+# Endpoints whose Action parameter decides between returning and playing files
+ACTION_ENDPOINTS = {"Files/Search", "Playlist/Files", "Playback/Playlist"}
+
+# Actions that only return files
+READ_ACTIONS = {"MPL", "Serialize", "JSON"}
+
+
+def is_read_request(extension: str, payload: dict = None) -> bool:
+    """Returns True if the request only reads data and can be shared."""
+    if extension in READ_ENDPOINTS:
+        return True
+    if extension not in ACTION_ENDPOINTS:
+        return False
+    payload = payload or {}
+    if payload.get("Action", "MPL") not in READ_ACTIONS:
+        return False
+    # Shuffled results and saved playlists must not be shared
+    return payload.get("Shuffle", "0") != "1" and not payload.get("SaveMode", None)
+
+
+def request_key(extension: str, payload: dict = None) -> tuple:
+    """Returns a key that is equal for requests with equal endpoint and parameters."""
+    if not payload:
+        return (extension,)
+    return (extension,) + tuple(sorted((str(k), str(v)) for k, v in payload.items()))
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Runs a function once per key for all callers that ask at the same time."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+        # Number of callers that received the result of another caller's call
+        self.shared = 0
+
+    def do(self, key, function):
+        """Returns function(), or the result of a running call with the same key.
+
+        Exceptions of the call are raised in all waiting callers.
+        """
+        with self.lock:
+            call = self.calls.get(key, None)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = _Call()
+            else:
+                self.shared += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = function()
+        except BaseException as error:
+            call.error = error
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.done.set()
+        return call.result
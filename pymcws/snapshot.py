@@ -0,0 +1,331 @@
+""" Snapshots of the editable tags of a library, and restoring them.
+
+    A snapshot is an SQLite database with one zlib compressed row per file, indexed by
+    file key. It holds the values of all editable fields (see library.fields) exactly
+    as MCWS returns them, so a restore writes back the original strings without
+    decoding and encoding them again. Restoring streams the current tags of the
+    snapshot files in key ranges, compares them with the snapshot and writes only the
+    fields that differ, on a bounded pool of concurrent requests:
+
+        pymcws-snapshot AccessKey save before-retagging.snapshot
+        pymcws-snapshot AccessKey restore before-retagging.snapshot --parallel 8
+
+    Files created after the snapshot are not touched, files deleted since are counted
+    as missing.
+"""
+import argparse
+import csv
+import io
+import json
+import logging
+import os
+import pathlib
+import sqlite3
+import tempfile
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from pymcws.cli import add_server_arguments, server_from_args, Progress
+from pymcws.export import key_ranges
+from pymcws.utils import iter_mpl_items
+
+logger = logging.getLogger(__name__)
+
+# Version of the snapshot file layout
+SNAPSHOT_VERSION = 1
+
+
+def editable_fields(media_server) -> list:
+    """Returns the names of the fields that can be written, in server order."""
+    return [
+        name
+        for name, field in media_server.fields.items()
+        if field["EditType"] != "Not editable"
+    ]
+
+
+def _stream_items(media_server, query: str, fields: list):
+    payload = {"Action": "MPL", "Query": query, "Fields": ",".join(fields)}
+    response = media_server.send_request("Files/Search", payload, stream=True)
+    response.raise_for_status()
+    try:
+        yield from iter_mpl_items(response)
+    finally:
+        response.close()
+
+
+def _pack(values: list) -> bytes:
+    return zlib.compress(json.dumps(values, ensure_ascii=False).encode("utf-8"))
+
+
+def _unpack(data: bytes) -> list:
+    return json.loads(zlib.decompress(data).decode("utf-8"))
+
+
+class Snapshot:
+    """Read access to a snapshot file."""
+
+    def __init__(self, path: str):
+        """Raises ValueError if path is missing or not a snapshot."""
+        self.path = path
+        if not os.path.isfile(path):
+            raise ValueError("Snapshot not found: " + path)
+        # Read only, so a wrong path never creates or changes a file
+        uri = pathlib.Path(path).absolute().as_uri() + "?mode=ro"
+        self.connection = sqlite3.connect(uri, uri=True)
+        try:
+            meta = dict(self.connection.execute("SELECT name, value FROM meta"))
+            if int(meta.get("version", 0)) != SNAPSHOT_VERSION:
+                raise ValueError("Unsupported snapshot version: " + path)
+            self.query = meta["query"]
+            self.fields = json.loads(meta["fields"])
+            self.created = float(meta["created"])
+        except (sqlite3.Error, KeyError) as error:
+            self.connection.close()
+            raise ValueError("Not a snapshot: " + path) from error
+        except ValueError:
+            self.connection.close()
+            raise
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+
+    def get(self, key: int) -> dict:
+        """Returns the raw values of a file by field name, None if it is missing."""
+        row = self.connection.execute(
+            "SELECT data FROM files WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(self.fields, _unpack(row[0])))
+
+    def keys(self) -> list:
+        """Returns the keys of all files in the snapshot, in ascending order."""
+        return [row[0] for row in self.connection.execute("SELECT key FROM files")]
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def save_snapshot(
+    media_server,
+    path: str,
+    query: str = "",
+    fields: list = None,
+    batch_size: int = 1000,
+    progress: Progress = None,
+) -> int:
+    """Writes the editable tags of the files matching query to path.
+
+    Returns the number of files. An existing snapshot at path is only replaced once
+    the new one is complete.
+    fields: The fields to include, defaults to all editable fields.
+    """
+    fields = [f for f in fields or editable_fields(media_server) if f != "Key"]
+    directory = os.path.dirname(os.path.abspath(path))
+    handle, temporary = tempfile.mkstemp(suffix=".tmp", dir=directory)
+    os.close(handle)
+    connection = sqlite3.connect(temporary)
+    count = 0
+    try:
+        with connection:
+            connection.execute("CREATE TABLE meta (name TEXT PRIMARY KEY, value TEXT)")
+            connection.execute(
+                "CREATE TABLE files (key INTEGER PRIMARY KEY, data BLOB)"
+            )
+            connection.executemany(
+                "INSERT INTO meta VALUES (?, ?)",
+                [
+                    ("version", str(SNAPSHOT_VERSION)),
+                    ("query", query),
+                    ("fields", json.dumps(fields)),
+                    ("created", str(time.time())),
+                ],
+            )
+            rows = []
+            for item in _stream_items(media_server, query, ["Key"] + fields):
+                values = [item.get(field, None) or "" for field in fields]
+                rows.append((int(item["Key"]), _pack(values)))
+                if len(rows) >= batch_size:
+                    connection.executemany("INSERT INTO files VALUES (?, ?)", rows)
+                    count += len(rows)
+                    rows = []
+                if progress is not None:
+                    progress.update()
+            connection.executemany("INSERT INTO files VALUES (?, ?)", rows)
+            count += len(rows)
+        connection.close()
+        os.replace(temporary, path)
+    except BaseException:
+        connection.close()
+        os.remove(temporary)
+        raise
+    return count
+
+
+class RestoreResult:
+    """Counts of a restore and its failures as (key, error) tuples."""
+
+    def __init__(self):
+        self.files = 0
+        self.changed = 0
+        self.values = 0
+        self.missing = 0
+        self.failures = []
+
+    def __repr__(self):
+        return "RestoreResult(files={}, changed={}, missing={}, failures={})".format(
+            self.files, self.changed, self.missing, len(self.failures)
+        )
+
+
+def set_raw_info(media_server, key: int, values: dict):
+    """Sets fields of a file to values as MCWS returns them, without encoding."""
+    fields = io.StringIO()
+    csv.writer(fields, lineterminator="").writerow(values.keys())
+    encoded = io.StringIO()
+    csv.writer(encoded, lineterminator="", quoting=csv.QUOTE_ALL).writerow(
+        values.values()
+    )
+    payload = {
+        "File": key,
+        "FileType": "Key",
+        "List": "CSV",
+        "Field": fields.getvalue(),
+        "Value": encoded.getvalue(),
+    }
+    response = media_server.send_request("File/SetInfo", payload)
+    response.raise_for_status()
+    return response
+
+
+def restore_snapshot(
+    media_server,
+    path: str,
+    fields: list = None,
+    parallel: int = 8,
+    max_queue: int = 1000,
+    chunk_size: int = 10000,
+    dry_run: bool = False,
+    progress: Progress = None,
+) -> RestoreResult:
+    """Writes back the values of a snapshot that differ from the current tags.
+
+    fields:     Restore only these fields, defaults to all fields of the snapshot.
+    parallel:   Number of concurrent writes.
+    max_queue:  Maximum number of files waiting to be written.
+    chunk_size: Number of keys per search. Files are searched by key, not by the
+                query of the snapshot, which may no longer match after retagging.
+    dry_run:    Only count the differences.
+    """
+    result = RestoreResult()
+    lock = threading.Lock()
+    queue = threading.BoundedSemaphore(max(1, max_queue))
+
+    def write(key, values):
+        try:
+            set_raw_info(media_server, key, values)
+        except Exception as error:
+            logger.warning("Restoring file " + str(key) + " failed: " + str(error))
+            with lock:
+                result.failures.append((key, error))
+        finally:
+            queue.release()
+
+    with Snapshot(path) as snapshot:
+        known = media_server.fields
+        restored = [
+            f for f in fields or snapshot.fields if f in snapshot.fields and f in known
+        ]
+        if not restored:
+            raise ValueError("None of the fields are in the snapshot and the library.")
+        total = len(snapshot)
+        with ThreadPoolExecutor(
+            max_workers=max(1, parallel), thread_name_prefix="pymcws-restore"
+        ) as pool:
+            for low, high in key_ranges(snapshot.keys(), chunk_size):
+                query = "[Key]=" + str(low) + "-" + str(high)
+                for item in _stream_items(media_server, query, ["Key"] + restored):
+                    key = int(item["Key"])
+                    saved = snapshot.get(key)
+                    if saved is None:
+                        continue
+                    result.files += 1
+                    if progress is not None:
+                        progress.update()
+                    changes = {
+                        field: saved[field]
+                        for field in restored
+                        if saved[field] != (item.get(field, None) or "")
+                    }
+                    if not changes:
+                        continue
+                    result.changed += 1
+                    result.values += len(changes)
+                    if not dry_run:
+                        queue.acquire()
+                        pool.submit(write, key, changes)
+        result.missing = total - result.files
+    return result
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Save the editable tags of a library, or restore them."
+    )
+    add_server_arguments(parser)
+    commands = parser.add_subparsers(dest="command", required=True)
+    save = commands.add_parser("save", help="write a snapshot")
+    save.add_argument("snapshot", help="snapshot file to write")
+    save.add_argument("--query", default="", help="jriver query, default all files")
+    save.add_argument("--fields", help="comma separated fields, default all editable")
+    restore = commands.add_parser("restore", help="write back changed tags")
+    restore.add_argument("snapshot", help="snapshot file to restore")
+    restore.add_argument("--fields", help="comma separated fields, default all")
+    restore.add_argument("--parallel", type=int, default=8, help="concurrent writes")
+    restore.add_argument("--max-queue", type=int, default=1000, help="pending files")
+    restore.add_argument("--dry-run", action="store_true", help="only count changes")
+    args = parser.parse_args(argv)
+
+    server = server_from_args(args)
+    fields = args.fields.split(",") if args.fields else None
+    if args.command == "save":
+        progress = Progress("Saved")
+        save_snapshot(
+            server, args.snapshot, query=args.query, fields=fields, progress=progress
+        )
+        progress.finish()
+        return 0
+    progress = Progress("Compared")
+    try:
+        result = restore_snapshot(
+            server,
+            args.snapshot,
+            fields=fields,
+            parallel=args.parallel,
+            max_queue=args.max_queue,
+            dry_run=args.dry_run,
+            progress=progress,
+        )
+    except ValueError as error:
+        progress.finish()
+        logger.error(str(error))
+        return 2
+    progress.finish()
+    print(
+        "{} files, {} changed, {} values, {} missing, {} failures".format(
+            result.files,
+            result.changed,
+            result.values,
+            result.missing,
+            len(result.failures),
+        )
+    )
+    return 1 if result.failures else 0
@@ -0,0 +1,129 @@
+""" Opt-in tracing of the phases of a call into pymcws.
+
+    Wrap a call in trace() to find out where its time goes:
+
+        with trace() as t:
+            server.files.search("[Media Type]=[Audio]")
+        print(t.report())
+
+    The following phases are recorded:
+    - server:    time until MCWS started to answer (query time on the JRiver side)
+    - transfer:  time spent receiving the response body
+    - parse:     XML parsing
+    - decode:    conversion of field values into python types, also reported per field.
+                 With parallel decoding or interning (see MediaServer.decode_pool and
+                 intern_values), parsing, decoding and construction are reported
+                 together as decode, without fields.
+    - construct: creation of MediaFile objects
+    - encode:    conversion of python values into jriver values in file.set_info,
+                 also reported per field
+
+    Traces are thread-local. When no trace is active, pymcws does not take any timings.
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+_local = threading.local()
+
+
+class Trace:
+    """The spans and per-field costs collected while a trace was active."""
+
+    def __init__(self):
+        self.spans = []  # (phase, seconds, detail)
+        self.fields = {}  # (phase, field) -> [seconds, count]
+
+    def add(self, phase: str, seconds: float, detail: str = None):
+        self.spans.append((phase, seconds, detail))
+
+    def add_field(self, phase: str, field: str, seconds: float, count: int = 1):
+        entry = self.fields.get((phase, field), None)
+        if entry is None:
+            self.fields[(phase, field)] = [seconds, count]
+        else:
+            entry[0] += seconds
+            entry[1] += count
+
+    def totals(self) -> dict:
+        """Returns the total seconds spent per phase."""
+        result = {}
+        for phase, seconds, detail in self.spans:
+            result[phase] = result.get(phase, 0.0) + seconds
+        return result
+
+    def field_costs(self, phase: str = "decode") -> list:
+        """Returns (field, seconds, count) for a phase, most expensive first."""
+        result = [
+            (field, entry[0], entry[1])
+            for (entry_phase, field), entry in self.fields.items()
+            if entry_phase == phase
+        ]
+        result.sort(key=lambda entry: entry[1], reverse=True)
+        return result
+
+    def report(self, top_fields: int = 10) -> str:
+        """Returns a human readable summary of the trace."""
+        lines = []
+        for phase, seconds in self.totals().items():
+            lines.append("{:<10} {:>10.2f} ms".format(phase, seconds * 1000))
+            for field, field_seconds, count in self.field_costs(phase)[:top_fields]:
+                lines.append(
+                    "    {:<30} {:>10.2f} ms {:>8} values".format(
+                        field, field_seconds * 1000, count
+                    )
+                )
+        return "\n".join(lines)
+
+
+def current() -> Trace:
+    """Returns the innermost active trace of this thread, or None."""
+    stack = getattr(_local, "stack", None)
+    if not stack:
+        return None
+    return stack[-1]
+
+
+@contextmanager
+def trace(callback=None):
+    """Activates a trace for the current thread while the context is entered.
+
+    callback: Optional function that is called with the trace once the context exits.
+    """
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    result = Trace()
+    stack.append(result)
+    try:
+        yield result
+    finally:
+        stack.pop()
+        if callback is not None:
+            callback(result)
+
+
+@contextmanager
+def span(phase: str, detail: str = None):
+    """Records the duration of the enclosed block as a span, if a trace is active."""
+    active = current()
+    if active is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        active.add(phase, time.perf_counter() - start, detail)
+
+
+def record_request(active: Trace, extension: str, response, seconds: float):
+    """Splits the duration of a request into server and transfer time.
+
+    requests measures the time until the response headers were parsed as elapsed,
+    the remainder was spent receiving the body.
+    """
+    elapsed = getattr(response, "elapsed", None)
+    server = min(elapsed.total_seconds(), seconds) if elapsed is not None else seconds
+    active.add("server", server, extension)
+    active.add("transfer", seconds - server, extension)
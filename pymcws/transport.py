@@ -0,0 +1,160 @@
+""" Transports send the HTTP requests of a MediaServer.
+
+    By default, requests go through the requests session of the server. The recording
+    and replaying transports allow to capture real MCWS traffic into a compact archive
+    and to play it back later without a JRiver instance, e.g. for benchmarks:
+
+        server = pymcws.get_media_server("AccessKey", "user", "password")
+        server.transport = RecordingTransport("office.jsonl.gz")
+        server.files.search("[Media Type]=[Audio]")
+        server.transport.close()
+
+        replay = pymcws.get_media_server("localhost", None, None)
+        replay.transport = ReplayTransport("office.jsonl.gz", scale=0.0)
+        replay.files.search("[Media Type]=[Audio]")
+
+    Use the key 'localhost' for replaying, so that the server is not resolved online.
+"""
+import base64
+import gzip
+import json
+import threading
+import time
+from datetime import timedelta
+import requests
+from requests.structures import CaseInsensitiveDict
+from urllib.parse import parse_qsl, urlencode, quote
+from pymcws.exceptions import ReplayMissError
+
+# Request parameters that may carry credentials and are never written to archives
+SCRUBBED_PARAMS = ("Token", "Password", "Username", "User", "Key_ID")
+SCRUBBED_VALUE = "SCRUBBED"
+
+
+def _split_endpoint(endpoint: str) -> str:
+    """Returns the part of the endpoint after the api root, i.e. 'Playback/Info'."""
+    return endpoint.split("/MCWS/v1/", 1)[-1]
+
+
+def _scrub(params: str) -> str:
+    if not params:
+        return ""
+    pairs = parse_qsl(params, keep_blank_values=True)
+    pairs = [
+        (name, SCRUBBED_VALUE if name in SCRUBBED_PARAMS else value)
+        for name, value in pairs
+    ]
+    return urlencode(pairs, quote_via=quote)
+
+
+class SessionTransport:
+    """Sends requests through the requests session of the media server."""
+
+    def send(self, media_server, endpoint: str, params: str = None, stream=False):
+        return media_server.session.get(endpoint, params=params, stream=stream)
+
+    def close(self):
+        pass
+
+
+class RecordingTransport:
+    """Sends requests through another transport and records request/response pairs.
+
+    The archive is a gzip-compressed file with one JSON entry per line. Entries contain
+    the api path without host, the request parameters with credentials scrubbed,
+    status, content type, the body and the time the server took to respond.
+    Authentication headers and server addresses are never recorded.
+    """
+
+    def __init__(self, path: str, transport=None):
+        self.path = path
+        self.transport = transport if transport is not None else SessionTransport()
+        self.__file = gzip.open(path, "wt", encoding="utf-8")
+        self.__lock = threading.Lock()
+        self.__start = time.perf_counter()
+
+    def send(self, media_server, endpoint: str, params: str = None, stream=False):
+        # Bodies are always downloaded completely for recording, even if streamed
+        start = time.perf_counter()
+        response = self.transport.send(media_server, endpoint, params)
+        elapsed = time.perf_counter() - start
+        entry = {
+            "path": _split_endpoint(endpoint),
+            "params": _scrub(params),
+            "status": response.status_code,
+            "content_type": response.headers.get("Content-Type", None),
+            "elapsed": elapsed,
+            "offset": start - self.__start,
+            "body": base64.b64encode(response.content).decode("ascii"),
+        }
+        with self.__lock:
+            self.__file.write(json.dumps(entry, separators=(",", ":")) + "\n")
+        return response
+
+    def close(self):
+        with self.__lock:
+            self.__file.close()
+        self.transport.close()
+
+
+def load_archive(path: str) -> list:
+    """Returns the entries of a recorded archive in recording order."""
+    entries = []
+    with gzip.open(path, "rt", encoding="utf-8") as archive:
+        for line in archive:
+            if line.strip():
+                entries.append(json.loads(line))
+    return entries
+
+
+class ReplayTransport:
+    """Answers requests from a recorded archive instead of contacting a server.
+
+    Requests are matched on api path and parameters. If the same request was recorded
+    several times, the recorded responses are returned in order and then repeated
+    from the start.
+
+    scale:  Factor applied to the recorded response times. 1.0 replays with
+            the original timing, 0.0 answers immediately.
+    """
+
+    def __init__(self, path: str, scale: float = 1.0):
+        self.path = path
+        self.scale = scale
+        self.entries = load_archive(path)
+        self.__responses = {}
+        self.__positions = {}
+        self.__lock = threading.Lock()
+        for entry in self.entries:
+            key = (entry["path"], entry["params"])
+            self.__responses.setdefault(key, []).append(entry)
+
+    def send(self, media_server, endpoint: str, params: str = None, stream=False):
+        key = (_split_endpoint(endpoint), _scrub(params))
+        candidates = self.__responses.get(key, None)
+        if candidates is None:
+            raise ReplayMissError(key[0], key[1])
+        with self.__lock:
+            position = self.__positions.get(key, 0)
+            self.__positions[key] = position + 1
+        entry = candidates[position % len(candidates)]
+        if self.scale > 0:
+            time.sleep(entry["elapsed"] * self.scale)
+        return self.build_response(entry, endpoint, params)
+
+    @staticmethod
+    def build_response(entry: dict, endpoint: str, params: str = None):
+        response = requests.Response()
+        response.status_code = entry["status"]
+        response._content = base64.b64decode(entry["body"])
+        response._content_consumed = True
+        response.headers = CaseInsensitiveDict()
+        if entry["content_type"] is not None:
+            response.headers["Content-Type"] = entry["content_type"]
+        response.url = endpoint + ("?" + params if params else "")
+        response.encoding = "utf-8"
+        response.elapsed = timedelta(seconds=entry["elapsed"])
+        return response
+
+    def close(self):
+        pass
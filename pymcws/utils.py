@@ -1,7 +1,16 @@
 from pymcws.model import MediaFile
+from pymcws import tracing
+from pymcws.interning import ValueInterner
+import time
 from datetime import datetime, timedelta
+from functools import partial
 from xml.etree import ElementTree
 
+# Responses with more bytes are decoded on media_server.decode_pool, if it is set
+PARALLEL_DECODE_MIN_BYTES = 4 * 1024 * 1024
+# Number of files per chunk when decoding in parallel
+PARALLEL_DECODE_CHUNK_ITEMS = 5000
+
 # JRiver dates are days since midnight 30th december 1899
 # See https://yabb.jriver.com/interact/index.php/topic,123431.0.html
 reference_date = datetime.strptime("30.12.1899", "%d.%m.%Y")
@@ -73,6 +82,24 @@ def transform_mpl_response(media_server, response):
 
     Each dictionary represents one file and contains the fields as keys.
     """
+    active_trace = tracing.current()
+    pool = getattr(media_server, "decode_pool", None)
+    if pool is not None and len(response.content) >= PARALLEL_DECODE_MIN_BYTES:
+        decode = partial(parallel_transform_mpl_response, media_server, response, pool)
+    elif getattr(media_server, "intern_values", False):
+        decode = partial(interned_transform_mpl_response, media_server, response)
+    elif active_trace is not None:
+        return traced_transform_mpl_response(media_server, response, active_trace)
+    else:
+        decode = None
+    if decode is not None:
+        if active_trace is None:
+            return decode()
+        # These paths parse, decode and construct in one pass, only the total is timed
+        start = time.perf_counter()
+        result = decode()
+        active_trace.add("decode", time.perf_counter() - start)
+        return result
     result = []
     root = ElementTree.fromstring(response.content)
     for item in root:
@@ -84,6 +111,158 @@ def transform_mpl_response(media_server, response):
     return result
 
 
+def iter_mpl_items(response, chunk_size: int = 65536):
+    """Parses an MPL response incrementally and yields one dictionary per file.
+
+    The dictionaries contain the undecoded jriver strings. Parsed items are discarded
+    immediately, so memory use does not grow with the size of the response. Use this with
+    responses requested with stream=True to avoid holding the body in memory as well.
+    """
+    parser = ElementTree.XMLPullParser(events=("start", "end"))
+    root = None
+    for chunk in response.iter_content(chunk_size):
+        parser.feed(chunk)
+        for event, element in parser.read_events():
+            if event == "start":
+                if root is None:
+                    root = element
+                continue
+            if element.tag != "Item":
+                continue
+            yield {tag.attrib["Name"]: tag.text for tag in element}
+            root.remove(element)
+    parser.close()
+
+
+def split_mpl_items(content: bytes, chunk_items: int) -> list[bytes]:
+    """Splits an MPL body at <Item> boundaries into documents of chunk_items items."""
+    start = content.find(b"<Item>")
+    if start < 0:
+        return [content]
+    end = content.rfind(b"</MPL>")
+    if end < start:
+        end = len(content)
+    header = content[:start]
+    footer = content[end:] or b"</MPL>"
+    boundaries = [start]
+    position = start
+    count = 0
+    while True:
+        position = content.find(b"<Item>", position + 6, end)
+        if position < 0:
+            break
+        count += 1
+        if count == chunk_items:
+            boundaries.append(position)
+            count = 0
+    boundaries.append(end)
+    return [
+        header + content[boundaries[i] : boundaries[i + 1]] + footer
+        for i in range(len(boundaries) - 1)
+    ]
+
+
+def decode_mpl_chunk(decoders: dict, content: bytes) -> list[dict]:
+    """Parses an MPL document and decodes its items into dictionaries.
+
+    Runs in worker processes, so it only receives picklable arguments: the Decoders of
+    the fields by name and the document.
+    """
+    result = []
+    # Sharing the field names lets pickle send each of them only once
+    names = {}
+    for item in ElementTree.fromstring(content):
+        tags = {}
+        for tag in item:
+            name = tag.attrib["Name"]
+            name = names.setdefault(name, name)
+            tags[name] = decoders[name](tag.text)
+        result.append(tags)
+    return result
+
+
+def parallel_transform_mpl_response(
+    media_server, response, executor, chunk_items: int = PARALLEL_DECODE_CHUNK_ITEMS
+):
+    """Same as transform_mpl_response, but parses and decodes chunks of the response
+    on executor, usually a concurrent.futures.ProcessPoolExecutor.
+
+    Used for large responses if media_server.decode_pool is set. The files are returned
+    in the order of the response.
+    """
+    fields = media_server.fields
+    decoders = {name: field["Decoder"] for name, field in fields.items()}
+    chunks = split_mpl_items(response.content, max(1, chunk_items))
+    result = []
+    for decoded in executor.map(partial(decode_mpl_chunk, decoders), chunks):
+        result.extend(MediaFile(media_server, tags) for tags in decoded)
+    return result
+
+
+def interned_transform_mpl_response(
+    media_server, response, lists_as_tuples: bool = False
+):
+    """Same as transform_mpl_response, but equal values are shared between files.
+
+    Used if media_server.intern_values is set, see pymcws.interning.
+    lists_as_tuples: Return List fields as shared tuples. Only use this if the files are
+                     not modified.
+    """
+    decode = ValueInterner(media_server.fields, lists_as_tuples=lists_as_tuples).decode
+    result = []
+    root = ElementTree.fromstring(response.content)
+    for item in root:
+        tags = {}
+        for tag in item:
+            name = tag.attrib["Name"]
+            tags[name] = decode(name, tag.text)
+        result.append(MediaFile(media_server, tags))
+    return result
+
+
+def iter_mpl_response(media_server, response):
+    """Same as transform_mpl_response, but yields MediaFiles while the response is parsed."""
+    fields = media_server.fields
+    if getattr(media_server, "intern_values", False):
+        decode = ValueInterner(media_server.fields).decode
+        for item in iter_mpl_items(response):
+            yield MediaFile(
+                media_server, {name: decode(name, v) for name, v in item.items()}
+            )
+        return
+    for item in iter_mpl_items(response):
+        tags = {}
+        for name, value in item.items():
+            tags[name] = fields[name]["Decoder"](value)
+        yield MediaFile(media_server, tags)
+
+
+def traced_transform_mpl_response(media_server, response, active_trace):
+    """Same as transform_mpl_response, but records the cost of each phase and field."""
+    clock = time.perf_counter
+    start = clock()
+    root = ElementTree.fromstring(response.content)
+    active_trace.add("parse", clock() - start)
+
+    fields = media_server.fields
+    decoded = []
+    decode_start = clock()
+    for item in root:
+        tags = {}
+        for tag in item:
+            name = tag.attrib["Name"]
+            field_start = clock()
+            tags[name] = fields[name]["Decoder"](tag.text)
+            active_trace.add_field("decode", name, clock() - field_start)
+        decoded.append(tags)
+    active_trace.add("decode", clock() - decode_start)
+
+    start = clock()
+    result = [MediaFile(media_server, tags) for tags in decoded]
+    active_trace.add("construct", clock() - start)
+    return result
+
+
 def escape_for_query(query_part: str) -> str:
     """Escapes all characters reserved by jriver in a natural string.
 
@@ -106,11 +285,24 @@ def serialize_file_list(files: list, active_item_index: int = -1):
     [1] The number of included keys
     [2] The active element (?), -1 for none
     [3]..[len(files + 3)]: The keys of the files.
+    Files can be given as MediaFiles or as plain keys.
     """
-    result = "2;" + str(len(files)) + ";" + str(active_item_index)
+    values = ["2", str(len(files)), str(active_item_index)]
     for file in files:
-        result += ";" + str(file["Key"])
-    return result
+        values.append(str(file["Key"]) if isinstance(file, dict) else str(file))
+    return ";".join(values)
+
+
+def parse_file_list(serialized: str) -> tuple:
+    """Parses a serialized file list as produced by serialize_file_list.
+
+    Returns a tuple of the list of keys (as integers) and the active item index.
+    """
+    values = serialized.strip().split(";")
+    if len(values) < 3 or values[0] != "2":
+        raise ValueError("Unsupported file list serialization: " + serialized[:20])
+    keys = [int(key) for key in values[3:] if key]
+    return keys, int(values[2])
 
 
 def parse_jriver_date(jriver_date) -> datetime:
@@ -0,0 +1,168 @@
+""" Buffered saving of MediaFiles.
+
+    file.set_info() sends one request per call. Scripts that change the same files in
+    several steps can save them to a WriteBehindSession instead: edits are collected per
+    file key and merged, and written in the background once enough files are pending or
+    the oldest edit is old enough. Leaving the session writes everything that is left:
+
+        with WriteBehindSession(server) as session:
+            for file in server.files.search("[Genre]=[Rock]"):
+                file["Genre"] = ["Rock", "Classic Rock"]
+                session.save(file)
+                file["Rating"] = 4
+                session.save(file)  # merged with the previous edit
+
+    Writes of the same file never overlap and are sent in the order of the edits. If the
+    number of pending and running writes reaches max_queue, save() blocks until writes
+    have finished. Failed writes are collected and raised as WriteBehindError on
+    close(). If the with block raises, failed writes are logged instead, so the original
+    exception is not replaced. Fields set to None are cleared.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pymcws.api.file import set_values
+from pymcws.exceptions import WriteBehindError
+from pymcws.model import MediaFile
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindSession:
+    """Collects MediaFile edits and writes them in the background."""
+
+    def __init__(
+        self,
+        media_server,
+        max_pending: int = 100,
+        max_delay: float = 1.0,
+        max_workers: int = 4,
+        max_queue: int = 1000,
+    ):
+        """max_pending: Write as soon as this many files have pending edits.
+        max_delay:   Write pending edits at the latest after this many seconds.
+        max_workers: Number of concurrent requests.
+        max_queue:   Block save() while this many files are pending or being written.
+        """
+        self.media_server = media_server
+        self.max_pending = max_pending
+        self.max_delay = max_delay
+        self.max_queue = max(max_queue, 1)
+        # Number of save() calls and number of requests sent
+        self.saves = 0
+        self.writes = 0
+        self.failures = []
+        self.__condition = threading.Condition()
+        self.__pending = {}  # key -> {field: value}
+        self.__in_flight = set()
+        self.__first_edit = None
+        self.__closed = False
+        self.__executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="pymcws-write"
+        )
+        self.__timer = threading.Thread(
+            target=self.__run, name="pymcws-write-timer", daemon=True
+        )
+        self.__timer.start()
+
+    def save(self, file: MediaFile, field_filter: dict = None):
+        """Schedules the changed fields of the file for writing.
+
+        Takes the same arguments as file.set_info(). The values are copied, so the file
+        can be changed again right away.
+        """
+        changed = file.changed_fields
+        if field_filter is not None:
+            changed = {k: v for k, v in changed.items() if k in field_filter}
+        if len(changed) == 0:
+            return
+        key = file["Key"]
+        with self.__condition:
+            if self.__closed:
+                raise RuntimeError("The WriteBehindSession is closed.")
+            while (
+                key not in self.__pending
+                and len(self.__pending) + len(self.__in_flight) >= self.max_queue
+            ):
+                self.__submit()
+                self.__condition.wait()
+            edits = self.__pending.setdefault(key, {})
+            edits.update(changed)
+            self.saves += 1
+            if self.__first_edit is None:
+                self.__first_edit = time.monotonic()
+            if len(self.__pending) >= self.max_pending:
+                self.__submit()
+            self.__condition.notify_all()
+
+    def flush(self):
+        """Writes all pending edits and waits until they are on the server."""
+        with self.__condition:
+            while self.__pending or self.__in_flight:
+                self.__submit()
+                self.__condition.wait()
+
+    def close(self):
+        """Writes all pending edits and stops the background threads.
+
+        Raises WriteBehindError if any write failed during the session.
+        """
+        self.flush()
+        with self.__condition:
+            self.__closed = True
+            self.__condition.notify_all()
+        self.__timer.join()
+        self.__executor.shutdown(wait=True)
+        if self.failures:
+            raise WriteBehindError(self.failures)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+            return
+        # Do not replace the exception raised in the block
+        try:
+            self.close()
+        except WriteBehindError as error:
+            logger.error(str(error) + " while handling " + exc_type.__name__)
+
+    def __submit(self):
+        # Called with the condition held. Files that are still being written are kept
+        # back, so two writes of the same file never overlap.
+        for key in list(self.__pending):
+            if key in self.__in_flight:
+                continue
+            edits = self.__pending.pop(key)
+            self.__in_flight.add(key)
+            self.__executor.submit(self.__write, key, edits)
+        self.__first_edit = time.monotonic() if self.__pending else None
+
+    def __write(self, key, edits: dict):
+        try:
+            set_values(self.media_server, key, edits)
+        except Exception as error:
+            logger.warning("Writing file " + str(key) + " failed: " + str(error))
+            with self.__condition:
+                self.failures.append((key, edits, error))
+        finally:
+            with self.__condition:
+                self.writes += 1
+                self.__in_flight.discard(key)
+                self.__condition.notify_all()
+
+    def __run(self):
+        with self.__condition:
+            while not self.__closed:
+                if self.__first_edit is None:
+                    self.__condition.wait()
+                    continue
+                remaining = self.__first_edit + self.max_delay - time.monotonic()
+                if remaining > 0:
+                    self.__condition.wait(remaining)
+                else:
+                    self.__submit()
+                    self.__condition.wait(self.max_delay)
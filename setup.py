@@ -13,7 +13,7 @@ setup_args = dict(
     long_description_content_type="text/markdown",
     long_description=README + "\n\n" + HISTORY,
     license="MIT",
-    packages=find_packages(),
+    packages=find_packages(exclude=["tests", "benchmarks", "benchmarks.*"]),
     author="Keno März",
     author_email="keno.maerz@gmail.com",
     keywords=["JRiver", "MCWS"],
@@ -22,6 +22,19 @@ setup_args = dict(
 )
 
 install_requires = ["requests", "pillow"]
+extras_require = {"numpy": ["numpy"]}
+entry_points = {
+    "console_scripts": [
+        "pymcws-export=pymcws.export:main",
+        "pymcws-import=pymcws.importer:main",
+        "pymcws-snapshot=pymcws.snapshot:main",
+    ]
+}
 
 if __name__ == "__main__":
-    setup(**setup_args, install_requires=install_requires)
+    setup(
+        **setup_args,
+        install_requires=install_requires,
+        extras_require=extras_require,
+        entry_points=entry_points,
+    )
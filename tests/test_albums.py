@@ -0,0 +1,105 @@
+import threading
+import time
+import unittest
+from pymcws.albums import AlbumIndex
+from benchmarks.fake_server import FakeMCWSServer, SyntheticLibrary
+
+"""
+    Tests the album index and the recipes using it against the fake server.
+"""
+
+
+class TestAlbumIndex(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.fake = FakeMCWSServer(SyntheticLibrary(2000)).start()
+        cls.server = cls.fake.media_server()
+
+    def setUp(self):
+        self.index = AlbumIndex(self.server, query="", max_age=None)
+        self.largest = max(self.index.albums(), key=len)
+
+    def tearDown(self):
+        self.server.album_index = None
+
+    def test_lookup(self):
+        album = self.largest
+        expected = self.server.recipes.query_album(album.album_artist, album.album)
+        self.assertGreater(len(expected), 1)
+        files = self.index.files(album.album_artist.upper(), album.album)
+        self.assertEqual([f["Key"] for f in files], [f["Key"] for f in expected])
+        fields = {"Key", "Album Artist", "Album", "Disc #", "Track #"}
+        self.assertEqual(set(files[0]), fields)
+        self.assertEqual(self.index.keys("Nobody", "Nothing"), [])
+        by_artist = self.index.albums(album.album_artist)
+        self.assertIn(album, by_artist)
+        # Results are copies, editing them does not change the index
+        files[0]["Album"] = "Edited"
+        self.assertEqual(album.files[0]["Album"], album.album)
+
+    def test_lookup_during_refresh(self):
+        album = self.largest
+        keys = []
+        self.fake.hold("Files/Search")
+        refresh = threading.Thread(target=self.index.refresh)
+        lookup = threading.Thread(
+            target=lambda: keys.extend(self.index.keys(album.album_artist, album.album))
+        )
+        try:
+            refresh.start()
+            while self.fake.held["Files/Search"] < 1:
+                time.sleep(0.001)
+            # The refresh waits for its search, lookups must not wait for it
+            lookup.start()
+            lookup.join(10)
+            looked_up = not lookup.is_alive()
+            refreshing = refresh.is_alive()
+        finally:
+            self.fake.release("Files/Search")
+            refresh.join()
+            lookup.join()
+        self.assertTrue(looked_up)
+        self.assertTrue(refreshing)
+        self.assertEqual(keys, album.keys)
+
+    def test_recipes(self):
+        album = self.largest
+        self.server.album_index = self.index
+        served = self.fake.requests_served
+        files = self.server.recipes.query_album(album.album_artist, album.album)
+        self.assertEqual(self.fake.requests_served, served)
+        self.assertEqual([f["Key"] for f in files], album.keys)
+        zone = self.server.playback.zones()[2]
+        self.server.recipes.play_album(album.album_artist, album.album, zone=zone)
+        info = self.server.playback.info(zone)
+        self.assertEqual(info["PlayingNowTracks"], len(album))
+        self.assertEqual(info["FileKey"], album.keys[0])
+        self.assertEqual(info["State"], 2)
+
+    def test_refresh(self):
+        library = self.fake.library
+        first = self.largest.files[0]
+        item = dict(library.by_key[str(first["Key"])], Key="5000")
+        item["Disc #"] = "0"
+        removed = library.items.pop()
+        del library.by_key[removed["Key"]]
+        library.items.append(item)
+        library.by_key["5000"] = item
+        try:
+            self.assertEqual(self.index.refresh(), (1, 1))
+            album = self.index.album(self.largest.album_artist, self.largest.album)
+            self.assertEqual(album.keys[0], 5000)
+            self.assertEqual(self.index.refresh(), (0, 0))
+        finally:
+            library.items[-1] = removed
+            del library.by_key["5000"]
+            library.by_key[removed["Key"]] = removed
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.session.close()
+        cls.fake.stop()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+from pymcws.autocomplete import AutocompleteIndex, fold
+from benchmarks.fake_server import FakeMCWSServer, SyntheticLibrary
+
+"""
+    Tests the autocomplete index against the fake MCWS server.
+"""
+
+
+class TestAutocomplete(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.fake = FakeMCWSServer(SyntheticLibrary(300)).start()
+        cls.server = cls.fake.media_server(api=False)
+
+    def test_fold(self):
+        self.assertEqual(fold("Björk Guðmundsdóttir"), "bjork guðmundsdottir")
+        self.assertEqual(fold("STRASSE"), fold("straße"))
+
+    def test_prefix_and_substring(self):
+        index = AutocompleteIndex(self.server, fields=("Artist", "Genre"))
+        artists = {item["Artist"] for item in self.fake.library.items}
+        expected = sorted(a for a in artists if a.lower().startswith("artist 12"))
+        result = index.complete("ARTIST 12", limit=1000)
+        self.assertEqual([value for value, field, count in result], expected)
+        result = index.search("enre 3", fields=("Genre",), limit=1000)
+        self.assertTrue(result)
+        self.assertTrue(all("Genre 3" in value for value, field, count in result))
+        self.assertEqual(index.complete("zzz"), [])
+
+    def test_counts_and_refresh(self):
+        index = AutocompleteIndex(self.server, fields=("Artist",), counts=True)
+        first = index.complete("artist", limit=2)
+        self.assertGreaterEqual(first[0][2], first[1][2])
+        item = dict(self.fake.library.items[0], Key="9999", Artist="Émile Zola")
+        self.fake.library.items.append(item)
+        self.fake.library.by_key["9999"] = item
+        try:
+            self.assertEqual(index.refresh(), (1, 0))
+            self.assertEqual(index.complete("emi"), [("Émile Zola", "Artist", 1)])
+            self.assertEqual(index.search("zol")[0][0], "Émile Zola")
+        finally:
+            self.fake.library.items.pop()
+            del self.fake.library.by_key["9999"]
+        self.assertEqual(index.refresh(), (0, 1))
+        self.assertEqual(index.complete("emi"), [])
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.session.close()
+        cls.fake.stop()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+import time
+import unittest
+from pymcws.channel import CommandChannel
+from benchmarks.fake_server import FakeMCWSServer, SyntheticLibrary
+
+"""
+    Tests the debounced command channel against the fake server.
+"""
+
+
+class TestCommandChannel(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.fake = FakeMCWSServer(SyntheticLibrary(10), latency=0.02).start()
+        cls.server = cls.fake.media_server()
+        cls.zone = cls.server.playback.zones()[1]
+
+    def test_latest_value_wins(self):
+        with CommandChannel(self.server, self.zone, max_rate=20) as channel:
+            start = time.perf_counter()
+            for i in range(101):
+                channel.volume(i / 100.0)
+            # Setting values never waits for the server
+            self.assertLess(time.perf_counter() - start, 0.05)
+            self.assertTrue(channel.flush(timeout=5))
+            self.assertEqual(channel.confirmed("volume"), 1.0)
+            self.assertLess(channel.sent("volume"), 5)
+            self.assertEqual(channel.volume(0.5), 1.0)
+        # Closing sends the latest value
+        self.assertEqual(channel.confirmed("volume"), 0.5)
+        self.assertEqual(self.server.playback.volume(zone=self.zone), 0.5)
+
+    def test_position_and_commands(self):
+        with CommandChannel(self.server, self.zone, max_rate=0) as channel:
+            self.assertIsNone(channel.position(1000))
+            channel.position(2000)
+            channel.command("Play")
+            self.assertEqual(self.server.playback.info(self.zone)["State"], 2)
+            channel.flush()
+            self.assertEqual(channel.confirmed("position"), 2000)
+            self.assertIsNone(channel.error("position"))
+            channel.command("Stop")
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.session.close()
+        cls.fake.stop()
+
+
+if __name__ == "__main__":
+    unittest.main()
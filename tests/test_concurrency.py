@@ -0,0 +1,71 @@
+import threading
+import unittest
+from pymcws.media_server import MediaServer
+from pymcws.metrics import RequestMetrics
+from benchmarks.fake_server import FakeMCWSServer, SyntheticLibrary
+
+"""
+    Tests sharing one MediaServer between many threads, using the fake MCWS server.
+"""
+
+
+def run_threads(target, count: int):
+    threads = [threading.Thread(target=target) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+class TestConcurrency(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.fake = FakeMCWSServer(SyntheticLibrary(50), latency=0.02).start()
+
+    def setUp(self):
+        self.server = MediaServer("localhost:" + str(self.fake.port), "test", "test")
+        self.metrics = RequestMetrics()
+        self.server.add_hook(self.metrics)
+
+    def count(self, endpoint: str) -> int:
+        return sum(
+            count
+            for labels, count in self.metrics.requests.items()
+            if labels[2] == endpoint
+        )
+
+    def test_fields_load_once(self):
+        run_threads(lambda: self.assertIn("Genre", self.server.fields), 8)
+        self.assertEqual(self.count("Library/Fields"), 1)
+
+    def test_single_refresh(self):
+        generation = self.server.generation
+        results = []
+        run_threads(lambda: results.append(self.server.refresh(generation)), 8)
+        self.assertEqual(results, [True] * 8)
+        self.assertEqual(self.server.generation, generation + 1)
+        self.assertEqual(sum(self.metrics.refreshes.values()), 1)
+        self.assertEqual(self.server.local_ip, "127.0.0.1")
+
+    def test_parallel_requests(self):
+        errors = []
+
+        def send():
+            for _ in range(5):
+                if self.server.send_request("Playback/Info").status_code != 200:
+                    errors.append(True)
+
+        run_threads(send, 16)
+        self.assertEqual(errors, [])
+        self.assertEqual(self.count("Playback/Info"), 80)
+
+    def tearDown(self):
+        self.server.session.close()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.fake.stop()
+
+
+if __name__ == "__main__":
+    unittest.main()
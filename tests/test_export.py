@@ -0,0 +1,91 @@
+import csv
+import gzip
+import json
+import os
+import tempfile
+import unittest
+from pymcws.api import files
+from pymcws.cli import Progress
+from pymcws.export import export_files
+from benchmarks.fake_server import FakeMCWSServer, SyntheticLibrary
+
+"""
+    Tests streaming search and export against the fake MCWS server.
+"""
+
+
+class TestExport(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.fake = FakeMCWSServer(SyntheticLibrary(250)).start()
+        cls.server = cls.fake.media_server(api=False)
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def path(self, name):
+        return os.path.join(self.directory.name, name)
+
+    def test_iter_search(self):
+        streamed = list(files.iter_search(self.server, "[Key]=0-49"))
+        self.assertEqual(streamed, files.search(self.server, "[Key]=0-49"))
+        self.assertEqual(files.search_keys(self.server, "[Key]=3-5"), [3, 4, 5])
+
+    def test_csv_gzip(self):
+        path = self.path("library.csv.gz")
+        rows = export_files(self.server, path, fields=["Name", "Genre"])
+        self.assertEqual(rows, 250)
+        with gzip.open(path, "rt", newline="") as export:
+            content = list(csv.reader(export))
+        self.assertEqual(content[0], ["Key", "Name", "Genre"])
+        self.assertEqual(len(content), 251)
+        item = self.fake.library.by_key[content[1][0]]
+        self.assertEqual(content[1][2], item["Genre"])
+        with open(path + ".schema.json") as schema:
+            self.assertEqual(json.load(schema)[2]["DataType"], "List")
+
+    def test_jsonl_parallel_resume(self):
+        path = self.path("library.jsonl")
+        fields = ["Key", "Rating", "Genre"]
+        with open(path + ".part0", "w") as part:
+            part.write('{"Key": -1}\n')
+        with open(path + ".checkpoint", "w") as checkpoint:
+            json.dump(
+                {
+                    "query": "",
+                    "fields": fields,
+                    "ranges": [[0, 99], [100, 199], [200, 249]],
+                    "done": {"0": 1},
+                },
+                checkpoint,
+            )
+        progress = Progress("Exported", interval=0.0)
+        rows = export_files(
+            self.server,
+            path,
+            fields=fields,
+            parallel=2,
+            checkpoint=True,
+            progress=progress,
+        )
+        self.assertEqual(rows, 151)
+        self.assertEqual(progress.count, 150)
+        with open(path) as export:
+            content = [json.loads(line) for line in export]
+        self.assertEqual(content[0], {"Key": -1})
+        self.assertEqual([row["Key"] for row in content[1:]], list(range(100, 250)))
+        self.assertIsInstance(content[1]["Genre"], list)
+        self.assertFalse(os.path.exists(path + ".checkpoint"))
+        self.assertFalse(os.path.exists(path + ".part0"))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.session.close()
+        cls.fake.stop()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,167 @@
+import threading
+import unittest
+from pymcws.tracing import trace
+from benchmarks.fake_server import FakeMCWSServer, SyntheticLibrary
+
+"""
+    These tests run against the in-process fake MCWS server in benchmarks/fake_server.py
+    and do not require a JRiver instance. Run them from the repository root.
+"""
+
+
+class TestFakeServer(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.fake = FakeMCWSServer(SyntheticLibrary(200)).start()
+        cls.server = cls.fake.media_server()
+
+    def test_alive(self):
+        self.assertEqual(self.server.send_request("Alive").status_code, 200)
+
+    def test_search_decodes_fields(self):
+        files = self.server.files.search("[Key]=5-9 ~sort=[Key]")
+        self.assertEqual([f["Key"] for f in files], [5, 6, 7, 8, 9])
+        self.assertIsInstance(files[0]["Genre"], list)
+        self.assertIsInstance(files[0]["Duration"], float)
+
+    def test_concurrent_request_count(self):
+        served = self.fake.requests_served
+
+        def send():
+            for _ in range(25):
+                self.server.library.values(field="Artist", limit=5)
+
+        threads = [threading.Thread(target=send) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.fake.requests_served - served, 200)
+
+    def test_set_info(self):
+        file = self.server.files.search("[Key]=3-3")[0]
+        file["Comment"] = "Changed, with comma"
+        file["Rating"] = 5
+        self.server.file.set_info(file)
+        file = self.server.files.search("[Key]=3-3")[0]
+        self.assertEqual(file["Comment"], "Changed, with comma")
+        self.assertEqual(file["Rating"], 5)
+
+    def test_playback(self):
+        zone = self.server.playback.zones()[1]
+        self.assertEqual(self.server.playback.volume(0.25, zone=zone), 0.25)
+        self.server.playback.set_playlist(self.server.files.search("[Key]=0-4"), zone)
+        self.assertEqual(self.server.playback.info(zone)["PlayingNowTracks"], 5)
+
+    def test_chunked_playlist(self):
+        zone = self.server.playback.zones()[2]
+        keys = list(range(150, 100, -1))
+        self.server.playback.set_playlist(keys, zone, active_item_index=23, max_keys=7)
+        state = self.fake.library.zone(
+            {"Zone": zone.best_identifier(), "ZoneType": zone.best_identifier_type()}
+        )
+        self.assertEqual(state["Playlist"], [str(key) for key in keys])
+        self.assertEqual(state["Index"], 23)
+        self.server.playback.add_to_playlist([1, 2, 3], "Start", zone, max_keys=2)
+        self.assertEqual(state["Playlist"][:4], ["1", "2", "3", "150"])
+        self.assertEqual(state["Index"], 26)
+        # An active index beyond the playlist means no active file
+        self.server.playback.set_playlist(keys, zone, active_item_index=50, max_keys=7)
+        self.assertEqual(state["Playlist"], [str(key) for key in keys])
+        self.assertEqual(state["Index"], -1)
+
+    def test_coalesced_reads(self):
+        zone = self.server.playback.zones()[0]
+        self.server.coalesce_reads = True
+        self.fake.latency = 0.05
+        results = []
+        served = self.fake.requests_served
+
+        def read():
+            results.append(self.server.send_request("Playback/Info", {"Zone": "0"}))
+
+        try:
+            threads = [threading.Thread(target=read) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertLess(self.fake.requests_served - served, 8)
+            self.assertGreater(self.server.single_flight.shared, 0)
+            self.assertEqual(len(results), 8)
+            served = self.fake.requests_served
+            threads = [
+                threading.Thread(target=self.server.playback.volume, args=(0.5, zone))
+                for _ in range(4)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertEqual(self.fake.requests_served - served, 4)
+        finally:
+            self.server.coalesce_reads = False
+            self.fake.latency = 0.0
+
+    def test_snapshot(self):
+        playback = self.server.playback
+        zone = playback.zones()[1]
+        playback.volume(0.3, zone=zone)
+        served = self.fake.requests_served
+        first = playback.snapshot()
+        self.assertEqual(sorted(first), ["0", "1", "2"])
+        self.assertEqual(first["1"].volume, 0.3)
+        self.assertEqual(first["1"].repeat, "Off")
+        self.assertEqual(first["1"].changes(first["1"]), {})
+        self.assertEqual(playback.snapshot(previous=first), {})
+        # The zone list is cached, each snapshot costs three requests per zone
+        self.assertLessEqual(self.fake.requests_served - served, 1 + 2 * 9)
+        playback.repeat("Playlist", zone)
+        changed = playback.snapshot(previous=first)
+        self.assertEqual(list(changed), ["1"])
+        self.assertEqual(changed["1"].changes(first["1"]), {"repeat": "Playlist"})
+        # Zones left out of an explicit list are not reported as removed
+        requested = playback.snapshot(zones=[zone], previous=first)
+        self.assertEqual(list(requested), ["1"])
+        self.assertEqual(requested["1"].repeat, "Playlist")
+        self.assertEqual(playback.snapshot(zones=[], previous=first), {})
+        removed = playback.snapshot(previous=dict(first, **{"9": first["0"]}))
+        self.assertEqual(sorted(removed), ["1", "9"])
+        self.assertIsNone(removed["9"])
+        playback.repeat("Off", zone)
+
+    def test_trace(self):
+        traces = []
+        with trace(traces.append) as active:
+            file = self.server.files.search("[Key]=10-20")[0]
+            file["Rating"] = 1000
+            self.server.file.set_info(file)
+        self.assertEqual(traces, [active])
+        totals = active.totals()
+        for phase in ("server", "transfer", "parse", "decode", "construct", "encode"):
+            self.assertIn(phase, totals)
+        decoded = [field for field, seconds, count in active.field_costs("decode")]
+        self.assertIn("Date", decoded)
+        self.assertEqual(active.field_costs("encode")[0][0], "Rating")
+
+    def test_trace_interned(self):
+        self.server.intern_values = True
+        try:
+            with trace() as active:
+                files = self.server.files.search("[Key]=10-20")
+        finally:
+            self.server.intern_values = False
+        # The interned path runs and is timed as a whole
+        self.assertIs(files[0]["Media Type"], files[1]["Media Type"])
+        totals = active.totals()
+        self.assertIn("decode", totals)
+        self.assertNotIn("parse", totals)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.session.close()
+        cls.fake.stop()
+
+
+if __name__ == "__main__":
+    unittest.main()
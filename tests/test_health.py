@@ -0,0 +1,67 @@
+import time
+import unittest
+from pymcws.health import HealthMonitor
+from pymcws.media_server import MediaServer
+from benchmarks.fake_server import FakeMCWSServer, SyntheticLibrary
+
+"""
+    Tests route monitoring against the fake MCWS server. It listens on 127.0.0.1 only,
+    so other loopback addresses act as unreachable routes.
+"""
+
+
+class TestHealthMonitor(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.fake = FakeMCWSServer(SyntheticLibrary(10)).start()
+
+    def setUp(self):
+        self.server = MediaServer("localhost:" + str(self.fake.port), "test", "test")
+        self.server.local_ip_list = ["127.0.0.2", "127.0.0.1"]
+        self.server.remote_ip = "127.0.0.3"
+        self.server.con_strategy = "remote"
+
+    def test_switches_to_healthy_route(self):
+        monitor = HealthMonitor(self.server, timeout=1)
+        self.assertEqual(monitor.check(), "local")
+        self.assertEqual(self.server.local_ip, "127.0.0.1")
+        self.assertEqual(self.server.address(), self.server.address_local())
+        routes = monitor.routes()
+        self.assertEqual((routes[0].ip, routes[0].healthy), ("127.0.0.1", True))
+        self.assertEqual([route.healthy for route in routes[1:]], [False, False])
+        self.assertEqual(monitor.check(), "local")
+        self.assertEqual(monitor.switches, 1)
+        # The pools of all routes are kept between checks
+        self.assertEqual(self.server.pool_connections, 3)
+        adapter = self.server.session.get_adapter(self.server.address())
+        self.assertEqual(len(adapter.poolmanager.pools), 3)
+        self.assertEqual(self.server.send_request("Alive").status_code, 200)
+
+    def test_background_thread(self):
+        with HealthMonitor(self.server, interval=0.05, timeout=1):
+            for _ in range(100):
+                if self.server.con_strategy == "local":
+                    break
+                time.sleep(0.02)
+        self.assertEqual(self.server.con_strategy, "local")
+
+    def test_https_route(self):
+        # The fake server only speaks http, so the https address points to it
+        address = "http://127.0.0.1:" + str(self.fake.port) + "/MCWS/v1/"
+        self.server.address_https = lambda: address
+        self.server.local_ip_list = ["127.0.0.2"]
+        self.assertTrue(self.server.refresh())
+        self.assertEqual(self.server.con_strategy, "https")
+        # A refresh coalesced with the one above reports its success
+        self.assertTrue(self.server.refresh(self.server.generation - 1))
+
+    def tearDown(self):
+        self.server.session.close()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.fake.stop()
+
+
+if __name__ == "__main__":
+    unittest.main()
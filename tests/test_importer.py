@@ -0,0 +1,130 @@
+import csv
+import json
+import os
+import tempfile
+import unittest
+from pymcws.importer import import_tags, main
+from benchmarks.fake_server import FakeMCWSServer, SyntheticLibrary
+
+"""
+    Tests the bulk tag import against the fake MCWS server.
+"""
+
+
+class TestImporter(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.fake = FakeMCWSServer(SyntheticLibrary(100)).start()
+        cls.server = cls.fake.media_server(api=False)
+        cls.items = cls.fake.library.by_key
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write_csv(self, name, rows):
+        path = os.path.join(self.directory.name, name)
+        with open(path, "w", encoding="utf-8", newline="") as output:
+            csv.writer(output).writerows(rows)
+        return path
+
+    def test_csv(self):
+        filename = self.items["7"]["Filename"]
+        path = self.write_csv(
+            "tags.csv",
+            [
+                ["Key", "Filename", "Rating", "Genre"],
+                ["3", "", "4", "Jazz;Blues"],
+                ["", filename.upper(), "5", ""],
+                ["", "D:\\missing.flac", "1", ""],
+                ["4", "", "four", ""],
+                ["99999", "", "2", ""],
+                ["3", "", "", "Swing"],
+            ],
+        )
+        before = dict(self.items["5"])
+        genre = self.items["3"]["Genre"]
+        dry = import_tags(self.server, path, dry_run=True)
+        self.assertEqual(dry.rows, 6)
+        self.assertEqual([f[2] for f in dry.failures], ["resolve", "validate"])
+        self.assertEqual(self.items["3"]["Genre"], genre)
+        result = import_tags(self.server, path, parallel=2)
+        self.assertEqual(result.files, 3)
+        stages = sorted((f[0], f[2]) for f in result.failures)
+        self.assertEqual(stages, [(4, "resolve"), (5, "validate"), (6, "write")])
+        self.assertEqual(self.items["3"]["Rating"], "4")
+        self.assertEqual(self.items["3"]["Genre"], "Swing")
+        self.assertEqual(self.items["7"]["Rating"], "5")
+        self.assertEqual(self.items["5"], before)
+
+    def test_jsonl_and_report(self):
+        path = os.path.join(self.directory.name, "tags.jsonl")
+        with open(path, "w", encoding="utf-8") as output:
+            row = {"Key": 8, "Genre": ["Rock", "Pop"], "Date": "2001-02-03T00:00:00"}
+            output.write(json.dumps(row) + "\n")
+            output.write(json.dumps({"Key": 9, "Replay Gain": -3.5}) + "\n")
+        report = os.path.join(self.directory.name, "report.csv")
+        address = "localhost:" + str(self.fake.port)
+        self.assertEqual(main([address, path, "--report", report]), 0)
+        self.assertEqual(self.items["8"]["Genre"], "Rock;Pop")
+        self.assertTrue(self.items["8"]["Date"].startswith("36925"))
+        self.assertEqual(float(self.items["9"]["Replay Gain"]), -3.5)
+        with open(report) as report_file:
+            self.assertEqual(len(list(csv.reader(report_file))), 1)
+
+    def test_clear_empty(self):
+        for key in ("20", "21"):
+            self.items[key].update({"Date": "36925", "Rating": "4"})
+        path = self.write_csv(
+            "tags.csv", [["Key", "Date", "Rating"], ["20", "", ""], ["21", "", "3"]]
+        )
+        skipped = import_tags(self.server, path)
+        self.assertEqual(skipped.failures, [])
+        self.assertEqual(self.items["20"]["Date"], "36925")
+        self.assertEqual(self.items["21"]["Rating"], "3")
+        # Date and Integer fields are cleared, not encoded from empty strings
+        dry = import_tags(self.server, path, dry_run=True, clear_empty=True)
+        self.assertEqual(dry.failures, [])
+        self.assertEqual(self.items["20"]["Date"], "36925")
+        result = import_tags(self.server, path, clear_empty=True)
+        self.assertEqual(result.failures, [])
+        self.assertEqual(result.files, 2)
+        self.assertEqual(self.items["20"].get("Date", ""), "")
+        self.assertEqual(self.items["20"].get("Rating", ""), "")
+        self.assertEqual(self.items["21"].get("Date", ""), "")
+        self.assertEqual(self.items["21"]["Rating"], "3")
+
+    def test_invalid_columns(self):
+        path = self.write_csv("tags.csv", [["Key", "Bitrate"], ["1", "320"]])
+        with self.assertRaises(ValueError):
+            import_tags(self.server, path)
+        path = self.write_csv("tags.csv", [["Key", "Nope"], ["1", "320"]])
+        self.assertEqual(main(["localhost:" + str(self.fake.port), path]), 2)
+
+    def test_invalid_json_rows(self):
+        path = os.path.join(self.directory.name, "tags.jsonl")
+        with open(path, "w", encoding="utf-8") as output:
+            output.write(json.dumps({"Key": 11, "Comment": "first"}) + "\n")
+            output.write(json.dumps({"Key": 12, "Nope": "x"}) + "\n")
+            output.write('{"Key": 13, \n')
+            output.write("[1, 2]\n")
+            output.write(json.dumps({"Key": 14, "Bitrate": 1}) + "\n")
+            output.write(json.dumps({"Key": 15, "Comment": "last"}) + "\n")
+        result = import_tags(self.server, path)
+        failures = [(f[0], f[1], f[2]) for f in result.failures]
+        expected = [(2, 12), (3, None), (4, None), (5, 14)]
+        self.assertEqual(failures, [(line, key, "validate") for line, key in expected])
+        self.assertEqual(result.files, 2)
+        self.assertEqual(self.items["11"]["Comment"], "first")
+        self.assertEqual(self.items["15"]["Comment"], "last")
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.session.close()
+        cls.fake.stop()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import unittest
+from pymcws.interning import ValueInterner
+from pymcws.utils import interned_transform_mpl_response, transform_mpl_response
+from benchmarks.synthetic import SyntheticServer, FakeResponse, mpl_xml
+
+"""
+    Compares interned decoding against the regular decoders on synthetic data.
+"""
+
+
+class TestInterning(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = SyntheticServer()
+        cls.response = FakeResponse(mpl_xml(500))
+        cls.files = transform_mpl_response(cls.server, cls.response)
+
+    def test_equal_results(self):
+        interned = interned_transform_mpl_response(self.server, self.response)
+        self.assertEqual(interned, self.files)
+        self.assertIsInstance(interned[0]["Genre"], list)
+        by_type = {}
+        for file in interned:
+            first = by_type.setdefault(file["Media Type"], file["Media Type"])
+            self.assertIs(file["Media Type"], first)
+        # Lists are not shared, so modifying one file does not affect others
+        self.assertIsNot(interned[0]["Genre"], interned[1]["Genre"])
+
+    def test_tuples(self):
+        interned = interned_transform_mpl_response(
+            self.server, self.response, lists_as_tuples=True
+        )
+        genres = {}
+        for file in interned:
+            self.assertIsInstance(file["Genre"], tuple)
+            first = genres.setdefault(file["Genre"], file["Genre"])
+            self.assertIs(file["Genre"], first)
+
+    def test_field_selection(self):
+        interner = ValueInterner(self.server.fields, max_distinct=3)
+        self.assertTrue(interner.interned("Artist"))
+        self.assertFalse(interner.interned("Name"))
+        self.assertFalse(interner.interned("Rating"))
+        for i in range(4):
+            value = "Artist " + str(i % 3)
+            self.assertEqual(interner.decode("Artist", value), value)
+        self.assertEqual(interner.shared, 1)
+        interner.decode("Artist", "Artist 3")
+        self.assertFalse(interner.interned("Artist"))
+        self.assertEqual(interner.decode("Rating", "3"), 3)
+
+    def test_server_flag(self):
+        self.server.intern_values = True
+        try:
+            files = transform_mpl_response(self.server, self.response)
+        finally:
+            del self.server.intern_values
+        self.assertEqual(files, self.files)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+import threading
+import unittest
+from pymcws.limiter import AdaptiveLimiter
+from benchmarks.fake_server import FakeMCWSServer, SyntheticLibrary
+
+"""
+    Tests the adaptive concurrency limiter, in isolation and against the fake server.
+"""
+
+
+class TestAdaptiveLimiter(unittest.TestCase):
+    def test_slots_and_queue(self):
+        limiter = AdaptiveLimiter(initial_limit=2)
+        self.assertTrue(limiter.acquire())
+        self.assertTrue(limiter.acquire())
+        self.assertFalse(limiter.acquire(timeout=0.01))
+        order = []
+
+        def wait(name):
+            limiter.acquire()
+            order.append(name)
+
+        threads = []
+        for name in ("first", "second"):
+            threads.append(threading.Thread(target=wait, args=(name,)))
+            threads[-1].start()
+            while limiter.queued < len(threads):
+                pass
+        self.assertEqual(limiter.stats()["queued"], 2)
+        limiter.release("Alive", 0.01)
+        threads[0].join()
+        self.assertEqual(order, ["first"])
+        limiter.release("Alive", 0.01)
+        threads[1].join()
+        self.assertEqual(order, ["first", "second"])
+        self.assertEqual(limiter.in_flight, 2)
+
+    def test_aimd(self):
+        limiter = AdaptiveLimiter(initial_limit=4, max_limit=8)
+        limiter.acquire()
+        limiter.release("Files/Search", 5.0, failed=True)
+        self.assertEqual(limiter.stats()["limit"], 3)
+        self.assertEqual(limiter.stats()["failures"], 1)
+        for _ in range(40):
+            for _ in range(int(limiter.limit)):
+                limiter.acquire()
+            for _ in range(int(limiter.limit)):
+                limiter.release("Playback/Info", 0.01)
+        self.assertEqual(limiter.stats()["limit"], 8)
+        for _ in range(20):
+            limiter.acquire()
+            limiter.release("Playback/Info", 0.1)
+        self.assertLess(limiter.limit, 8)
+
+    def test_cost_classes(self):
+        limiter = AdaptiveLimiter(initial_limit=4)
+        for _ in range(5):
+            limiter.acquire()
+            limiter.release("Files/Search", 0.01, size=500)
+        # Searches returning much more data are slower, without any overload
+        for _ in range(20):
+            limiter.acquire()
+            limiter.release("Files/Search", 1.0, size=50000000)
+        self.assertEqual(limiter.stats()["decreases"], 0)
+        for _ in range(20):
+            limiter.acquire()
+            limiter.release("Files/Search", 0.1, size=500)
+        self.assertGreater(limiter.stats()["decreases"], 0)
+
+    def test_overloaded_server(self):
+        with FakeMCWSServer(SyntheticLibrary(10), latency=0.01, capacity=2) as fake:
+            server = fake.media_server(api=False)
+            server.limiter = AdaptiveLimiter(max_limit=16)
+
+            def send():
+                for _ in range(10):
+                    server.send_request("Playback/Info")
+
+            threads = [threading.Thread(target=send) for _ in range(16)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            server.session.close()
+        stats = server.limiter.stats()
+        self.assertGreater(stats["decreases"], 0)
+        self.assertLess(stats["limit"], 16)
+        self.assertEqual(stats["in_flight"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+from pymcws.api import playback
+from pymcws.metrics import RequestMetrics, to_prometheus
+from benchmarks.fake_server import FakeMCWSServer, SyntheticLibrary
+
+"""
+    Tests request instrumentation against the fake MCWS server.
+"""
+
+
+class TestMetrics(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.fake = FakeMCWSServer(SyntheticLibrary(10)).start()
+        cls.server = cls.fake.media_server(api=False)
+
+    def setUp(self):
+        self.metrics = RequestMetrics()
+        self.server.add_hook(self.metrics)
+
+    def test_requests_are_counted(self):
+        playback.volume(self.server, 0.5)
+        playback.volume(self.server)
+        playback.stop(self.server)
+        labels = ("localhost:" + str(self.fake.port), "local", "Playback/Volume")
+        self.assertEqual(self.metrics.requests[labels], 2)
+        self.assertEqual(self.metrics.latency[labels].count, 2)
+        self.assertGreater(self.metrics.response_bytes[labels], 0)
+
+    def test_errors_and_export(self):
+        self.fake.error_rate = 1.0
+        try:
+            self.server.send_request("Alive")
+        finally:
+            self.fake.error_rate = 0.0
+        text = to_prometheus(self.metrics)
+        self.assertIn('error="HTTP 503"', text)
+        self.assertIn('pymcws_request_duration_seconds_bucket{', text)
+        self.assertIn('le="+Inf"} 1', text)
+        self.assertTrue(to_prometheus(self.metrics, openmetrics=True).endswith("# EOF\n"))
+
+    def tearDown(self):
+        self.server.remove_hook(self.metrics)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.session.close()
+        cls.fake.stop()
+
+
+if __name__ == "__main__":
+    unittest.main()
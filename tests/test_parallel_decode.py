@@ -0,0 +1,66 @@
+import pickle
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from unittest import mock
+from xml.etree import ElementTree
+from pymcws import utils
+from pymcws.utils import (
+    parallel_transform_mpl_response,
+    split_mpl_items,
+    transform_mpl_response,
+)
+from benchmarks.synthetic import SyntheticServer, FakeResponse, items, mpl_xml
+
+"""
+    Tests picklable field codecs and decoding MPL responses on a process pool.
+"""
+
+
+class TestParallelDecode(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = SyntheticServer()
+        cls.response = FakeResponse(mpl_xml(300))
+        cls.files = transform_mpl_response(cls.server, cls.response)
+        cls.pool = ProcessPoolExecutor(max_workers=2)
+
+    def test_codecs_pickle(self):
+        fields = pickle.loads(pickle.dumps(self.server.fields))
+        for name, value in items(1)[0].items():
+            decoded = fields[name]["Decoder"](value)
+            self.assertEqual(decoded, self.server.fields[name]["Decoder"](value))
+            self.assertEqual(
+                fields[name]["Encoder"](decoded),
+                self.server.fields[name]["Encoder"](decoded),
+            )
+
+    def test_split(self):
+        chunks = split_mpl_items(self.response.content, 70)
+        self.assertEqual(len(chunks), 5)
+        counts = [len(ElementTree.fromstring(chunk)) for chunk in chunks]
+        self.assertEqual(counts, [70, 70, 70, 70, 20])
+        self.assertEqual(split_mpl_items(b"<MPL></MPL>", 10), [b"<MPL></MPL>"])
+
+    def test_parallel(self):
+        files = parallel_transform_mpl_response(
+            self.server, self.response, self.pool, chunk_items=37
+        )
+        self.assertEqual(files, self.files)
+        self.assertEqual([f["Key"] for f in files], list(range(300)))
+
+    def test_decode_pool(self):
+        self.server.decode_pool = self.pool
+        try:
+            with mock.patch.object(utils, "PARALLEL_DECODE_MIN_BYTES", 0):
+                files = transform_mpl_response(self.server, self.response)
+        finally:
+            del self.server.decode_pool
+        self.assertEqual(files, self.files)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.pool.shutdown()
+
+
+if __name__ == "__main__":
+    unittest.main()
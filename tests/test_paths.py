@@ -0,0 +1,66 @@
+import pickle
+import unittest
+from pymcws.api import library
+from pymcws.model import transform_path
+from pymcws.paths import PathMapper
+from benchmarks.fake_server import FakeMCWSServer, SyntheticLibrary
+
+"""
+    Tests path mapping, in isolation and installed on a server.
+"""
+
+
+class TestPathMapper(unittest.TestCase):
+    def setUp(self):
+        self.mapper = PathMapper(
+            {
+                "D:\\Music": "/mnt/music",
+                "D:\\Music\\Artist 1": "/mnt/artist1/",
+                "E:\\": "/mnt/e",
+            }
+        )
+
+    def test_longest_prefix(self):
+        to_local = self.mapper.to_local
+        self.assertEqual(to_local("D:\\Music\\a\\b.flac"), "/mnt/music/a/b.flac")
+        self.assertEqual(to_local("d:\\music\\a.flac"), "/mnt/music/a.flac")
+        self.assertEqual(to_local("D:\\Music\\Artist 1\\b.flac"), "/mnt/artist1/b.flac")
+        self.assertEqual(
+            to_local("D:\\Music\\Artist 12\\b.flac"), "/mnt/music/Artist 12/b.flac"
+        )
+        self.assertEqual(to_local("D:\\Music"), "/mnt/music")
+        self.assertEqual(to_local("E:\\x.flac"), "/mnt/e/x.flac")
+        # Prefixes only match whole path components
+        self.assertEqual(to_local("D:\\Musical\\x.flac"), "D:\\Musical\\x.flac")
+        self.assertIsNone(to_local(None))
+
+    def test_roundtrip(self):
+        paths = ["D:\\Music\\a\\b.flac", "D:\\Music\\Artist 1\\b.flac", "E:\\x.flac"]
+        local = list(self.mapper.map_local(paths))
+        self.assertEqual(list(self.mapper.map_server(local)), paths)
+        copy = pickle.loads(pickle.dumps(self.mapper))
+        self.assertEqual(copy.to_local(paths[2]), local[2])
+
+    def test_transform_path(self):
+        paths = ["D:\\Music\\a.flac"]
+        result = transform_path(paths, "D:\\Music", "/mnt", win_to_unix=True)
+        self.assertEqual(result, ["/mnt/a.flac"])
+
+    def test_install(self):
+        with FakeMCWSServer(SyntheticLibrary(10)) as fake:
+            server = fake.media_server()
+            PathMapper({"D:\\Music": "/mnt/music"}).install(server)
+            file = server.files.search("[Key]=3")[0]
+            self.assertEqual(file["Filename"], "/mnt/music/Artist 3/Album 3/3.flac")
+            file["Filename"] = "/mnt/music/Other/3.flac"
+            server.file.set_info(file)
+            saved = fake.library.by_key["3"]["Filename"]
+            self.assertEqual(saved, "D:\\Music\\Other\\3.flac")
+            # Fields loaded again keep the mapping
+            decoder = library.fields(server)["Filename"]["Decoder"]
+            self.assertEqual(decoder("D:\\Music\\x.flac"), "/mnt/music/x.flac")
+            server.session.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+from pymcws.catalogue import PlaylistCatalogue
+from pymcws.exceptions import UnknownPlaylistError
+from pymcws.metrics import RequestMetrics
+from benchmarks.fake_server import FakeMCWSServer, SyntheticLibrary
+
+"""
+    Tests the playlist API and catalogue against the fake MCWS server.
+"""
+
+
+class TestPlaylists(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.fake = FakeMCWSServer(SyntheticLibrary(100)).start()
+        cls.server = cls.fake.media_server()
+
+    def test_list_and_files(self):
+        playlists = self.server.playlists.get_list()
+        types = [playlist["Type"] for playlist in playlists]
+        self.assertEqual(types, ["Group", "Playlist", "Smartlist"])
+        favourites = playlists[1]
+        files = self.server.playlists.files(favourites, fields=["Name", "Genre"])
+        self.assertEqual([f["Key"] for f in files], list(range(20)))
+        self.assertIsInstance(files[0]["Genre"], list)
+        path = "Playlists\\Recently Imported"
+        streamed = list(self.server.playlists.iter_files(path))
+        self.assertEqual(streamed[0]["Key"], 99)
+        self.assertEqual(self.server.playlists.keys(1002), list(range(99, 49, -1)))
+
+    def test_catalogue_detects_changes(self):
+        catalogue = PlaylistCatalogue(self.server)
+        metrics = RequestMetrics()
+        self.server.add_hook(metrics)
+        try:
+            first = catalogue.files("Favourites")
+            self.assertEqual(catalogue.files("Favourites"), first)
+            first[0]["Genre"].append("Edited")
+            first[0]["Rating"] = 1
+            cached = catalogue.files("Favourites")[0]
+            self.assertNotIn("Edited", cached["Genre"])
+            self.assertEqual(cached.changed_fields, {})
+            downloads = [k for k in metrics.requests if k[2] == "Playlist/Files"]
+            # three key lookups and one download
+            self.assertEqual(metrics.requests[downloads[0]], 4)
+            self.assertFalse(catalogue.changed("Favourites"))
+            self.fake.library.playlists[1]["Keys"].append("42")
+            self.assertTrue(catalogue.changed(1001))
+            self.assertEqual(catalogue.files(1001)[-1]["Key"], 42)
+        finally:
+            self.fake.library.playlists[1]["Keys"].pop()
+            self.server.remove_hook(metrics)
+        with self.assertRaises(UnknownPlaylistError):
+            catalogue.files("Missing")
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.session.close()
+        cls.fake.stop()
+
+
+if __name__ == "__main__":
+    unittest.main()
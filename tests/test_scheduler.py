@@ -0,0 +1,193 @@
+import threading
+import time
+import unittest
+from pymcws.limiter import AdaptiveLimiter
+from pymcws.scheduler import (
+    BULK,
+    INTERACTIVE,
+    NORMAL,
+    RequestScheduler,
+    endpoint_priority,
+    priority,
+    request_priority,
+)
+from benchmarks.fake_server import FakeMCWSServer, SyntheticLibrary
+
+"""
+    Tests the priority request scheduler, in isolation and against the fake server.
+"""
+
+
+class TestRequestScheduler(unittest.TestCase):
+    def wait_queued(self, scheduler, name, count):
+        while scheduler.stats()[name + "_queued"] < count:
+            time.sleep(0.001)
+
+    def test_priorities(self):
+        self.assertEqual(endpoint_priority("Playback/Pause"), INTERACTIVE)
+        self.assertEqual(endpoint_priority("Playback/Playlist"), NORMAL)
+        self.assertEqual(endpoint_priority("Files/Search"), NORMAL)
+        self.assertEqual(endpoint_priority("File/GetImage"), BULK)
+        with priority(BULK):
+            self.assertEqual(request_priority("Files/Search"), BULK)
+            with priority(INTERACTIVE):
+                self.assertEqual(request_priority("Files/Search"), INTERACTIVE)
+            self.assertEqual(request_priority("Files/Search"), BULK)
+        self.assertEqual(request_priority("Files/Search"), NORMAL)
+
+    def test_reserved_slots(self):
+        scheduler = RequestScheduler(slots=2, reserved=1)
+        scheduler.acquire(NORMAL)
+        started = []
+        normal = threading.Thread(
+            target=lambda: started.append(scheduler.acquire(NORMAL) or "normal")
+        )
+        normal.start()
+        self.wait_queued(scheduler, "normal", 1)
+        # The reserved slot is still free for interactive requests
+        scheduler.acquire(INTERACTIVE)
+        self.assertEqual(scheduler.stats()["in_flight"], 2)
+        scheduler.release()
+        self.assertEqual(started, [])
+        scheduler.release()
+        normal.join()
+        self.assertEqual(started, ["normal"])
+
+    def test_interactive_first_and_aging(self):
+        scheduler = RequestScheduler(slots=1, reserved=0, aging=60)
+        scheduler.acquire(NORMAL)
+        order = []
+
+        def wait(priority_class, name):
+            scheduler.acquire(priority_class)
+            order.append(name)
+            scheduler.release()
+
+        threads = []
+        for priority_class, name in ((BULK, "bulk"), (INTERACTIVE, "interactive")):
+            threads.append(threading.Thread(target=wait, args=(priority_class, name)))
+            threads[-1].start()
+            self.wait_queued(scheduler, name, 1)
+        scheduler.release()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(order, ["interactive", "bulk"])
+        # Bulk requests that waited long enough overtake newer normal ones
+        scheduler = RequestScheduler(slots=1, reserved=0, aging=0.01)
+        scheduler.acquire(NORMAL)
+        order = []
+        threads = []
+        for priority_class, name in ((BULK, "bulk"), (NORMAL, "normal")):
+            threads.append(threading.Thread(target=wait, args=(priority_class, name)))
+            threads[-1].start()
+            self.wait_queued(scheduler, name, 1)
+            time.sleep(0.05)
+        scheduler.release()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(order, ["bulk", "normal"])
+
+    def wait_held(self, fake, extension, count):
+        while fake.held[extension] < count:
+            time.sleep(0.001)
+
+    def pause_while_held(self, server, count):
+        """Sends count pause requests on a thread, returns whether they completed."""
+
+        def pause():
+            for _ in range(count):
+                server.send_request("Playback/Pause", {"Zone": -1})
+
+        thread = threading.Thread(target=pause, daemon=True)
+        thread.start()
+        # Only a guard against hanging, the requests do not depend on timing
+        thread.join(10)
+        return not thread.is_alive()
+
+    def test_pause_during_bulk_load(self):
+        with FakeMCWSServer(SyntheticLibrary(10)) as fake:
+            server = fake.media_server(api=False)
+            server.scheduler = RequestScheduler(slots=3, reserved=1)
+            search = fake.hold("Files/Search")
+
+            def bulk():
+                with priority(BULK):
+                    for _ in range(5):
+                        server.send_request("Files/Search", {"Action": "MPL"})
+
+            threads = [threading.Thread(target=bulk) for _ in range(6)]
+            for thread in threads:
+                thread.start()
+            # Bulk requests hold every slot but the reserved one
+            self.wait_held(fake, "Files/Search", 2)
+            self.wait_queued(server.scheduler, "bulk", 4)
+            # Without the reserved slot, pause would wait for a bulk request to finish
+            paused = self.pause_while_held(server, 1)
+            during = server.scheduler.stats()
+            search.set()
+            for thread in threads:
+                thread.join()
+            server.session.close()
+        self.assertTrue(paused)
+        self.assertEqual(during["bulk_started"], 2)
+        self.assertEqual(during["bulk_queued"], 4)
+        stats = server.scheduler.stats()
+        self.assertEqual(stats["bulk_started"], 30)
+        self.assertEqual(stats["interactive_started"], 1)
+        self.assertEqual(stats["in_flight"], 0)
+
+    def test_pause_with_limiter(self):
+        with FakeMCWSServer(SyntheticLibrary(10)) as fake:
+            server = fake.media_server(api=False)
+            server.scheduler = RequestScheduler(slots=8, reserved=2)
+            server.limiter = AdaptiveLimiter(initial_limit=2, min_limit=2, max_limit=2)
+            search = fake.hold("Files/Search")
+
+            def bulk():
+                with priority(BULK):
+                    for _ in range(4):
+                        server.send_request("Files/Search", {"Action": "MPL"})
+
+            threads = [threading.Thread(target=bulk) for _ in range(6)]
+            for thread in threads:
+                thread.start()
+            # The limit of 2 leaves one slot for bulk requests and one for pause
+            self.wait_held(fake, "Files/Search", 1)
+            stats = server.scheduler.stats
+            while stats()["bulk_started"] + stats()["bulk_queued"] < 6:
+                time.sleep(0.001)
+            paused = self.pause_while_held(server, 3)
+            during = server.scheduler.stats()
+            queued = server.limiter.queued
+            search.set()
+            for thread in threads:
+                thread.join()
+            server.session.close()
+        # Bulk requests never queue in the limiter ahead of pause
+        self.assertTrue(paused)
+        self.assertEqual(during["bulk_started"], 1)
+        self.assertEqual(during["interactive_started"], 3)
+        self.assertEqual(queued, 0)
+        self.assertEqual(server.scheduler.stats()["bulk_started"], 24)
+        self.assertEqual(server.limiter.stats()["in_flight"], 0)
+        self.assertEqual(server.limiter.stats()["queued"], 0)
+
+    def test_limiter_assignment(self):
+        with FakeMCWSServer(SyntheticLibrary(10)) as fake:
+            server = fake.media_server(api=False)
+            limiter = AdaptiveLimiter(initial_limit=2)
+            server.limiter = limiter
+            server.scheduler = RequestScheduler(slots=8)
+            self.assertIs(server.scheduler.limiter, limiter)
+            server.send_request("Playback/Pause", {"Zone": -1})
+            # Removing the limiter gives the scheduler its own slots back
+            server.limiter = None
+            self.assertIsNone(server.scheduler.limiter)
+            server.send_request("Playback/Pause", {"Zone": -1})
+            server.session.close()
+        self.assertEqual(limiter.stats()["in_flight"], 0)
+        self.assertEqual(server.scheduler.stats()["interactive_started"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
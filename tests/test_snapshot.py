@@ -0,0 +1,104 @@
+import os
+import tempfile
+import unittest
+from requests.exceptions import HTTPError
+from pymcws.snapshot import (
+    Snapshot,
+    editable_fields,
+    main,
+    restore_snapshot,
+    save_snapshot,
+)
+from benchmarks.fake_server import FakeMCWSServer, SyntheticLibrary
+
+"""
+    Tests saving and restoring tag snapshots against the fake MCWS server.
+"""
+
+
+class TestSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.fake = FakeMCWSServer(SyntheticLibrary(300)).start()
+        self.server = self.fake.media_server(api=False)
+        self.address = "localhost:" + str(self.fake.port)
+        self.items = self.fake.library.by_key
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "library.snapshot")
+
+    def tearDown(self):
+        self.server.session.close()
+        self.fake.stop()
+        self.directory.cleanup()
+
+    def test_editable_fields(self):
+        fields = editable_fields(self.server)
+        self.assertIn("Genre", fields)
+        self.assertNotIn("Bitrate", fields)
+        self.assertNotIn("Key", fields)
+
+    def test_save_and_restore(self):
+        self.items["2"]["Name"] = 'A "quoted", name'
+        self.items["3"].pop("Comment", None)
+        self.assertEqual(main([self.address, "save", self.path]), 0)
+        before = {key: dict(item) for key, item in self.items.items()}
+        with Snapshot(self.path) as snapshot:
+            self.assertEqual(len(snapshot), 300)
+            self.assertEqual(snapshot.get(2)["Name"], 'A "quoted", name')
+            self.assertIsNone(snapshot.get(100000))
+
+        self.items["2"]["Name"] = "Renamed"
+        self.items["3"]["Comment"] = "added"
+        self.items["150"]["Genre"] = "Noise"
+        self.items["150"]["Rating"] = "1"
+        removed = self.items.pop("299")
+        self.fake.library.items.remove(removed)
+
+        dry = restore_snapshot(self.server, self.path, dry_run=True)
+        self.assertEqual((dry.files, dry.changed, dry.values), (299, 3, 4))
+        self.assertEqual(dry.missing, 1)
+        self.assertEqual(self.items["2"]["Name"], "Renamed")
+
+        partial = restore_snapshot(self.server, self.path, fields=["Rating"])
+        self.assertEqual(partial.changed, 1)
+        self.assertEqual(self.items["150"]["Rating"], before["150"]["Rating"])
+        self.assertEqual(self.items["150"]["Genre"], "Noise")
+
+        result = restore_snapshot(self.server, self.path, parallel=4, chunk_size=50)
+        self.assertEqual((result.changed, result.failures), (3, []))
+        for key in ("2", "3", "150"):
+            expected = {f: v for f, v in before[key].items() if v}
+            actual = {f: v for f, v in self.items[key].items() if v}
+            self.assertEqual(actual, expected)
+        self.assertEqual(restore_snapshot(self.server, self.path).changed, 0)
+
+    def test_failed_save_keeps_snapshot(self):
+        self.assertEqual(save_snapshot(self.server, self.path), 300)
+        self.fake.error_rate = 1.0
+        try:
+            with self.assertRaises(HTTPError):
+                save_snapshot(self.server, self.path)
+        finally:
+            self.fake.error_rate = 0.0
+        with Snapshot(self.path) as snapshot:
+            self.assertEqual(len(snapshot), 300)
+        self.assertEqual(os.listdir(self.directory.name), ["library.snapshot"])
+
+    def test_invalid_snapshot(self):
+        missing = os.path.join(self.directory.name, "missing.snapshot")
+        self.assertEqual(main([self.address, "restore", missing]), 2)
+        self.assertFalse(os.path.exists(missing))
+        with open(self.path, "w") as invalid:
+            invalid.write("not a snapshot")
+        with self.assertRaises(ValueError):
+            Snapshot(self.path)
+        self.assertEqual(main([self.address, "restore", self.path]), 2)
+
+    def test_unknown_fields(self):
+        self.assertEqual(main([self.address, "save", self.path, "--fields", "Name"]), 0)
+        self.assertEqual(
+            main([self.address, "restore", self.path, "--fields", "Genre"]), 2
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+import os
+import tempfile
+import unittest
+from pymcws.media_server import MediaServer
+from pymcws.api import files, playback
+from pymcws.transport import RecordingTransport, ReplayTransport, load_archive
+from pymcws.exceptions import ReplayMissError
+from benchmarks.fake_server import FakeMCWSServer, SyntheticLibrary
+
+"""
+    Records traffic against the fake MCWS server and replays it offline.
+"""
+
+
+class TestTransport(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.archive = os.path.join(self.directory.name, "archive.jsonl.gz")
+
+    def test_record_and_replay(self):
+        with FakeMCWSServer(SyntheticLibrary(50)) as fake:
+            server = fake.media_server(api=False)
+            server.transport = RecordingTransport(self.archive)
+            recorded = files.search(server, "[Key]=0-9", fields=["Name", "Genre"])
+            volume = playback.volume(server, 0.3)
+            server.transport.close()
+            server.session.close()
+
+        entries = load_archive(self.archive)
+        paths = [entry["path"] for entry in entries]
+        self.assertEqual(paths, ["Files/Search", "Library/Fields", "Playback/Volume"])
+        for entry in entries:
+            self.assertNotIn("127.0.0.1", entry["path"])
+
+        replay = MediaServer("localhost", None, None)
+        replay.transport = ReplayTransport(self.archive, scale=0.0)
+        self.assertEqual(
+            files.search(replay, "[Key]=0-9", fields=["Name", "Genre"]), recorded
+        )
+        self.assertEqual(playback.volume(replay, 0.3), volume)
+        with self.assertRaises(ReplayMissError):
+            playback.volume(replay, 0.4)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+
+if __name__ == "__main__":
+    unittest.main()
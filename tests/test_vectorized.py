@@ -0,0 +1,57 @@
+import unittest
+from pymcws.utils import transform_mpl_response
+from benchmarks.synthetic import SyntheticServer, FakeResponse, mpl_xml
+
+try:
+    import numpy as np
+    from pymcws import vectorized
+except ImportError:
+    np = None
+
+"""
+    Compares column-wise decoding against the regular decoders on synthetic data.
+"""
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class TestVectorized(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = SyntheticServer()
+        cls.response = FakeResponse(mpl_xml(200))
+        cls.files = transform_mpl_response(cls.server, cls.response)
+
+    def test_numeric_columns(self):
+        columns = vectorized.transform_mpl_columns(self.server, self.response)
+        self.assertEqual(columns["Key"].dtype, np.int64)
+        self.assertEqual(list(columns["Key"]), [f["Key"] for f in self.files])
+        self.assertTrue(
+            np.allclose(columns["Duration"], [f["Duration"] for f in self.files])
+        )
+
+    def test_dates(self):
+        columns = vectorized.transform_mpl_columns(self.server, self.response)
+        expected = np.array([f["Date"] for f in self.files], dtype="datetime64[us]")
+        difference = np.abs(columns["Date"] - expected).astype(np.int64)
+        self.assertLess(difference.max(), 1000)
+
+    def test_missing_values(self):
+        content = (
+            b'<MPL><Item><Field Name="Key">1</Field><Field Name="Rating">3</Field></Item>'
+            b'<Item><Field Name="Key">2</Field><Field Name="Date">1,5</Field></Item></MPL>'
+        )
+        columns = vectorized.transform_mpl_columns(self.server, FakeResponse(content))
+        self.assertTrue(np.isnan(columns["Rating"][1]))
+        self.assertTrue(np.isnat(columns["Date"][0]))
+        self.assertEqual(str(columns["Date"][1]), "1899-12-31T12:00:00.000000")
+
+    def test_structured(self):
+        result = vectorized.transform_mpl_columns(
+            self.server, self.response, structured=True
+        )
+        self.assertEqual(len(result), 200)
+        self.assertEqual(result["Genre"][0], self.files[0]["Genre"])
+
+
+if __name__ == "__main__":
+    unittest.main()
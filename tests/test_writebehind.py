@@ -0,0 +1,102 @@
+import unittest
+from pymcws.api import files
+from pymcws.exceptions import WriteBehindError
+from pymcws.metrics import RequestMetrics
+from pymcws.writebehind import WriteBehindSession
+from benchmarks.fake_server import FakeMCWSServer, SyntheticLibrary
+
+"""
+    Tests buffered saving of files against the fake MCWS server.
+"""
+
+
+class TestWriteBehind(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.fake = FakeMCWSServer(SyntheticLibrary(100), latency=0.002).start()
+        cls.server = cls.fake.media_server(api=False)
+
+    def setUp(self):
+        self.metrics = RequestMetrics()
+        self.server.add_hook(self.metrics)
+
+    def set_info_requests(self):
+        return sum(
+            count
+            for labels, count in self.metrics.requests.items()
+            if labels[2] == "File/SetInfo"
+        )
+
+    def test_edits_are_merged(self):
+        file = files.search(self.server, "[Key]=7-7")[0]
+        with WriteBehindSession(self.server, max_delay=60) as session:
+            file["Artist"] = "Merged Artist"
+            session.save(file)
+            file["Comment"] = "Merged comment"
+            session.save(file)
+            file["Artist"] = "Final Artist"
+            session.save(file)
+        self.assertEqual(session.saves, 3)
+        self.assertEqual(self.set_info_requests(), 1)
+        item = self.fake.library.by_key["7"]
+        self.assertEqual(item["Artist"], "Final Artist")
+        self.assertEqual(item["Comment"], "Merged comment")
+
+    def test_thresholds_and_backpressure(self):
+        session = WriteBehindSession(
+            self.server, max_pending=5, max_delay=0.05, max_workers=2, max_queue=8
+        )
+        for file in files.search(self.server, "[Key]=20-59"):
+            file["Rating"] = 3
+            session.save(file)
+        file = files.search(self.server, "[Key]=60-60")[0]
+        file["Rating"] = 2
+        session.save(file)
+        session.flush()
+        self.assertEqual(session.writes, 41)
+        self.assertEqual(self.fake.library.by_key["60"]["Rating"], "2")
+        session.close()
+
+    def test_failures_are_raised(self):
+        file = files.search(self.server, "[Key]=8-8")[0]
+        self.fake.error_rate = 1.0
+        try:
+            with self.assertRaises(WriteBehindError) as context:
+                with WriteBehindSession(self.server) as session:
+                    file["Rating"] = 1
+                    session.save(file)
+        finally:
+            self.fake.error_rate = 0.0
+        self.assertEqual(context.exception.failures[0][0], 8)
+
+    def test_none_clears_fields(self):
+        file = files.search(self.server, "[Key]=9-9")[0]
+        with WriteBehindSession(self.server) as session:
+            file["Comment"] = None
+            session.save(file)
+        self.assertEqual(self.fake.library.by_key["9"]["Comment"], "")
+
+    def test_block_exception_is_kept(self):
+        file = files.search(self.server, "[Key]=10-10")[0]
+        self.fake.error_rate = 1.0
+        try:
+            with self.assertRaises(KeyError):
+                with self.assertLogs("pymcws.writebehind", "ERROR"):
+                    with WriteBehindSession(self.server) as session:
+                        file["Rating"] = 1
+                        session.save(file)
+                        raise KeyError("in block")
+        finally:
+            self.fake.error_rate = 0.0
+
+    def tearDown(self):
+        self.server.remove_hook(self.metrics)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.session.close()
+        cls.fake.stop()
+
+
+if __name__ == "__main__":
+    unittest.main()